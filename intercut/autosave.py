@@ -0,0 +1,90 @@
+"""Save screenplays in the background while the user types.
+
+Every few seconds the Autosave checks whether the document changed since it
+was last saved. If it did, the journal kept next to the file (see
+journal.py) is compacted: a snapshot of the document is taken on the UI
+thread, which only re-encodes the scenes edited since the last save, and
+the file is put together and written by a BackgroundWriter thread, to a
+temporary file that then replaces the screenplay file. Edits made between
+two checks are saved together, and nothing is written when nothing changed.
+If a write fails, the next check tries again.
+
+Until a screenplay has been saved once it has no file, so there is nothing
+to autosave.
+"""
+from kivy.event import EventDispatcher
+from kivy.clock import Clock
+
+from functools import partial
+
+# Seconds between two checks for unsaved changes.
+AUTOSAVE_INTERVAL = 5.
+
+
+class Autosave(EventDispatcher):
+    """Periodically save a Screenplay without blocking the UI thread.
+
+    Args:
+        screenplay (Screenplay): The screenplay to save.
+        interval (float): Seconds between two checks for unsaved changes.
+
+    Events:
+        on_saved: (latency) The file was written. latency is the time the
+            write took on the worker thread, in seconds.
+        on_error: (error) The file could not be written. The edits are
+            still in the journal, so nothing is lost.
+
+    Example:
+        autosave = Autosave(screenplay, interval=10)
+        autosave.bind(on_saved=show_latency)
+        autosave.start()
+    """
+
+    def __init__(self, screenplay, interval=AUTOSAVE_INTERVAL, **kwargs):
+        self.register_event_type('on_saved')
+        self.register_event_type('on_error')
+        super().__init__(**kwargs)
+        self.screenplay = screenplay
+        self.interval = interval
+        self.last_latency = None
+        self._check_event = None
+
+    def start(self):
+        self.stop()
+        self._check_event = Clock.schedule_interval(self.check, self.interval)
+
+    def stop(self):
+        if self._check_event is not None:
+            self._check_event.cancel()
+            self._check_event = None
+
+    def check(self, dt=0):
+        """Save the screenplay if it changed since the last save."""
+        document = self.screenplay.document
+        journal = document.journal
+        if journal is None or journal.compacting:
+            # Not saved anywhere yet, or the last save is still being
+            # written (its edits will be picked up next time).
+            return
+        if journal.failed or document.revision != journal.saved_revision:
+            journal.compact(done=self._written)
+
+    def _written(self, latency, error):
+        # Runs on the writer thread; events are dispatched on the UI thread.
+        if error is None:
+            Clock.schedule_once(partial(self._dispatch_saved, latency))
+        else:
+            Clock.schedule_once(partial(self._dispatch_error, error))
+
+    def _dispatch_saved(self, latency, dt):
+        self.last_latency = latency
+        self.dispatch('on_saved', latency)
+
+    def _dispatch_error(self, error, dt):
+        self.dispatch('on_error', error)
+
+    def on_saved(self, latency):
+        pass
+
+    def on_error(self, error):
+        pass
@@ -0,0 +1,244 @@
+"""Read and write screenplays in the compact, indexed binary format.
+
+The JSON format is pretty-printed and has to be parsed in full before any of
+it can be used. A binary screenplay file (.ixb) is laid out so that any
+scene can be read on its own:
+
+    header          magic b'IXTB', format version (u16), flags (u16),
+                    number of scenes (u32)
+    metadata        length (u32), then the title page fields and the
+                    established characters and locations as compact JSON
+    scene table     for each scene: offset of its payload from the start of
+                    the file (u64) and its number of elements (u32)
+    scene payloads  for each scene: length (u32), then the scene as compact
+                    JSON, in the ScreenplayDocument.get_json shape
+
+All integers are little endian. The file holds exactly what get_json
+returns, so converting between the two formats loses nothing.
+
+BinaryScreenplay memory maps a file and decodes scenes only when asked for
+them.
+
+Example:
+    with BinaryScreenplay(path) as screenplay:
+        heading = screenplay.read_scene(42).elements[0].raw_text
+
+    json_to_binary('script.json', 'script.ixb')
+"""
+from model import ScreenplayDocument, SceneModel
+
+import json
+import mmap
+import os
+import struct
+
+MAGIC = b'IXTB'
+FORMAT_VERSION = 1
+BINARY_EXTENSION = '.ixb'
+
+HEADER = struct.Struct('<4sHHI')
+LENGTH = struct.Struct('<I')
+TABLE_ENTRY = struct.Struct('<QI')
+
+# Fields of ScreenplayDocument.get_json stored in the metadata block.
+METADATA_FIELDS = ('title', 'author', 'phone', 'email', 'locations',
+                   'characters', 'version', 'save_to')
+
+
+def encode(json_value):
+    return json.dumps(json_value, separators=(',', ':')).encode('utf-8')
+
+
+def is_binary_file(path):
+    """Return True if the file at path is a binary screenplay file."""
+    with open(path, 'rb') as stream:
+        return stream.read(len(MAGIC)) == MAGIC
+
+
+def write_binary(document, stream):
+    """Write a ScreenplayDocument to a seekable binary stream.
+
+    Scenes are encoded and written one at a time; the scene table is filled
+    in once their offsets are known.
+    """
+    scenes = document.scenes
+    start = stream.tell()
+    stream.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(scenes)))
+
+    metadata = encode(document.get_header_json())
+    stream.write(LENGTH.pack(len(metadata)))
+    stream.write(metadata)
+
+    table_offset = stream.tell()
+    stream.write(bytes(TABLE_ENTRY.size * len(scenes)))
+
+    table = []
+    for scene in scenes:
+        payload = encode(scene.get_json())
+        table.append(TABLE_ENTRY.pack(stream.tell() - start, len(scene)))
+        stream.write(LENGTH.pack(len(payload)))
+        stream.write(payload)
+
+    end = stream.tell()
+    stream.seek(table_offset)
+    stream.write(b''.join(table))
+    stream.seek(end)
+
+
+def save_binary(document, path):
+    """Replace the file at path with document in the binary format."""
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as stream:
+        write_binary(document, stream)
+        stream.flush()
+        os.fsync(stream.fileno())
+    os.replace(temp_path, path)
+
+
+class BinaryScreenplay:
+    """A binary screenplay file, memory mapped for random access to scenes.
+
+    Only the header, metadata and scene table are decoded when the file is
+    opened. Each scene is decoded by read_scene when it is needed.
+
+    Attributes:
+        metadata (dict): The title page fields, characters and locations.
+        element_counts (list): Number of elements in each scene.
+
+    Raises:
+        ValueError: If the file is not a binary screenplay file, or is cut
+            short.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as stream:
+            try:
+                self.buffer = mmap.mmap(stream.fileno(), 0,
+                                        access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError('{} is empty'.format(path))
+        try:
+            self._read_index()
+        except ValueError:
+            self.close()
+            raise
+
+    def _read_index(self):
+        # struct.error is not a ValueError, which is what callers such as
+        # the loader expect from a bad file.
+        try:
+            self._unpack_index()
+        except struct.error:
+            raise ValueError('truncated binary screenplay')
+
+    def _unpack_index(self):
+        buffer = self.buffer
+        magic, version, flags, scene_count = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError('{} is not a binary screenplay'.format(self.path))
+        if version > FORMAT_VERSION:
+            raise ValueError('{} needs a newer version of InterXut'.format(
+                self.path))
+
+        offset = HEADER.size
+        self.metadata = json.loads(self._read_block(offset).decode('utf-8'))
+        offset += LENGTH.size + LENGTH.unpack_from(buffer, offset)[0]
+
+        self.offsets = []
+        self.element_counts = []
+        for index in range(scene_count):
+            scene_offset, element_count = TABLE_ENTRY.unpack_from(
+                buffer, offset + index * TABLE_ENTRY.size)
+            self.offsets.append(scene_offset)
+            self.element_counts.append(element_count)
+
+    def _read_block(self, offset):
+        try:
+            length, = LENGTH.unpack_from(self.buffer, offset)
+        except struct.error:
+            raise ValueError('{} is cut short'.format(self.path))
+        start = offset + LENGTH.size
+        if start + length > len(self.buffer):
+            raise ValueError('{} is cut short'.format(self.path))
+        return self.buffer[start:start + length]
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.buffer.close()
+
+    def read_scene_json(self, index):
+        """Return the scene at index in the SceneModel.get_json shape."""
+        return json.loads(self._read_block(self.offsets[index]).decode('utf-8'))
+
+    def read_scene(self, index):
+        """Decode the scene at index (in document order) into a SceneModel."""
+        scene = SceneModel()
+        scene.load_from_json(self.read_scene_json(index))
+        return scene
+
+    def get_json(self):
+        """Return the whole screenplay in the ScreenplayDocument.get_json
+        shape."""
+        json_dict = {field: self.metadata[field] for field in METADATA_FIELDS}
+        json_dict['scenes'] = [self.read_scene_json(index)
+                               for index in range(len(self))]
+        return json_dict
+
+    def load_header(self):
+        """Return a new ScreenplayDocument with the title page fields,
+        characters and locations of the file, but none of its scenes.
+
+        Add the scenes with read_scene and ScreenplayDocument.append_scenes,
+        as they are needed.
+        """
+        document = ScreenplayDocument()
+        for field in METADATA_FIELDS:
+            setattr(document, field, self.metadata[field])
+        return document
+
+    def load_document(self):
+        """Decode every scene into a new ScreenplayDocument."""
+        document = self.load_header()
+        document.append_scenes(self.read_scene(index)
+                               for index in range(len(self)))
+        return document
+
+
+def json_to_binary(json_path, binary_path):
+    """Convert a JSON screenplay file to the binary format."""
+    with open(json_path, 'r', encoding='utf-8') as stream:
+        json_dict = json.load(stream)
+    document = ScreenplayDocument()
+    document.load_from_json(json_dict)
+    save_binary(document, binary_path)
+
+
+def binary_to_json(binary_path, json_path):
+    """Convert a binary screenplay file to the JSON format."""
+    with BinaryScreenplay(binary_path) as screenplay:
+        document = screenplay.load_document()
+    with open(json_path, 'w', encoding='utf-8') as stream:
+        document.write_json(stream)
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) != 3:
+        sys.exit('usage: binaryformat.py SOURCE DESTINATION\n'
+                 'Converts between JSON and binary ({}) screenplay files.'
+                 .format(BINARY_EXTENSION))
+    source, destination = sys.argv[1:]
+    if is_binary_file(source):
+        binary_to_json(source, destination)
+    else:
+        json_to_binary(source, destination)
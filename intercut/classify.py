@@ -0,0 +1,137 @@
+"""Give the paragraphs of plain text their element types.
+
+Text pasted from an email or a word processor, or imported from a plain text
+file, has no element types: it is only paragraphs, one per line. classify
+guesses the type of each one from the conventions of screenplay formatting,
+in a single pass with one paragraph of look ahead:
+
+- A paragraph starting with INT., EXT., INT./EXT., I/E or EST. is a
+  SceneHeading.
+- A paragraph in parentheses within dialogue is a Parenthetical.
+- The paragraph following a Character or a Parenthetical is Dialogue.
+- A paragraph in capitals, that does not end like a sentence or a transition
+  (CUT TO:) and is directly followed by another paragraph, is a Character.
+- Anything else is Action.
+
+A blank line ends the dialogue it follows. classify_scenes groups the
+classified paragraphs into SceneModels as they stream past, starting a new
+scene at each SceneHeading, so a whole draft is converted in one pass
+without ever holding the text itself.
+
+Example:
+    >>> text = ['INT. KITCHEN - NIGHT', '', 'Bob stirs a pot.', '', 'BOB',
+    ...         '(tasting)', 'Needs salt.']
+    >>> for element_type, raw_text in classify(text):
+    ...     print(element_type, raw_text)
+    SceneHeading INT. KITCHEN - NIGHT
+    Action Bob stirs a pot.
+    Character BOB
+    Parenthetical tasting
+    Dialogue Needs salt.
+"""
+from model import ScreenplayDocument, SceneModel, ElementRecord
+
+import re
+
+# Files with this extension are imported as plain text; see read_document.
+TEXT_EXTENSION = '.txt'
+
+HEADING = re.compile(r'(?:INT\.?/EXT|EXT\.?/INT|I/E|INT|EXT|EST)[.\s]',
+                     re.IGNORECASE)
+
+# How sentences, shouted action (BOOM!) and transitions (CUT TO:) end. A
+# character cue ends with a name, or the extension after it: BOB (V.O.)
+SENTENCE_ENDS = '.!?:;,'
+
+# The types of element a Parenthetical can follow.
+DIALOGUE_TYPES = ('Character', 'Parenthetical', 'Dialogue')
+
+
+def is_heading(text):
+    return HEADING.match(text) is not None
+
+
+def is_character(text):
+    return text.isupper() and text[-1] not in SENTENCE_ENDS
+
+
+def is_parenthetical(text):
+    return text.startswith('(') and text.endswith(')')
+
+
+def element_type_of(text, following, previous):
+    """Return the element type of the paragraph text.
+
+    Args:
+        text (str): The stripped paragraph; not blank.
+        following (str): The stripped line after it. Blank if the paragraph
+            ends a block or the text.
+        previous (str): The element type of the paragraph before it in the
+            same block, or None.
+    """
+    if is_heading(text):
+        return 'SceneHeading'
+    if previous in DIALOGUE_TYPES and is_parenthetical(text):
+        return 'Parenthetical'
+    if previous in ('Character', 'Parenthetical'):
+        return 'Dialogue'
+    if following and is_character(text) and not is_heading(following):
+        return 'Character'
+    return 'Action'
+
+
+def classify(lines, previous=None):
+    """Yield an (element type, raw text) pair per paragraph of lines.
+
+    Blank lines are skipped. The raw text of a Parenthetical does not
+    include the parentheses, which the element adds itself.
+
+    Args:
+        lines: An iterable of strings, one per line, e.g. a text file.
+        previous (str): The element type of the element the text follows,
+            if any, so that text pasted after a Character is Dialogue.
+    """
+    current = None
+    for line in lines:
+        line = line.strip()
+        if current is not None:
+            previous = element_type_of(current, line, previous)
+            yield previous, raw_text_of(previous, current)
+        current = line or None
+        if not line:
+            previous = None
+    if current is not None:
+        previous = element_type_of(current, '', previous)
+        yield previous, raw_text_of(previous, current)
+
+
+def raw_text_of(element_type, text):
+    if element_type == 'Parenthetical':
+        return text[1:-1].strip()
+    return text
+
+
+def classify_scenes(lines):
+    """Yield a new SceneModel for each scene of the text in lines.
+
+    Every SceneHeading starts a scene. Any text before the first heading
+    makes a scene of its own.
+    """
+    scene = None
+    for element_type, raw_text in classify(lines):
+        if scene is None or element_type == 'SceneHeading' and scene.elements:
+            if scene is not None:
+                yield scene
+            scene = SceneModel()
+        scene.elements.append(ElementRecord(element_type, raw_text, scene))
+    if scene is not None:
+        yield scene
+
+
+def read_document(lines):
+    """Return a ScreenplayDocument holding the classified text of lines."""
+    document = ScreenplayDocument()
+    for scene in classify_scenes(lines):
+        scene.document = document
+        document.scenes.append(scene)
+    return document
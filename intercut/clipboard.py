@@ -0,0 +1,89 @@
+"""Copy and paste elements with their types.
+
+The system clipboard only holds plain text, one line per element, which is
+what other applications get. Along with it, the ElementClipboard keeps the
+copied elements themselves as JSON, in the shape of Element.get_json. When
+the text pasted back is the text that was copied, the elements come back
+with their types; text copied from anywhere else is split into paragraphs,
+whose types are guessed (see classify.py).
+
+Example:
+    >>> clipboard = ElementClipboard()
+    >>> text = clipboard.copy([{'type': 'Character', 'raw_text': 'Bob'},
+    ...                        {'type': 'Dialogue', 'raw_text': 'Hi.'}])
+    >>> text
+    'Bob\\nHi.'
+    >>> [element['type'] for element in clipboard.paste(text)]
+    ['Character', 'Dialogue']
+    >>> pasted = clipboard.paste('INT. HOUSE\\r\\n\\r\\nBOB\\nHello?')
+    >>> [element['type'] for element in pasted]
+    ['SceneHeading', 'Character', 'Dialogue']
+"""
+from classify import classify
+
+import json
+
+
+def plain_elements(text, element_type=None):
+    """Return the paragraphs of text as elements, with guessed types.
+
+    Each non-blank line is a paragraph. The blank lines are only dropped
+    once the paragraphs are classified, since they end dialogue.
+
+    Args:
+        text (str): Plain text.
+        element_type (str): The type of the element the text is pasted into,
+            if any. The first paragraph goes into that element, so it keeps
+            its type and the others are classified as following it.
+    """
+    lines = iter(text.replace('\r\n', '\n').split('\n'))
+    elements = []
+    if element_type is not None:
+        for line in lines:
+            if line.strip():
+                elements.append({'type': element_type, 'raw_text': line})
+                break
+    elements.extend({'type': paragraph_type, 'raw_text': raw_text}
+                    for paragraph_type, raw_text
+                    in classify(lines, previous=element_type))
+    return elements
+
+
+class ElementClipboard:
+    """The elements last copied, and the plain text put on the system
+    clipboard for them.
+
+    Attributes:
+        text (str): The plain text of the copied elements.
+        data (str): The copied elements, as a JSON list.
+    """
+
+    def __init__(self):
+        self.text = None
+        self.data = None
+
+    def copy(self, elements):
+        """Keep elements (dicts like Element.get_json) and return the plain
+        text to put on the system clipboard."""
+        self.data = json.dumps(elements)
+        self.text = '\n'.join(element['raw_text'] for element in elements)
+        return self.text
+
+    def paste(self, text, element_type=None):
+        """Return the elements text stands for.
+
+        Args:
+            text (str): The text on the system clipboard.
+            element_type (str): The type of the element pasted into; see
+                plain_elements.
+
+        Returns:
+            list: Dicts like Element.get_json.
+        """
+        if text is not None and text == self.text:
+            return json.loads(self.data)
+        return plain_elements(text or '', element_type)
+
+
+# Shared by every element, like the system clipboard.
+clipboard = ElementClipboard()
@@ -2,13 +2,10 @@ from kivy.uix.textinput import TextInput
 from kivy.core.window import EventLoop
 
 from tools import stringmanip
+from tools.wordwrap import FL_IS_LINEBREAK, tokenize, wrap_paragraph
 
 import re
 
-FL_IS_LINEBREAK = 0x01
-FL_IS_WORDBREAK = 0x02
-FL_IS_NEWLINE = FL_IS_LINEBREAK | FL_IS_WORDBREAK
-
 
 class CoreInput(TextInput):
 
@@ -106,7 +103,6 @@ class CoreInput(TextInput):
         self.cursor = self.get_cursor_from_index(ci + len_str)
         # handle undo and redo
         self._set_unredo_insert(ci, ci + len_str, substring, from_undo)
-        print(self.text)
 
     def _split_smart(self, text):
         # Do a "smart" split. If autowidth or autosize is set,
@@ -120,70 +116,25 @@ class CoreInput(TextInput):
             lines_flags = [0] + [FL_IS_LINEBREAK] * (len(lines) - 1)
             return lines, lines_flags
 
-        # no autosize, do wordwrap.
-        x = flags = 0
-        line = []
+        # no autosize, do wordwrap, one paragraph at a time. Paragraphs are
+        # wrapped through a cache, so refreshing the whole text only
+        # rewraps the paragraphs that changed.
         lines = []
         lines_flags = []
-        _join = u''.join
-        lines_append, lines_flags_append = lines.append, lines_flags.append
         width = self.wrap_length
-
-        # try to add each word on current line.
-        for word in self._tokenize(text):
-            is_newline = (word == u'\n')
-            w = len(word)
-            # if we have more than the width, or if it's a newline,
-            # push the current line, and create a new one
-            if (x + w > width and line) or is_newline:
-                lines_append(_join(line))
-                lines_flags_append(flags)
-                flags = 0
-                line = []
-                x = 0
-            if is_newline:
-                flags |= FL_IS_LINEBREAK
-            elif w > width:
-                while w > width:
-                    split_width = split_pos = 0
-                    # split the word
-                    for c in word:
-                        cw = len(c)
-                        if split_width + cw > width:
-                            break
-                        split_width += cw
-                        split_pos += 1
-                    if split_width == split_pos == 0:
-                        # can't fit the word in, give up
-                        break
-                    lines_append(word[:split_pos])
-                    lines_flags_append(flags)
-                    flags = FL_IS_WORDBREAK
-                    word = word[split_pos:]
-                    w -= split_width
-                x = w
-                line.append(word)
-            else:
-                x += w
-                line.append(word)
-        if line or flags & FL_IS_LINEBREAK:
-            lines_append(_join(line))
-            lines_flags_append(flags)
+        for index, paragraph in enumerate(text.split(u'\n')):
+            paragraph_lines, paragraph_flags = wrap_paragraph(paragraph, width)
+            lines.extend(paragraph_lines)
+            lines_flags.extend(paragraph_flags)
+            if index:
+                lines_flags[-len(paragraph_flags)] |= FL_IS_LINEBREAK
         return lines, lines_flags
 
     def _tokenize(self, text):
         # Tokenize a text string from some delimiters
         if text is None:
-            return
-        delimiters = u' \n\r\t'
-        oldindex = 0
-        for index, char in enumerate(text):
-            if char not in delimiters:
-                continue
-            if char == ' ':
-                yield text[oldindex:index + 1]
-            oldindex = index + 1
-        yield text[oldindex:]
+            return []
+        return tokenize(text)
 
     def get_lines(self):
         """Return the number of lines of the element."""
@@ -141,6 +141,7 @@ class ElementBehavior(object):
         if start_index != end_index:
             s = self.text[start_index:end_index]
             self._set_unredo_delsel(start_index, end_index, s, from_undo=False)
+            self._pending_delete = start_index  # See RawTextBehavior.raw_contraction
             self.text = self.text[:start_index] + self.text[end_index:]
             self._set_cursor(pos=start_cursor)
 
@@ -156,5 +157,6 @@ class ElementBehavior(object):
         if start_index != end_index:
             s = self.text[end_index:start_index]
             self._set_unredo_delsel(end_index, start_index, s, from_undo=False)
+            self._pending_delete = end_index  # See RawTextBehavior.raw_contraction
             self.text = self.text[:end_index] + self.text[start_index:]
             self._set_cursor(pos=end_cursor)
@@ -18,31 +18,121 @@ Parenthetical:
 from functools import partial
 import os.path
 
-from suggest import DropSuggestion, SuggestionButton
-from kivy.properties import NumericProperty, StringProperty
+from kivy.clock import Clock
+from kivy.properties import AliasProperty, NumericProperty
 from kivy.lang import Builder
 from kivy.uix.dropdown import DropDownException
 
 from elementbehavior import ElementBehavior
 from coreinput import CoreInput
-
-from collections import OrderedDict
+from model import ElementRecord
+from clipboard import clipboard
+from tools.nameregistry import NameRegistry, normalize
+from tools.stringmanip import changed_span, upper
 
 kivy_file = os.path.splitext(os.path.abspath(__file__))[0] + '.kv'
 Builder.load_file(kivy_file)
 
+# The suggestion drop down never lists more options than this.
+MAX_SUGGESTIONS = 10
+
+
+class RawTextBehavior(object):
+    """Keep the record of a text input in step with its displayed text.
+
+    Mixed into Element and RecycledElement (see virtualview.py), which
+    display the raw text of self.record, formatted, with raw_offset
+    characters of decoration on either side. Insertions go into the record
+    through insert_raw; deletions are cut from it by raw_contraction, which
+    must be bound to on_text. Either way the record is edited in place
+    rather than rebuilt (see ElementRecord.edit).
+    """
 
-class Element(ElementBehavior, CoreInput):
+    # Number of characters the displayed text has before the raw text, e.g.
+    # the opening parenthesis of a Parenthetical.
+    raw_offset = 0
+
+    # Set while text is loaded rather than typed; see Element.load_text.
+    _loading = False
+
+    # Where the deletion in progress starts in the text; see
+    # raw_contraction.
+    _pending_delete = None
+
+    def raw_contraction(self):
+        """Remove from raw_text what was just deleted from the text.
+
+        Bound to on_text. Deletions made through do_backspace,
+        delete_selection or the delete word shortcuts note where they start
+        in _pending_delete, so only the deleted characters are cut from the
+        record. Other changes to the text fall back on comparing it with
+        the raw text as it is displayed (see stringmanip.changed_span), which
+        format_text keeps the same length as the raw text.
+        """
+        start = self._pending_delete
+        self._pending_delete = None
+        if self._loading:
+            return
+        record = self.record
+        raw_length = record.text_length()
+        cut_len = raw_length - (len(self.text) - 2 * self.raw_offset)
+        if cut_len <= 0:
+            return
+        if start is None:
+            offset = self.raw_offset
+            text = self.text[offset:len(self.text) - offset]
+            shown = self.format_text(self.raw_text)
+            shown = shown[offset:len(shown) - offset]
+            start, end, new_end = changed_span(shown, text)
+            record.edit(start, end, text[start:new_end])
+            return
+        start = min(max(start - self.raw_offset, 0), raw_length - cut_len)
+        record.edit(start, start + cut_len, '')
+
+    def do_backspace(self, from_undo=False, mode='bkspc'):
+        index = self.cursor_index()
+        if index:
+            self._pending_delete = index - 1
+        super().do_backspace(from_undo=from_undo, mode=mode)
+        self._pending_delete = None
+
+    def delete_selection(self, from_undo=False):
+        if self._selection:
+            self._pending_delete = min(self._selection_from,
+                                       self._selection_to)
+        super().delete_selection(from_undo=from_undo)
+        self._pending_delete = None
+
+    def insert_raw(self, substring):
+        """Insert substring into raw_text at the cursor."""
+        index = self.cursor_index() - self.raw_offset
+        self.record.edit(index, index, substring)
+
+
+class Element(RawTextBehavior, ElementBehavior, CoreInput):
 
     """A base class for all of the individual elements."""
 
     element_index = NumericProperty()
+
+    def _get_raw_text(self):
+        return self.record.raw_text
+
+    def _set_raw_text(self, value):
+        self.record.raw_text = value
+        return True
+
     # TextInput.text is the displayed text. It will have formatting in it such
     # as capitalizations and wrapping newline characters. This text will remain
-    # unformatted in the background.
-    raw_text = StringProperty()
-
-    def __init__(self, **kwargs):
+    # unformatted in the background, in the record (see model.py), and is only
+    # put together as a string when it is read.
+    raw_text = AliasProperty(_get_raw_text, _set_raw_text, cache=False)
+
+    def __init__(self, record=None, **kwargs):
+        # The record is where raw_text is actually stored; see model.py.
+        if record is None:
+            record = ElementRecord(self.__class__.__name__)
+        self.record = record
         super().__init__(**kwargs)
         # This will be used to track the elements location in the SP directly.
         self.element_index = 0
@@ -64,6 +154,8 @@ class Element(ElementBehavior, CoreInput):
             8, modifier='ctrl', callback=self.delete_word_left)
         self.register_shortcut(  # 'ctrl' + delete
             127, modifier='ctrl', callback=self.delete_word_right)
+        self.register_shortcut(  # 'ctrl' + a
+            97, modifier='ctrl', callback=self.select_more)
 
         # Transformation shortcuts
         self.register_shortcut(  # 'alt' + a
@@ -88,6 +180,89 @@ class Element(ElementBehavior, CoreInput):
         new_element = new_type()
         scene.transform_element(source_element=self, new_element=new_element)
 
+    def get_screenplay(self):
+        scene = self.parent
+        return None if scene is None else scene.parent
+
+    def select_more(self):
+        """Select all of the text, or the whole screenplay if all of the text
+        is selected already."""
+        screenplay = self.get_screenplay()
+        if self.selection_text != self.text or screenplay is None:
+            self.select_all()
+        else:
+            screenplay.select_document()
+
+    def delete_document_selection(self):
+        """Delete the selection if it spans several elements (see
+        Screenplay.delete_selection).
+
+        Returns:
+            Element: The element with the cursor afterwards, or None if there
+                was no such selection.
+        """
+        screenplay = self.get_screenplay()
+        if screenplay is None:
+            return None
+        return screenplay.delete_selection()
+
+    def copy(self, data=''):
+        """Copy data, or else the selection with the type of each element
+        (see clipboard.py)."""
+        if data:
+            super().copy(data=data)
+            return
+        screenplay = self.get_screenplay()
+        elements = None if screenplay is None \
+            else screenplay.get_selection_elements()
+        if elements is None:
+            if not self._selection:
+                return
+            json_dict = self.record.get_json()
+            json_dict['raw_text'] = self.get_raw_selection_text()
+            elements = [json_dict]
+        super().copy(data=clipboard.copy(elements))
+
+    def cut(self):
+        self.copy()
+        if self.delete_document_selection() is None:
+            self.delete_selection()
+
+    def paste(self):
+        """Paste the clipboard, as new elements if it holds several.
+
+        Elements copied from a screenplay keep their types. The types of
+        plain text paragraphs are guessed; see clipboard.plain_elements.
+        """
+        from kivy.core.clipboard import Clipboard
+        elements = clipboard.paste(Clipboard.paste(), self.record.element_type)
+        if len(elements) < 2:
+            # A single paragraph goes in without the line breaks around it.
+            self.delete_selection()
+            if elements:
+                self.insert_text(elements[0]['raw_text'])
+            return
+        element = self.delete_document_selection()
+        if element is not None and element is not self:
+            element.paste()
+            return
+        self.delete_selection()
+        self.parent.paste_elements(self, elements)
+
+    def keyboard_on_key_down(self, window, keycode, text, modifiers):
+        # Backspace and delete (with any modifier) delete a selection spanning
+        # several elements before any shortcut sees them.
+        if keycode[0] in (8, 127) and \
+                self.delete_document_selection() is not None:
+            return True
+        return super().keyboard_on_key_down(window, keycode, text, modifiers)
+
+    def keyboard_on_textinput(self, window, text):
+        element = self.delete_document_selection()
+        if element is not None and element is not self:
+            return element.keyboard_on_textinput(window, text)
+        return super().keyboard_on_textinput(window, text)
+
     def get_location(self):
         """Retrieve the coordinates of this element.
         
@@ -101,34 +276,44 @@ class Element(ElementBehavior, CoreInput):
         scene = self.parent
         scene.next_element(self)
 
+    def get_adjacent_element(self, step):
+        """Return the element step places away in the screenplay, or None.
+
+        Crosses scene boundaries, so pressing down on the last element of a
+        scene reaches the heading of the next one.
+
+        Args:
+            step (int): 1 for the following element, -1 for the preceding.
+        """
+        screenplay = self.parent.parent
+        position = screenplay.get_position(self) + step
+        if position < 0:
+            return None
+        try:
+            return screenplay.get_element_at(position)
+        except IndexError:
+            return None
+
     def press_down(self):
         c_row = self.cursor[1]
         rows = self.get_lines()
-        scene = self.parent
-        elem_index = self.element_index
 
         if rows == c_row + 1:
-            # if element is at the bottom of the Scene
-            if elem_index == 0:
-                return True
-            else:
-                to_focus = scene.children[elem_index - 1]
+            to_focus = self.get_adjacent_element(1)
+            if to_focus is not None:
                 to_focus.focus = True
-                return True
+            return True
 
     def press_up(self):
         c_row = self.cursor[1]
-        scene = self.parent
-        elem_index = self.element_index
 
         # If we are not at the top line...
         if not c_row:
-            try:
-                to_focus = scene.children[elem_index + 1]
-                to_focus.focus = True
-                return True
-            except IndexError:
+            to_focus = self.get_adjacent_element(-1)
+            if to_focus is None:
                 return False
+            to_focus.focus = True
+            return True
 
     def on_backspace(self):
         """Handle special backspace cases.
@@ -157,36 +342,21 @@ class Element(ElementBehavior, CoreInput):
         """Return the length of the text string for an element."""
         return len(self.text)
 
-    def raw_contraction(self):
-        # TODO: Rework this a little (it is bound to on_text)
-        if isinstance(self, Parenthetical):
-            text = self.cut_text_parenthesis()
-        else:
-            text = self.text
+    def load_text(self, raw_text):
+        """Display raw_text without running any of the on_text handlers.
 
-        len_txt = len(text)
-        len_raw = len(self.raw_text)
-        raw_text = self.raw_text
-
-        if len_raw > len_txt:
-            cut_len = len_raw - len_txt
-            slice_to = 0
-            try:
-                for index, char in enumerate(self.raw_text):
-                    if char.upper() != text[index].upper():
-                        slice_to = index
-                        break
-            except IndexError:
-                slice_to = len_txt
-            self.raw_text = raw_text[:slice_to] + raw_text[slice_to + cut_len:]
+        Used when elements are built from a document, where the text is
+        already known to be in sync with raw_text and where building
+        suggestions for every heading and character would be wasted work.
+        """
+        self._loading = True
+        self.raw_text = raw_text
+        self.text = self.format_text(raw_text)
+        self._loading = False
 
     def insert_text(self, substring, from_undo=False):
         """Capitalize scene heading."""
-        print('element.insert_text')
-        raw_text = self.raw_text
-        slice_to = self.cursor_index()
-        self.raw_text = raw_text[:slice_to] + substring + raw_text[
-                                                          slice_to:]
+        self.insert_raw(substring)
         super().insert_text(substring=substring, from_undo=from_undo)
 
     def core_insert(self, substring, from_undo=False):
@@ -214,13 +384,13 @@ class Element(ElementBehavior, CoreInput):
         """
         pass
 
-    def get_json(self):
-        json_dict = OrderedDict()
-
-        json_dict['type'] = self.__class__.__name__
-        json_dict['raw_text'] = self.raw_text
+    @staticmethod
+    def format_text(raw_text):
+        """Return raw_text the way this element displays it."""
+        return raw_text
 
-        return json_dict
+    def get_json(self):
+        return self.record.get_json()
 
 
 class SuggestiveElement(Element):
@@ -229,13 +399,18 @@ class SuggestiveElement(Element):
     This class is designed for Character and SceneHeading elements with the
     intent that they will provide a DropDown list of already established
     characters and locations as the user types.
+
+    The DropDown belongs to the Screenplay, which has a single one for all
+    of its elements (see Screenplay.get_drop_down); it is attached to an
+    element when that element needs to show suggestions.
     """
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.drop_down = DropSuggestion()
-        self.init_drop_down()
-        self.source = []  # Reassign in subclasses
+        self.source = NameRegistry()  # Reassign in subclasses
+        # Typing several characters in one frame refreshes the suggestions
+        # only once.
+        self._refresh_trigger = Clock.create_trigger(self.refresh_suggestions)
 
         self.register_shortcut(
             273, self.on_arrow_up
@@ -247,49 +422,55 @@ class SuggestiveElement(Element):
         # TODO: To navigate through buttons
 
     def on_arrow_down(self):
-        if self.drop_down.is_open:
-            self.drop_down.move_highlight(increment=1)
+        dd = self.attached_drop_down()
+        if dd is not None and dd.is_open:
+            dd.move_highlight(increment=1)
         else:
             self.press_down()
 
     def on_arrow_up(self):
-        if self.drop_down.is_open:
-            self.drop_down.move_highlight(increment=-1)
+        dd = self.attached_drop_down()
+        if dd is not None and dd.is_open:
+            dd.move_highlight(increment=-1)
         else:
             self.press_up()
 
-    def init_drop_down(self):
-        """Handle binding for drop down menu."""
-        dd = self.drop_down
-        dd.bind(on_select=self.on_select)
+    def get_drop_down(self):
+        """Return the screenplay's DropDown, attached to this element."""
+        return self.parent.parent.get_drop_down(self)
+
+    def attached_drop_down(self):
+        """Return the screenplay's DropDown if it is attached to this element,
+        otherwise None."""
+        scene = self.parent
+        screenplay = scene.parent if scene is not None else None
+        if screenplay is None:
+            return None
+        dd = screenplay.drop_down
+        if dd is not None and dd.owner is self:
+            return dd
+        return None
+
+    def dismiss_suggestions(self):
+        dd = self.attached_drop_down()
+        if dd is not None:
+            dd.dismiss()
+            dd.owner = None
 
     def update_options(self):
-        """When drop_source changes, update DropDown options.
-        
-        Args:
-            instance: 
-                Catches another instance of self passed by the event handler.
-            suggestions: 
-                The actual list of established characters/locations
-        """
-        suggestions = self.filtered_options()
-        dd = self.drop_down
-        dd.clear_widgets()
-        for suggestion in suggestions:
-            button = SuggestionButton(text=suggestion)
-            button.bind(on_release=lambda btn: dd.select(btn.text))
-            dd.add_widget(button)
+        """Show the options matching the entered text in the DropDown."""
+        self.get_drop_down().set_options(self.filtered_options())
 
     def filtered_options(self):
-        """Filter the list of possible options based on entered text."""
-        options = self.source
-        lower_text = (self.text).lower()
-        filtered = []
-        for option in options:
-            lower_option = option.lower()
-            if lower_option.startswith(lower_text):
-                filtered.append(option)
-        return filtered
+        """Return the options starting with the entered text (any case),
+        most likely first."""
+        return self.source.rank(self.text, limit=MAX_SUGGESTIONS,
+                                preferred=self.likely_names())
+
+    def likely_names(self):
+        """Return the names the context makes most likely, most likely
+        first. See NameRegistry.rank."""
+        return ()
 
     def on_select(self, instance, text):
         """Change Element text to selected text."""
@@ -297,34 +478,54 @@ class SuggestiveElement(Element):
         self.insert_text(substring=text, from_undo=False)
         super().on_enter()
 
+    def on_focus(self, instance, focused):
+        """Register the name once the user is done typing it."""
+        scene = self.parent
+        if not focused and scene is not None and scene.parent is not None:
+            self.update_selections()
+
     def on_text(self, instance, value):
         """Live update the drop down during typing."""
-        text = self.text
-        if text:
+        if self._loading:
+            return
+        self._refresh_trigger()
+
+    def refresh_suggestions(self, *args):
+        """Bring the drop down up to date with the entered text."""
+        if not self.focus or self.parent is None:
+            # The user moved on before the refresh ran.
+            return
+        if self.text:
             self.update_options()
+            dd = self.get_drop_down()
             try:
-                self.drop_down.open(self)
-                self.drop_down.set_highlight()
+                dd.open(self)
+                dd.set_highlight()
             except DropDownException:
-                self.drop_down.dismiss()
+                dd.dismiss()
         else:
-            self.drop_down.dismiss()
+            self.dismiss_suggestions()
 
     def on_enter(self):
         """Enter the top level option into the element."""
-        dd = self.drop_down
-        suggestions = dd.container.children
-        if dd.is_open and suggestions:
-            text = self.drop_down.get_selection_text()
+        if self._refresh_trigger.is_triggered:
+            # Enter was pressed in the same frame as the last keystroke.
+            self._refresh_trigger.cancel()
+            self.refresh_suggestions()
+        dd = self.attached_drop_down()
+        if dd is not None and dd.is_open and dd.option_count:
+            text = dd.get_selection_text()
             dd.select(text)
         else:
             super().on_enter()
 
+    @staticmethod
+    def format_text(raw_text):
+        return upper(raw_text)
+
     def insert_text(self, substring, from_undo=False):
-        raw_text = self.raw_text
-        slice_to = self.cursor_index()
-        self.raw_text = raw_text[:slice_to] + substring + raw_text[slice_to:]
-        insert = substring.upper()
+        self.insert_raw(substring)
+        insert = upper(substring)
         super().core_insert(substring=insert, from_undo=from_undo)
         return
 
@@ -351,17 +552,15 @@ class SceneHeading(SuggestiveElement):
 
     def integrate(self):
         screenplay = self.parent.parent
-        self.source = screenplay.locations
+        self.source = screenplay.location_names
 
     def update_selections(self):
         '''Update the list of SceneHeadings in use.'''
-        location = self.raw_text
-        scene = self.parent
-        screenplay = scene.parent
-        screenplay.update_locations(new_location=location)
+        screenplay = self.parent.parent
+        screenplay.update_locations(self.record)
 
     def next_element(self):
-        self.drop_down.dismiss()
+        self.dismiss_suggestions()
         return Action()
 
     def tab_to(self):
@@ -380,16 +579,56 @@ class Character(SuggestiveElement):
     def integrate(self):
         """Initialization for after Character is added to the widget tree."""
         screenplay = self.parent.parent
-        self.source = screenplay.characters
+        self.source = screenplay.character_names
 
     def update_selections(self):
-        character = self.raw_text
+        screenplay = self.parent.parent
+        screenplay.update_characters(self.record)
+
+    _likely_names = None
+
+    def likely_names(self):
+        """Return the speaker before the last one in the scene, then the
+        last speaker: dialogue usually goes back and forth between two
+        characters.
+
+        The elements above do not change while this one is typed in, so
+        the speakers are looked up once per focus, walking back from
+        element_index.
+        """
+        if self._likely_names is None:
+            self._likely_names = self.find_speakers()
+        return self._likely_names
+
+    def find_speakers(self):
+        """Return the last two distinct speakers before this element,
+        in scene order."""
         scene = self.parent
-        screenplay = scene.parent
-        screenplay.update_characters(new_character=character)
+        if scene is None:
+            return ()
+        children = scene.children
+        speakers = []
+        keys = set()
+        # Children are in reverse order: the elements above come after.
+        for index in range(self.element_index + 1, len(children)):
+            record = children[index].record
+            if record.element_type != 'Character':
+                continue
+            key = normalize(record.raw_text)
+            if key and key not in keys:
+                keys.add(key)
+                speakers.append(record.raw_text)
+                if len(speakers) == 2:
+                    break
+        speakers.reverse()
+        return speakers
+
+    def on_focus(self, instance, focused):
+        self._likely_names = None
+        super().on_focus(instance, focused)
 
     def next_element(self):
-        self.drop_down.dismiss()
+        self.dismiss_suggestions()
         return Dialogue()
 
     def tab_to(self):
@@ -416,6 +655,8 @@ class Dialogue(Element):
 
 class Parenthetical(Element):
 
+    raw_offset = 1
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
@@ -462,13 +703,13 @@ class Parenthetical(Element):
 
     def insert_text(self, substring, from_undo=False):
         """Capitalize scene heading."""
-        raw_text = self.raw_text
-        # The -1 offsets the fact that an opening parenthesis leads
-        slice_to = self.cursor_index() - 1
-        self.raw_text = raw_text[:slice_to] + substring + raw_text[
-                                                          slice_to:]
+        self.insert_raw(substring)
         # Skip over Element.insert_text
         super(Element, self).insert_text(substring, from_undo=from_undo)
 
+    @staticmethod
+    def format_text(raw_text):
+        return '(' + raw_text + ')'
+
     def cut_text_parenthesis(self):
         return self.text[1: -1]
@@ -0,0 +1,366 @@
+"""Read and write screenplays in the Fountain plain text format.
+
+Fountain (https://fountain.io) is the plain text markup most screenwriting
+applications exchange scripts in. Elements are separated by blank lines and
+recognized by their form: scene headings start with INT. or EXT., character
+cues are in capitals and directly followed by their dialogue, parentheticals
+are in parentheses. Markers force an element's type where its form is not
+enough: '.' for a scene heading, '@' for a character, '!' for action.
+
+Both directions stream. FountainReader consumes its lines one at a time as
+elements are asked for, and iter_fountain yields the lines of a document one
+element at a time, so converting a whole script never holds more than a
+line of it (and, through FountainReader.scenes, one scene).
+
+Only the element types this application has are read: transitions, centered
+text and lyrics become Action; sections, synopses, page breaks, notes and
+boneyard (/* */) text are dropped. Scene titles, notes and colors are not
+written. Each line of an action or dialogue block is an element of its own,
+as elements are single paragraphs, so converting a document to Fountain and
+back keeps its elements as they were. The exceptions are empty elements,
+which are left out, and dialogue entirely in parentheses, which reads back
+as a Parenthetical.
+
+Example:
+    >>> reader = FountainReader(['Title: Soup', 'Author: Ann', '',
+    ...                          'INT. KITCHEN - NIGHT', '',
+    ...                          'BOB', '(tasting)', 'Needs salt.'])
+    >>> for element_type, raw_text in reader.elements():
+    ...     print(element_type, raw_text)
+    SceneHeading INT. KITCHEN - NIGHT
+    Character BOB
+    Parenthetical tasting
+    Dialogue Needs salt.
+    >>> reader.title_page
+    {'title': 'Soup', 'author': 'Ann'}
+"""
+from model import ScreenplayDocument, SceneModel, ElementRecord
+from classify import is_heading, is_parenthetical
+
+from itertools import chain
+import json
+import os
+import re
+
+FOUNTAIN_EXTENSION = '.fountain'
+
+# A title page field: the key starts the line, its value may continue on the
+# indented lines after it.
+TITLE_KEY = re.compile(r'([A-Za-z][A-Za-z -]*):(.*)')
+# The keys a title page can start with. Any key may follow them, but a
+# script without a title page may well start with FADE IN:
+TITLE_PAGE_KEYS = {'title', 'credit', 'author', 'authors', 'source',
+                   'draft date', 'date', 'contact', 'copyright', 'notes',
+                   'revision', 'email', 'e-mail', 'phone'}
+# What can follow the '.' forcing a scene heading ('...' is just an
+# ellipsis).
+FORCED_HEADING = re.compile(r'\.[^.]')
+SCENE_NUMBER = re.compile(r'\s*#[^#]*#$')
+NOTE = re.compile(r'\[\[.*?\]\]')
+PHONE = re.compile(r'\+?[\d\s().-]{7,}$')
+
+# The types of element that continue a dialogue block.
+DIALOGUE_TYPES = ('Character', 'Parenthetical', 'Dialogue')
+# Lines starting with these are not Action unless forced with '!'.
+MARKERS = '!@.~=#>'
+# Lines starting with these are left out of the script.
+OMITTED = ('#', '=')
+
+
+def element_type_of(text, following, previous):
+    """Return the element type of a line of the script.
+
+    Args:
+        text (str): The stripped line; not blank.
+        following (str): The stripped line after it.
+        previous (str): The element type of the line before it in the same
+            block, or None for the first line of a block.
+    """
+    if previous in DIALOGUE_TYPES:
+        return 'Parenthetical' if is_parenthetical(text) else 'Dialogue'
+    if text.startswith('!'):
+        return 'Action'
+    if text.startswith('@'):
+        return 'Character'
+    if FORCED_HEADING.match(text) is not None or is_heading(text):
+        return 'SceneHeading'
+    if previous is None and following and text.isupper():
+        return 'Character'
+    return 'Action'
+
+
+def raw_text_of(element_type, text):
+    """Return the raw text of a line, without its Fountain markup."""
+    if element_type == 'Parenthetical':
+        return text[1:-1].strip()
+    if element_type == 'Character':
+        if text.startswith('@'):
+            text = text[1:]
+        return text.rstrip('^').strip()
+    if element_type == 'SceneHeading':
+        if text.startswith('.'):
+            text = text[1:]
+        return SCENE_NUMBER.sub('', text)
+    if element_type == 'Action':
+        if text.startswith('>') and text.endswith('<'):
+            return text[1:-1].strip()
+        if text[0] in '!>~':
+            return text[1:].strip()
+    return text
+
+
+class FountainReader:
+    """Read a Fountain screenplay from an iterable of lines (such as a text
+    file), one line at a time.
+
+    Attributes:
+        title_page (dict): The title page fields by lower case key, once
+            read_title_page (or elements) has read them. Values that span
+            several lines hold one line each, separated by newlines.
+
+    Example:
+        with open(path, encoding='utf-8-sig') as stream:
+            for scene in FountainReader(stream).scenes():
+                ...
+    """
+
+    def __init__(self, lines):
+        self.lines = iter(lines)
+        self.title_page = None
+        # The line read past the end of the title page, if it was not blank.
+        self._next_line = None
+
+    def read_title_page(self):
+        """Read the title page, if the script starts with one.
+
+        Returns:
+            dict: See title_page.
+        """
+        if self.title_page is not None:
+            return self.title_page
+        fields = {}
+        key = None
+        for line in self.lines:
+            match = TITLE_KEY.match(line)
+            name = match and match.group(1).strip().lower()
+            if match is not None and (fields or name in TITLE_PAGE_KEYS):
+                key = name
+                value = match.group(2).strip()
+                fields[key] = [value] if value else []
+            elif key is not None and line[:1] in (' ', '\t') and line.strip():
+                fields[key].append(line.strip())
+            else:
+                if line.strip():
+                    self._next_line = line
+                break
+        self.title_page = {key: '\n'.join(values)
+                           for key, values in fields.items()}
+        return self.title_page
+
+    def elements(self):
+        """Yield an (element type, raw text) pair per element of the script,
+        in order."""
+        self.read_title_page()
+        lines = self.lines
+        if self._next_line is not None:
+            lines = chain([self._next_line], lines)
+            self._next_line = None
+
+        previous = None
+        current = None
+        in_boneyard = False
+        for line in lines:
+            line, in_boneyard = strip_boneyard(line, in_boneyard)
+            line = NOTE.sub('', line).strip()
+            if line.startswith(OMITTED):
+                line = ''
+            if current is not None:
+                previous = element_type_of(current, line, previous)
+                yield previous, raw_text_of(previous, current)
+            current = line or None
+            if not line:
+                previous = None
+        if current is not None:
+            previous = element_type_of(current, '', previous)
+            yield previous, raw_text_of(previous, current)
+
+    def scenes(self):
+        """Yield a new SceneModel for each scene of the script.
+
+        Every SceneHeading starts a scene. Any elements before the first
+        heading make a scene of their own.
+        """
+        scene = None
+        for element_type, raw_text in self.elements():
+            if scene is None or \
+                    element_type == 'SceneHeading' and scene.elements:
+                if scene is not None:
+                    yield scene
+                scene = SceneModel()
+            scene.elements.append(ElementRecord(element_type, raw_text, scene))
+        if scene is not None:
+            yield scene
+
+    def load_document(self):
+        """Read the whole script into a new ScreenplayDocument."""
+        document = ScreenplayDocument()
+        title_page = self.read_title_page()
+        apply_title_page(document, title_page)
+        for scene in self.scenes():
+            scene.document = document
+            document.scenes.append(scene)
+        return document
+
+
+def strip_boneyard(line, in_boneyard):
+    """Remove the boneyard (/* commented out */) text from a line.
+
+    Returns:
+        tuple: The rest of the line, and whether the boneyard goes on past
+            the end of it.
+    """
+    kept = ''
+    while line:
+        if in_boneyard:
+            end = line.find('*/')
+            if end < 0:
+                return kept, True
+            line = line[end + 2:]
+            in_boneyard = False
+        else:
+            start = line.find('/*')
+            if start < 0:
+                return kept + line, False
+            kept += line[:start]
+            line = line[start + 2:]
+            in_boneyard = True
+    return kept, in_boneyard
+
+
+def apply_title_page(document, title_page):
+    """Set the title page fields of document from those of a Fountain file.
+
+    The email address and phone number are taken from the Contact field when
+    they have no field of their own.
+    """
+    title = title_page.get('title')
+    if title:
+        # Titles are often underlined or bold: _**TITLE**_
+        document.title = ' '.join(line.strip('*_ ')
+                                  for line in title.split('\n'))
+    author = title_page.get('author', title_page.get('authors'))
+    if author:
+        document.author = ' '.join(author.split('\n'))
+
+    contact = title_page.get('contact', '').split('\n')
+    email = title_page.get('email', title_page.get('e-mail'))
+    phone = title_page.get('phone')
+    for line in contact:
+        if email is None and '@' in line:
+            email = line
+        elif phone is None and PHONE.match(line) is not None:
+            phone = line
+    document.email = email or ''
+    document.phone = phone or ''
+
+
+def iter_title_page(document):
+    """Yield the lines of the title page of document."""
+    yield 'Title: ' + document.title
+    yield 'Author: ' + document.author
+    contact = [value for value in (document.email, document.phone) if value]
+    if contact:
+        yield 'Contact:'
+        for value in contact:
+            yield '    ' + value
+
+
+def fountain_line(record, following_type):
+    """Return the Fountain line for an ElementRecord.
+
+    Markers are added wherever the line would otherwise be read back as
+    another type.
+
+    Args:
+        record (ElementRecord): The element to write.
+        following_type (str): The element type of the next element, or None.
+    """
+    element_type = record.element_type
+    text = record.raw_text
+    if element_type == 'SceneHeading':
+        return text if is_heading(text) else '.' + text
+    if element_type == 'Character':
+        if text.isupper() and text[0] not in MARKERS and \
+                not is_heading(text) and \
+                following_type in ('Parenthetical', 'Dialogue'):
+            return text
+        return '@' + text
+    if element_type == 'Parenthetical':
+        return '(' + text + ')'
+    if element_type == 'Action' and (text[0] in MARKERS or is_heading(text)):
+        return '!' + text
+    return text
+
+
+def iter_fountain(document):
+    """Yield the lines of document in Fountain, one element at a time.
+
+    Empty elements are left out.
+    """
+    yield from iter_title_page(document)
+    records = (record for record in document.iter_elements()
+               if record.raw_text.strip())
+    previous = None
+    record = None
+    for following in chain(records, [None]):
+        if record is not None:
+            following_type = None if following is None \
+                else following.element_type
+            # Dialogue goes on in the same block; anything else starts one.
+            if record.element_type not in ('Parenthetical', 'Dialogue') or \
+                    previous not in DIALOGUE_TYPES:
+                yield ''
+            yield fountain_line(record, following_type)
+            previous = record.element_type
+        record = following
+
+
+def write_fountain(document, stream):
+    """Write document to a text stream in Fountain."""
+    for line in iter_fountain(document):
+        stream.write(line + '\n')
+
+
+def save_fountain(document, path):
+    """Replace the file at path with document in Fountain."""
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as stream:
+        write_fountain(document, stream)
+        stream.flush()
+        os.fsync(stream.fileno())
+    os.replace(temp_path, path)
+
+
+def read_fountain(path):
+    """Read the Fountain file at path into a new ScreenplayDocument."""
+    with open(path, encoding='utf-8-sig') as stream:
+        return FountainReader(stream).load_document()
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) != 3:
+        sys.exit('usage: fountain.py SOURCE DESTINATION\n'
+                 'Converts between JSON and Fountain ({}) screenplay files.'
+                 .format(FOUNTAIN_EXTENSION))
+    source, destination = sys.argv[1:]
+    if source.endswith(FOUNTAIN_EXTENSION):
+        with open(destination, 'w', encoding='utf-8') as stream:
+            read_fountain(source).write_json(stream)
+    else:
+        with open(source, 'r', encoding='utf-8') as stream:
+            json_dict = json.load(stream)
+        document = ScreenplayDocument()
+        document.load_from_json(json_dict)
+        save_fountain(document, destination)
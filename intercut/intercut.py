@@ -9,12 +9,15 @@ from kivy.metrics import inch
 from kivy.uix.label import Label
 from kivy.core.window import Window
 from kivy.properties import ObjectProperty
+from kivy.logger import Logger
 
 import os
-import json
+from functools import partial
 
 from screenplay import Screenplay, ScrollingScreenplay
 from filebrowser import SaveDialog, LoadDialog
+from loader import ScreenplayLoader
+from autosave import Autosave, AUTOSAVE_INTERVAL
 from elementbehavior import ElementBehavior
 
 Builder.load_file(r'intercut.kv')
@@ -41,10 +44,18 @@ class ViewManager(MyTabbedPanel):
                     item.width = 0
 
     def get_screenplay(self):
+        return self.get_scrolling_screenplay().screenplay
+
+    def get_scrolling_screenplay(self):
         layout = self.default_tab_content
         for item in layout.children[:]:
             if isinstance(item, ScrollingScreenplay):
-                return item.children[0]
+                return item
+
+    def toggle_virtualized(self):
+        """Switch between the classic and the virtualized screenplay view."""
+        scrolling = self.get_scrolling_screenplay()
+        scrolling.virtualized = not scrolling.virtualized
 
 
 class ScreenplayManager(ElementBehavior, MyTabbedPanel):
@@ -92,13 +103,11 @@ class ScreenplayManager(ElementBehavior, MyTabbedPanel):
 
     def save_screenplay(self, location=None):
         screenplay = self.get_screenplay()
-        json_string = screenplay.get_json()
         save_to = screenplay.save_to
         save_path = os.path.dirname(save_to)
 
         if screenplay.save_to and (os.path.isfile(save_to) or os.path.isdir(save_path)):
-            with open(save_to, 'w') as sp_file:
-                sp_file.write(json_string)
+            screenplay.save()
         else:
             file_dialog = SaveDialog(on_selection=self.update_save_location,
                                      default_path=os.path.expanduser('~'))
@@ -129,6 +138,9 @@ class ScreenplayManager(ElementBehavior, MyTabbedPanel):
         screenplay = sp_view.get_screenplay()
         tab_header = TabbedPanelHeader(text=screenplay.title)
         tab_header.content = sp_view
+        tab_header.autosave = Autosave(screenplay, interval=AUTOSAVE_INTERVAL)
+        tab_header.autosave.bind(on_error=self.on_autosave_error)
+        tab_header.autosave.start()
         self.add_widget(tab_header)
         Window.dispatch('on_resize', None, None)
         self.switch_to(header=tab_header)
@@ -140,13 +152,38 @@ class ScreenplayManager(ElementBehavior, MyTabbedPanel):
         file_dialog.open()
 
     def fill_screenplay(self, instance, path, filename):
+        """Open a screenplay file in a new tab without blocking the UI.
+
+        The file is parsed on a worker thread and its scenes are displayed a
+        few per frame (see loader.py). The tab header shows the progress.
+        """
         screenplay = self.new_screenplay()
-        screenplay.clear_widgets()
+        tab_header = self.current_tab
         open_file = os.path.join(path, filename)
-        with open(open_file, 'r') as stream:
-            json_string = stream.read()
-        json_dict = json.loads(json_string)
-        screenplay.load_from_json(json_dict=json_dict)
+
+        loader = ScreenplayLoader(screenplay, open_file)
+        loader.bind(on_progress=partial(self.on_load_progress, tab_header),
+                    on_complete=partial(self.on_load_complete, tab_header),
+                    on_error=partial(self.on_load_error, tab_header))
+        tab_header.loader = loader
+        tab_header.text = filename
+        loader.start()
+
+    def on_load_progress(self, tab_header, loader, fraction):
+        tab_header.text = '{} ({}%)'.format(loader.document.title,
+                                            int(fraction * 100))
+
+    def on_load_complete(self, tab_header, loader):
+        tab_header.text = loader.document.title
+        tab_header.loader = None
+
+    def on_load_error(self, tab_header, loader, error):
+        print('Could not open {}: {}'.format(loader.path, error))
+        tab_header.text = 'Error'
+        tab_header.loader = None
+
+    def on_autosave_error(self, autosave, error):
+        Logger.error('Autosave: {}'.format(error))
 
     def close_current_tab(self):
         """Remove the current tab and select tab to the right. If not, left."""
@@ -154,6 +191,11 @@ class ScreenplayManager(ElementBehavior, MyTabbedPanel):
         current_tab = self.current_tab
 
         index = tab_list.index(current_tab)
+        loader = getattr(current_tab, 'loader', None)
+        if loader is not None:
+            loader.cancel()
+        current_tab.autosave.stop()
+        current_tab.content.get_screenplay().close_journal()
         self.remove_widget(current_tab)
         if index == 0:
             self.switch_to(tab_list[index])
@@ -171,6 +213,8 @@ class ScreenplayManager(ElementBehavior, MyTabbedPanel):
                     self.load_from_file()
                 if key == 119:  # 'ctrl' + w
                     self.close_current_tab()
+                if key == 108:  # 'ctrl' + l
+                    self.current_tab.content.toggle_virtualized()
 
 
 class InterXut(App):
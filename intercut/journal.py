@@ -0,0 +1,439 @@
+"""Record edits to a saved screenplay in an append-only journal.
+
+Rewriting the whole screenplay file after every edit is too expensive to do
+every few seconds, but waiting for the next Ctrl+S loses work if the app
+crashes. Instead, every edit to the document model is appended, as one line
+of JSON, to a journal file next to the screenplay file (<file>.journal).
+Each edit costs a single short write, however long the script is.
+
+Journal lines look like:
+
+    {"op":"base","digest":"..."}  first line: digest of the file it applies to
+                                  (null: the file its compaction writes)
+    {"op":"insert","scene":0,"index":3,"type":"Action","raw_text":"..."}
+    {"op":"delete","scene":0,"index":3}
+    {"op":"replace","scene":0,"index":3,"type":"Dialogue","raw_text":"..."}
+    {"op":"morph","scene":0,"index":3,"type":"Character"}
+    {"op":"text","scene":0,"index":3,"start":5,"end":7,"text":"..."}
+    {"op":"scene","scene":0,"field":"title","value":"..."}
+    {"op":"insert_scene","scene":1,"json":{...}}
+    {"op":"delete_scene","scene":1}
+    {"op":"document","field":"characters","value":[...]}
+    {"op":"name","field":"characters","add":"..."}
+    {"op":"name","field":"locations","remove":"..."}
+    {"op":"end","base":"...","digest":"..."}  last line of a compacted journal
+
+Scenes and elements are addressed by their index in document order.
+
+Once the journal grows long, and whenever the screenplay is autosaved (see
+autosave.py), it is compacted: a snapshot of the document is written to the
+screenplay file on a worker thread and the journal starts over. The journal
+being compacted is renamed to <file>.journal.old first. The new journal
+applies to the file the worker is writing, whose digest is not known yet, so
+its base is null. Before that file replaces the screenplay file, the worker
+ends the old journal with the digests of both files, so recover can tell
+whether the rewrite finished if the app dies half way through.
+
+When a file is opened, recover replays whatever journals were left behind
+and folds them back into the file.
+"""
+from kivy.logger import Logger
+
+from model import ElementRecord, SceneModel, write_snapshot
+from tools.filewriter import BackgroundWriter, write_file
+from tools.stringmanip import changed_span
+
+from functools import partial
+import hashlib
+import json
+import os
+import time
+
+# Compact the journal once it holds this many edits.
+COMPACT_AFTER = 1000
+
+
+def journal_path(path):
+    return path + '.journal'
+
+
+def old_journal_path(path):
+    return path + '.journal.old'
+
+
+def digest(data):
+    """Return the digest identifying the contents (bytes) of a file."""
+    return hashlib.sha1(data).hexdigest()
+
+
+def json_line(op):
+    return json.dumps(op, separators=(',', ':')) + '\n'
+
+
+def text_patch(old_text, new_text):
+    """Return (start, end, text) such that replacing old_text[start:end]
+    with text gives new_text.
+
+    Typing only changes the text around the cursor, so the patch is found by
+    trimming the common prefix and suffix of both strings.
+    """
+    start, end, new_end = changed_span(old_text, new_text)
+    return start, end, new_text[start:new_end]
+
+
+def read_journal(path):
+    """Return the edits of a journal file, stopping at the first bad line.
+
+    A line cut short by a crash is the usual reason for a bad line.
+    """
+    ops = []
+    try:
+        with open(path, 'r', encoding='utf-8') as stream:
+            for line in stream:
+                try:
+                    ops.append(json.loads(line))
+                except ValueError:
+                    break
+    except OSError:
+        pass
+    return ops
+
+
+def apply_op(document, op):
+    """Apply a single journal edit to a ScreenplayDocument.
+
+    Raises:
+        KeyError, IndexError: If op does not fit the document.
+    """
+    kind = op['op']
+    if kind == 'insert_scene':
+        scene = SceneModel()
+        scene.load_from_json(op['json'])
+        document.insert_scene(op['scene'], scene)
+        return
+    if kind == 'delete_scene':
+        document.pop_scene(op['scene'])
+        return
+    if kind == 'document':
+        setattr(document, op['field'], op['value'])
+        return
+    if kind == 'name':
+        if 'add' in op:
+            document.add_name(op['field'], op['add'])
+        else:
+            document.remove_name(op['field'], op['remove'])
+        return
+
+    scene = document.scenes[op['scene']]
+    if kind == 'scene':
+        setattr(scene, op['field'], op['value'])
+    elif kind == 'insert':
+        scene.insert(op['index'], ElementRecord(op['type'], op['raw_text']))
+    elif kind == 'delete':
+        scene.pop(op['index'])
+    elif kind == 'replace':
+        scene.replace(op['index'], ElementRecord(op['type'], op['raw_text']))
+    elif kind == 'morph':
+        scene.elements[op['index']].element_type = op['type']
+    elif kind == 'text':
+        scene.elements[op['index']].edit(op['start'], op['end'], op['text'])
+    else:
+        raise KeyError(kind)
+
+
+def recover(document, path, data):
+    """Replay the journals left next to a screenplay file onto document.
+
+    If any edits are recovered, the file is rewritten to include them. Any
+    journal is removed afterwards, so the caller can start a new one.
+
+    Args:
+        document (ScreenplayDocument): The document loaded from the file.
+        path (str): Path of the screenplay file.
+        data (bytes): Contents of the file the document was loaded from.
+
+    Returns:
+        str: The digest of the screenplay file, once recovered.
+    """
+    base = digest(data)
+    journals = [name for name in (old_journal_path(path), journal_path(path))
+                if os.path.exists(name)]
+    replayed = 0
+    # Whether the document is what a journal with a null base applies to.
+    follows = True
+
+    for name in journals:
+        ops = read_journal(name)
+        if not ops or ops[0].get('op') != 'base':
+            continue
+        end = ops[-1] if ops[-1].get('op') == 'end' else None
+        journal_base = ops[0]['digest']
+        if journal_base is None and end is not None:
+            journal_base = end['base']
+        if journal_base is None:
+            # It applies to the file written by the compaction before it,
+            # which never got to end it, so that file is the one on disk.
+            if not follows:
+                continue
+        elif journal_base != base:
+            # Already folded into the file (or not about this file at all).
+            follows = end is not None and end['digest'] == base
+            continue
+        for op in ops[1:]:
+            if op['op'] == 'end':
+                base = op['digest']
+                break
+            try:
+                apply_op(document, op)
+            except (KeyError, IndexError) as err:
+                Logger.error('Journal: Stopped replaying {} at {}: {}'
+                             .format(name, op, err))
+                break
+            replayed += 1
+
+    if replayed:
+        base = write_file(path, partial(write_digested, document.write_json))
+    for name in journals:
+        os.remove(name)
+    return base
+
+
+class DigestWriter:
+    """Wrap a text stream, keeping the digest of everything written to it."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.hash = hashlib.sha1()
+
+    def write(self, text):
+        self.hash.update(text.encode('utf-8'))
+        self.stream.write(text)
+
+    def hexdigest(self):
+        return self.hash.hexdigest()
+
+
+def write_digested(write, stream):
+    """Call write(stream) through a DigestWriter.
+
+    Returns:
+        str: The digest of everything written.
+    """
+    writer = DigestWriter(stream)
+    write(writer)
+    return writer.hexdigest()
+
+
+class EditJournal:
+    """Append every edit of a ScreenplayDocument to a journal file.
+
+    The document calls the element_* and scene_* methods as it changes (see
+    model.py); set ScreenplayDocument.journal to start recording.
+
+    Args:
+        document (ScreenplayDocument): The document to journal.
+        path (str): Path of the screenplay file.
+        writer (BackgroundWriter): Writes the screenplay file when the
+            journal is compacted. One is created if not given.
+
+    Example:
+        journal = EditJournal(document, path)
+        document.journal = journal
+        journal.save()
+    """
+
+    def __init__(self, document, path, writer=None):
+        self.document = document
+        self.path = path
+        self.stream = None
+        self.edits = 0
+        self.compacting = False
+        # Set when the last compaction could not write the file.
+        self.failed = False
+        # Digest of the screenplay file as last written, and of the file
+        # the compaction in progress writes.
+        self.base = None
+        self._written_base = None
+        # ScreenplayDocument.revision when the journal last started over,
+        # i.e. of the document as written in the screenplay file.
+        self.saved_revision = None
+        self.writer = writer or BackgroundWriter()
+
+    def start(self, base):
+        """Start an empty journal over the file whose digest is base.
+
+        A base of None stands for the file the compaction in progress is
+        writing.
+        """
+        self.close()
+        self.stream = open(journal_path(self.path), 'w', encoding='utf-8')
+        self.write({'op': 'base', 'digest': base})
+        self.edits = 0
+        self.saved_revision = self.document.revision
+        if base is not None:
+            self.base = base
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+    def write(self, op):
+        self.stream.write(json_line(op))
+        self.stream.flush()
+
+    def record(self, op):
+        if self.stream is None:
+            return
+        self.write(op)
+        self.edits += 1
+        if self.edits >= COMPACT_AFTER and not self.compacting:
+            self.compact()
+
+    def save(self):
+        """Write the whole document to the screenplay file now.
+
+        The journal starts over afterwards, since the file holds every edit.
+
+        Raises:
+            OSError: If the file could not be written. The journals are
+                kept, so nothing is lost.
+        """
+        # A compaction still queued would overwrite the file with older text.
+        self.writer.join()
+        with self.writer.lock:
+            base = write_file(self.path, partial(write_digested,
+                                                 self.document.write_json))
+            self.start(base)
+            if os.path.exists(old_journal_path(self.path)):
+                os.remove(old_journal_path(self.path))
+            self.compacting = False
+            self.failed = False
+
+    def compact(self, done=None):
+        """Fold the journal into the screenplay file on a worker thread.
+
+        Only a snapshot of the document is taken here, on the calling
+        thread (see ScreenplayDocument.snapshot); the worker puts the file
+        together from it and computes its digest as it writes. Only one
+        compaction runs at a time; check compacting before calling this.
+
+        If the last compaction failed, its journal holds edits the file is
+        missing and must not be replaced, so the file is written at once
+        with save instead.
+
+        Args:
+            done: Called as done(latency, error) once the file is written;
+                see BackgroundWriter.submit. It is called on the worker
+                thread, or on the calling thread when save is used.
+        """
+        if self.failed:
+            start = time.perf_counter()
+            error = None
+            try:
+                self.save()
+            except OSError as err:
+                error = err
+                Logger.error('Journal: Could not save {}: {}'.format(
+                    self.path, error))
+            if done is not None:
+                done(time.perf_counter() - start, error)
+            return
+
+        snapshot = self.document.snapshot()
+        self.compacting = True
+        submitted = False
+        try:
+            self.close()
+            os.replace(journal_path(self.path), old_journal_path(self.path))
+            self.start(None)
+            self.writer.submit(self.path,
+                               partial(self._write_snapshot, snapshot,
+                                       self.base),
+                               lambda latency, error:
+                               self._compacted(done, latency, error))
+            submitted = True
+        finally:
+            # Once submitted, _compacted resets compacting.
+            if not submitted:
+                self.compacting = False
+
+    def _write_snapshot(self, snapshot, base, stream):
+        # Runs on the writer thread.
+        new_base = write_digested(partial(write_snapshot, snapshot), stream)
+        # Tell recover which file holds the old journal's edits before that
+        # file replaces the one the journal applies to.
+        with open(old_journal_path(self.path), 'a',
+                  encoding='utf-8') as journal:
+            journal.write(json_line({'op': 'end', 'base': base,
+                                     'digest': new_base}))
+        self._written_base = new_base
+
+    def _compacted(self, done, latency, error):
+        # Runs on the writer thread.
+        if error is None:
+            self.base = self._written_base
+            os.remove(old_journal_path(self.path))
+        else:
+            # The old journal is kept, so nothing is lost, and the next
+            # compaction saves the whole file instead of replacing it.
+            self.failed = True
+            Logger.error('Journal: Could not compact {}: {}'.format(
+                self.path, error))
+        self.compacting = False
+        if done is not None:
+            done(latency, error)
+
+    def locate(self, record):
+        scene = record.scene
+        return self.document.index(scene), scene.index(record)
+
+    def element_inserted(self, scene, index, record):
+        self.record({'op': 'insert', 'scene': self.document.index(scene),
+                     'index': index, 'type': record.element_type,
+                     'raw_text': record.raw_text})
+
+    def element_removed(self, scene, index):
+        self.record({'op': 'delete', 'scene': self.document.index(scene),
+                     'index': index})
+
+    def element_replaced(self, scene, index, record):
+        self.record({'op': 'replace',
+                     'scene': self.document.index(scene),
+                     'index': index, 'type': record.element_type,
+                     'raw_text': record.raw_text})
+
+    def element_changed(self, record, name, old_value, value):
+        scene_index, index = self.locate(record)
+        if name == 'element_type':
+            self.record({'op': 'morph', 'scene': scene_index, 'index': index,
+                         'type': value})
+            return
+        start, end, text = text_patch(old_value, value)
+        self.record({'op': 'text', 'scene': scene_index, 'index': index,
+                     'start': start, 'end': end, 'text': text})
+
+    def element_edited(self, record, start, end, text):
+        scene_index, index = self.locate(record)
+        self.record({'op': 'text', 'scene': scene_index, 'index': index,
+                     'start': start, 'end': end, 'text': text})
+
+    def scene_changed(self, scene, name, value):
+        self.record({'op': 'scene', 'scene': self.document.index(scene),
+                     'field': name, 'value': value})
+
+    def scene_inserted(self, index, scene):
+        self.record({'op': 'insert_scene', 'scene': index,
+                     'json': scene.get_json()})
+
+    def scene_removed(self, index):
+        self.record({'op': 'delete_scene', 'scene': index})
+
+    def document_changed(self, name, value):
+        self.record({'op': 'document', 'field': name, 'value': value})
+
+    def name_added(self, field, name):
+        self.record({'op': 'name', 'field': field, 'add': name})
+
+    def name_removed(self, field, name):
+        self.record({'op': 'name', 'field': field, 'remove': name})
@@ -0,0 +1,213 @@
+"""Open screenplay files without blocking the UI thread.
+
+Reading and parsing a large screenplay file takes long enough to freeze the
+window, and building the widgets for every scene at once takes longer still.
+The ScreenplayLoader splits that work up:
+
+1. The file is read and parsed into a ScreenplayDocument on a worker thread.
+   The document model is plain Python (see model.py), so this needs nothing
+   from Kivy. Edits left in a journal next to the file by a crash are
+   replayed into the document then (see journal.py). Binary screenplay
+   files are read too (see binaryformat.py), as are Fountain files (see
+   fountain.py), and plain text files are imported by classifying their
+   paragraphs (see classify.py).
+2. Back on the UI thread, the Screenplay adopts the document and its scenes
+   are given widgets a few at a time, one batch per frame, in document
+   order. The first scenes can be read and edited while the rest load.
+
+Binary files need not be decoded in full first: only their header is read
+before the document is adopted. The worker then decodes the scenes out of
+the memory mapped file a batch at a time and hands each batch to the UI
+thread, where it is appended to the document and displayed like the rest.
+
+Progress is reported through Kivy events, so a tab header (or anything else)
+can display it.
+"""
+from kivy.event import EventDispatcher
+from kivy.clock import Clock
+
+from model import ScreenplayDocument
+from journal import EditJournal, recover
+from binaryformat import BinaryScreenplay, is_binary_file
+from classify import TEXT_EXTENSION, read_document
+from fountain import FOUNTAIN_EXTENSION, read_fountain
+
+from functools import partial
+import json
+import threading
+import time
+
+# How long each frame may spend building scene widgets, in seconds.
+FRAME_BUDGET = 1 / 60.
+# Number of scenes of a binary file decoded per batch handed to the UI
+# thread.
+STREAM_BATCH = 20
+
+
+class ScreenplayLoader(EventDispatcher):
+    """Load a screenplay file into a Screenplay in the background.
+
+    Events:
+        on_parsed: (document) The file has been parsed. The Screenplay has
+            not adopted the document yet, so handlers can still prepare the
+            view.
+        on_progress: (fraction) Some scenes were materialized. fraction runs
+            from 0 to 1.
+        on_complete: () Every scene has been materialized.
+        on_error: (error) The file could not be read or parsed.
+
+    Example:
+        loader = ScreenplayLoader(screenplay, path)
+        loader.bind(on_progress=show_progress)
+        loader.start()
+    """
+
+    def __init__(self, screenplay, path, **kwargs):
+        self.register_event_type('on_parsed')
+        self.register_event_type('on_progress')
+        self.register_event_type('on_complete')
+        self.register_event_type('on_error')
+        super().__init__(**kwargs)
+        self.screenplay = screenplay
+        self.path = path
+        self.document = None
+        self._base = None
+        self._step_event = None
+        # Number of scenes the document will have once every one is read.
+        self._scene_count = None
+        # True if the scenes are read after the document is adopted.
+        self._streaming = False
+        self._cancelled = False
+
+    def start(self):
+        """Start parsing the file on a worker thread."""
+        worker = threading.Thread(target=self._parse, daemon=True)
+        worker.start()
+
+    def cancel(self):
+        """Stop materializing scenes (e.g. because the tab was closed)."""
+        self._cancelled = True
+        if self._step_event is not None:
+            self._step_event.cancel()
+            self._step_event = None
+
+    def _parse(self):
+        # Runs on the worker thread: no widgets may be touched here.
+        binary = None
+        try:
+            if is_binary_file(self.path):
+                # Binary files are not journaled; see Screenplay.save. The
+                # scenes follow the header; see _stream.
+                binary = BinaryScreenplay(self.path)
+                document = binary.load_header()
+                self._scene_count = len(binary)
+                self._streaming = document.loading = len(binary) > 0
+            elif self.path.endswith(FOUNTAIN_EXTENSION):
+                # Fountain files are not journaled either.
+                document = read_fountain(self.path)
+            elif self.path.endswith(TEXT_EXTENSION):
+                # Plain text is imported, and saved elsewhere as a screenplay.
+                with open(self.path, encoding='utf-8') as stream:
+                    document = read_document(stream)
+            else:
+                with open(self.path, 'rb') as stream:
+                    data = stream.read()
+                document = ScreenplayDocument()
+                document.load_from_json(json.loads(data))
+                self._base = recover(document, self.path, data)
+        except (OSError, ValueError, KeyError) as err:
+            if binary is not None:
+                binary.close()
+            Clock.schedule_once(partial(self._dispatch_error, err))
+        else:
+            Clock.schedule_once(partial(self._adopt, document))
+            if binary is not None:
+                self._stream(document, binary)
+
+    def _stream(self, document, binary):
+        """Decode the scenes of a binary file, a batch at a time, and hand
+        them to the UI thread (see _receive). Runs on the worker thread."""
+        with binary:
+            try:
+                for start in range(0, len(binary), STREAM_BATCH):
+                    if self._cancelled:
+                        return
+                    scenes = [binary.read_scene(index) for index in
+                              range(start, min(start + STREAM_BATCH,
+                                               len(binary)))]
+                    Clock.schedule_once(partial(self._receive, document,
+                                                scenes))
+            except (ValueError, KeyError) as err:
+                Clock.schedule_once(partial(self._stream_failed, err))
+
+    def _receive(self, document, scenes, dt):
+        if self._cancelled:
+            return
+        document.append_scenes(scenes)
+        if len(document.scenes) == self._scene_count:
+            document.loading = False
+
+    def _stream_failed(self, err, dt):
+        if self._cancelled:
+            return
+        self.cancel()
+        # Only part of the file was read: show none of it, so that it
+        # cannot be saved over the whole file.
+        self.screenplay.load_document(ScreenplayDocument())
+        self.dispatch('on_error', err)
+
+    def _dispatch_error(self, err, dt):
+        self.dispatch('on_error', err)
+
+    def _adopt(self, document, dt):
+        self.document = document
+        if self._scene_count is None:
+            self._scene_count = len(document.scenes)
+        self.dispatch('on_parsed', document)
+        self.screenplay.load_document(document)
+        if self._base is not None:
+            document.journal = EditJournal(document, self.path)
+            document.journal.start(self._base)
+        self._step_event = Clock.schedule_interval(self._step, 0)
+        self._step(0)
+
+    def _step(self, dt):
+        """Materialize scenes until this frame's budget is spent."""
+        screenplay = self.screenplay
+        total = self._scene_count
+        # Scenes of a binary file may still be on their way; see _stream.
+        read = len(self.document.scenes)
+        deadline = time.perf_counter() + FRAME_BUDGET
+
+        # Anything that displays the whole document at once (such as
+        # switching views) just leaves less for the loader to do.
+        with screenplay.bulk_load():
+            while screenplay.displayed_scenes < read:
+                screenplay.attach_scenes(1)
+                if time.perf_counter() > deadline:
+                    break
+
+        if screenplay.displayed_scenes < total:
+            self.dispatch('on_progress', screenplay.displayed_scenes / total)
+            return True
+
+        self.cancel()
+        if self._streaming:
+            # Register the names of the scenes read after the document was
+            # adopted.
+            screenplay.rebuild_names()
+        self.dispatch('on_progress', 1.)
+        self.dispatch('on_complete')
+        return False
+
+    def on_parsed(self, document):
+        pass
+
+    def on_progress(self, fraction):
+        pass
+
+    def on_complete(self):
+        pass
+
+    def on_error(self, error):
+        pass
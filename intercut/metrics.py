@@ -0,0 +1,54 @@
+"""Page metrics of a screenplay set in Courier 12pt.
+
+Courier is monospaced: at 12pt every character is a tenth of an inch wide and
+every line a sixth of an inch high. How many lines a paragraph takes on the
+page therefore follows from how many characters it holds, and the layout of
+a whole script can be worked out without rendering any text.
+
+WRAP_WIDTHS gives the characters per line of each element type, from the
+usual margins of a screenplay page, and SPACE_BEFORE the blank lines set
+above each element type (except at the top of a page).
+
+Example:
+    >>> line_count('Dialogue', 'x ' * 20)
+    2
+"""
+from tools.wordwrap import count_lines
+
+CHARACTERS_PER_INCH = 10
+LINES_PER_INCH = 6
+
+# Lines of text on a US Letter page with one inch margins top and bottom.
+PAGE_LINES = 9 * LINES_PER_INCH
+
+WRAP_WIDTHS = {
+    'Action': 61,
+    'SceneHeading': 61,
+    'Character': 30,
+    'Dialogue': 35,
+    'Parenthetical': 25,
+}
+
+SPACE_BEFORE = {
+    'Action': 1,
+    'SceneHeading': 1,
+    'Character': 1,
+    'Dialogue': 0,
+    'Parenthetical': 0,
+}
+
+
+def display_text(element_type, raw_text):
+    """Return raw_text with the characters its element adds around it.
+
+    Only the length matters here; capitals take as much room as lower case.
+    """
+    if element_type == 'Parenthetical':
+        return '(' + raw_text + ')'
+    return raw_text
+
+
+def line_count(element_type, raw_text):
+    """Return the number of lines an element takes on the page."""
+    return count_lines(display_text(element_type, raw_text),
+                       WRAP_WIDTHS[element_type])
@@ -0,0 +1,585 @@
+"""Define the document model behind a Screenplay.
+
+The widgets in screenplay.py, scene.py and elements.py display a screenplay,
+but they are not where it is stored. The classes in this module are: plain
+Python objects, with no dependency on Kivy, that hold the text and metadata
+of the script. Widgets are bound to the records they display and write their
+edits straight through to them.
+
+This means a screenplay can be loaded, saved, searched or reported on
+without creating a single widget.
+
+ScreenplayDocument:
+    The whole script: title page metadata, established characters and
+    locations, and the list of scenes.
+
+SceneModel:
+    One scene: its metadata and the list of element records in it.
+
+ElementRecord:
+    One paragraph of the script: its element type and raw text.
+
+Unlike the widget tree, every list here is in document order (the first
+scene of the script is scenes[0]).
+"""
+from metrics import line_count
+from tools.textbuffer import TextBuffer
+
+from collections import OrderedDict
+import json
+
+# Indentation of the saved JSON, matching json.dumps(..., indent=4).
+JSON_INDENT = 4
+
+
+def indent_json(json_string, level):
+    """Indent every line but the first of a pretty-printed JSON value."""
+    return json_string.replace('\n', '\n' + ' ' * (JSON_INDENT * level))
+
+
+def find_index(items, item):
+    """Return the index of item in items, a list of ElementRecords or
+    SceneModels.
+
+    Every item keeps the index it was last found at (its _index slot). That
+    hint is checked first, so finding the same item again costs O(1) while
+    nothing is inserted or removed before it. A stale hint renumbers the
+    whole list once, after which every item in it is found in O(1) again.
+    """
+    index = item._index
+    if index < len(items) and items[index] is item:
+        return index
+    for index, other in enumerate(items):
+        other._index = index
+    index = item._index
+    if index >= len(items) or items[index] is not item:
+        raise ValueError('{!r} is not in list'.format(item))
+    return index
+
+
+def model_attribute(model_name, name):
+    """Expose an attribute of a widget's model as an attribute of the widget.
+
+    Args:
+        model_name (str): Name of the widget attribute holding the model.
+        name (str): Name of the attribute on the model.
+    """
+    def get(widget):
+        return getattr(getattr(widget, model_name), name)
+
+    def set(widget, value):
+        setattr(getattr(widget, model_name), name, value)
+
+    return property(get, set)
+
+
+def name_list(field):
+    """Return a property for a list of names a ScreenplayDocument keeps in
+    an (ordered) dict, so that a single name is added or removed in O(1).
+
+    Reading the property gives a new list; assign a list to replace the
+    names, or use ScreenplayDocument.add_name and remove_name.
+
+    Args:
+        field (str): 'characters' or 'locations'.
+    """
+
+    def get(document):
+        return list(document.names[field])
+
+    def set(document, names):
+        document.names[field] = dict.fromkeys(names)
+
+    return property(get, set)
+
+
+def tracked_attribute(slot):
+    """An attribute that tells its owner whenever it changes.
+
+    The owner (an ElementRecord or SceneModel) stores the value in slot and
+    must have an attribute_changed(name, old_value, value) method.
+
+    Args:
+        slot (str): Name of the slot actually holding the value, which is the
+            name of the attribute with a leading underscore.
+    """
+    name = slot[1:]
+
+    def get(model):
+        return getattr(model, slot)
+
+    def set(model, value):
+        old_value = getattr(model, slot)
+        if old_value != value:
+            setattr(model, slot, value)
+            model.attribute_changed(name, old_value, value)
+
+    return property(get, set)
+
+
+class ElementRecord:
+    """The stored form of a single Element.
+
+    Typing goes through edit, which changes the text in place (see
+    TextBuffer) rather than building a new string for every keystroke. The
+    raw_text string is only put back together when it is read.
+
+    The number of lines the element takes on the page is cached until its
+    type or text changes; see line_count.
+
+    Attributes:
+        element_type (str): Class name of the element, e.g. 'Action'.
+        raw_text (str): The text exactly as the user typed it.
+        scene (SceneModel): The scene holding this record, if any.
+    """
+
+    __slots__ = ('_element_type', '_raw_text', '_buffer', 'scene',
+                 '_line_count', '_index')
+
+    element_type = tracked_attribute('_element_type')
+
+    def __init__(self, element_type, raw_text='', scene=None):
+        self._element_type = element_type
+        self._raw_text = raw_text
+        # Created by the first edit; _raw_text is None while it is newer.
+        self._buffer = None
+        self.scene = scene
+        self._line_count = None
+        # See find_index.
+        self._index = 0
+
+    @property
+    def raw_text(self):
+        if self._raw_text is None:
+            self._raw_text = str(self._buffer)
+        return self._raw_text
+
+    @raw_text.setter
+    def raw_text(self, value):
+        old_value = self.raw_text
+        if old_value != value:
+            self._raw_text = value
+            self._buffer = None
+            self.attribute_changed('raw_text', old_value, value)
+
+    def text_length(self):
+        """Return len(raw_text), without putting raw_text together."""
+        if self._raw_text is None:
+            return len(self._buffer)
+        return len(self._raw_text)
+
+    def edit(self, start, end, text):
+        """Replace raw_text[start:end] with text, in O(log n).
+
+        Raises:
+            IndexError: If start and end are not 0 <= start <= end <= len.
+        """
+        if start == end and not text:
+            return
+        if self._buffer is None:
+            self._buffer = TextBuffer(self._raw_text)
+        self._buffer.replace(start, end, text)
+        self._raw_text = None
+        self._line_count = None
+
+        scene = self.scene
+        if scene is None:
+            return
+        scene.mark_dirty()
+        journal = scene.get_journal()
+        if journal is not None:
+            journal.element_edited(self, start, end, text)
+        paginator = scene.get_paginator()
+        if paginator is not None:
+            paginator.record_changed(self)
+
+    def line_count(self):
+        """Return the number of lines the element takes on the page."""
+        if self._line_count is None:
+            self._line_count = line_count(self.element_type, self.raw_text)
+        return self._line_count
+
+    def attribute_changed(self, name, old_value, value):
+        """Tell the scene holding this record that it must be re-saved."""
+        self._line_count = None
+        scene = self.scene
+        if scene is None:
+            return
+        scene.mark_dirty()
+        journal = scene.get_journal()
+        if journal is not None:
+            journal.element_changed(self, name, old_value, value)
+        paginator = scene.get_paginator()
+        if paginator is not None:
+            paginator.record_changed(self)
+
+    def __repr__(self):
+        return '<ElementRecord {} {!r}>'.format(self.element_type,
+                                                self.raw_text[:20])
+
+    def get_json(self):
+        json_dict = OrderedDict()
+
+        json_dict['type'] = self.element_type
+        json_dict['raw_text'] = self.raw_text
+
+        return json_dict
+
+    @classmethod
+    def from_json(cls, json_dict, scene=None):
+        return cls(json_dict['type'], json_dict['raw_text'], scene)
+
+
+class SceneModel:
+    """The stored form of a single Scene.
+
+    Each scene caches its own serialized JSON (see dumps and fragment), so
+    that saving only re-encodes the scenes edited since the last save. Any change to the
+    scene metadata, to the list of elements or to the type or text of one
+    of its records marks the scene dirty and drops the cache. Edit the
+    elements through insert, pop and replace rather than the list itself,
+    and assign a new color rather than changing the list in place.
+
+    Attributes:
+        elements (list): ElementRecords in document order.
+        document (ScreenplayDocument): The document holding this scene.
+    """
+
+    __slots__ = ('_title', '_notes', '_color', '_plot_point', 'elements',
+                 'document', '_fragment', '_indented', '_index')
+
+    title = tracked_attribute('_title')
+    notes = tracked_attribute('_notes')
+    color = tracked_attribute('_color')
+    plot_point = tracked_attribute('_plot_point')
+
+    def __init__(self, document=None):
+        self._title = ''
+        self._notes = ''
+        self._color = [1, 1, 1, 1]
+        self._plot_point = ''
+        self.elements = []
+        self.document = document
+        self._fragment = None
+        self._indented = None
+        # See find_index.
+        self._index = 0
+
+    def __len__(self):
+        return len(self.elements)
+
+    def index(self, record):
+        """Return the index of record in elements; see find_index."""
+        return find_index(self.elements, record)
+
+    def insert(self, index, record):
+        """Insert record at index (in document order) and take ownership."""
+        record.scene = self
+        record._index = index
+        self.elements.insert(index, record)
+        self.mark_dirty()
+        journal = self.get_journal()
+        if journal is not None:
+            journal.element_inserted(self, index, record)
+        self.layout_changed(index)
+
+    def pop(self, index):
+        """Remove and return the record at index (in document order)."""
+        record = self.elements.pop(index)
+        record.scene = None
+        self.mark_dirty()
+        journal = self.get_journal()
+        if journal is not None:
+            journal.element_removed(self, index)
+        self.layout_changed(index)
+        return record
+
+    def replace(self, index, record):
+        """Put record in place of the record at index."""
+        self.elements[index].scene = None
+        record.scene = self
+        record._index = index
+        self.elements[index] = record
+        self.mark_dirty()
+        journal = self.get_journal()
+        if journal is not None:
+            journal.element_replaced(self, index, record)
+        self.layout_changed(index)
+
+    @property
+    def dirty(self):
+        """True if the scene changed since it was last serialized."""
+        return self._fragment is None
+
+    def mark_dirty(self):
+        self._fragment = None
+        self._indented = None
+        if self.document is not None:
+            self.document.revision += 1
+
+    def attribute_changed(self, name, old_value, value):
+        self.mark_dirty()
+        journal = self.get_journal()
+        if journal is not None:
+            journal.scene_changed(self, name, value)
+
+    def get_journal(self):
+        """Return the EditJournal recording changes to this scene, if any."""
+        document = self.document
+        return None if document is None else document.journal
+
+    def get_paginator(self):
+        """Return the Paginator laying out this scene, if any."""
+        document = self.document
+        return None if document is None else document.paginator
+
+    def layout_changed(self, index):
+        paginator = self.get_paginator()
+        if paginator is not None:
+            paginator.element_changed(self, index)
+
+    def get_json(self):
+        json_dict = OrderedDict()
+
+        json_dict['title'] = self.title
+        json_dict['notes'] = self.notes
+        json_dict['color'] = self.color
+        json_dict['plot_point'] = self.plot_point
+
+        json_dict['elements'] = [record.get_json() for record in self.elements]
+        return json_dict
+
+    def dumps(self):
+        """Return the scene as a pretty-printed JSON string.
+
+        The string is cached until the scene next changes.
+        """
+        if self._fragment is None:
+            self._fragment = json.dumps(self.get_json(), indent=JSON_INDENT)
+        return self._fragment
+
+    def fragment(self):
+        """Return dumps() indented as it is in a saved screenplay file.
+
+        The string is cached until the scene next changes.
+        """
+        if self._indented is None:
+            self._indented = indent_json(self.dumps(), 2)
+        return self._indented
+
+    def load_from_json(self, json_dict):
+        self.title = json_dict['title']
+        self.notes = json_dict['notes']
+        self.color = json_dict['color']
+        self.plot_point = json_dict['plot_point']
+
+        self.elements = [ElementRecord.from_json(item, self)
+                         for item in json_dict['elements']]
+        self.mark_dirty()
+
+
+def write_snapshot(snapshot, stream):
+    """Write a document to a text stream as JSON, from its header and the
+    JSON fragments of its scenes (see ScreenplayDocument.snapshot).
+
+    Args:
+        snapshot (tuple): The header dict, and an iterable of the scene
+            fragments in document order.
+        stream: A writable text file object.
+    """
+    header, fragments = snapshot
+    pad = ' ' * JSON_INDENT
+    stream.write('{\n')
+    for key, value in header.items():
+        stream.write('{}{}: {},\n'.format(
+            pad, json.dumps(key),
+            indent_json(json.dumps(value, indent=JSON_INDENT), 1)))
+
+    stream.write(pad + '"scenes": [')
+    separator = '\n'
+    for fragment in fragments:
+        stream.write(separator + pad * 2)
+        stream.write(fragment)
+        separator = ',\n'
+    if separator != '\n':
+        stream.write('\n' + pad)
+    stream.write(']\n}')
+
+
+class ScreenplayDocument:
+    """The stored form of a whole Screenplay.
+
+    Attributes:
+        scenes (list): SceneModels in document order.
+        characters (list): Established character names.
+        locations (list): Established scene locations.
+        names (dict): Maps 'characters' and 'locations' to the names they
+            hold, as dict keys. See name_list.
+        journal (EditJournal): Records every edit to the scenes, if set.
+            See journal.py.
+        paginator (Paginator): Keeps the page breaks, if set. See
+            pagination.py.
+        revision (int): Goes up with every change to the document, so that
+            comparing it with an earlier value tells whether anything
+            changed in between.
+        loading (bool): True while scenes are still being read from the
+            file (see loader.py). The document must not be saved until
+            they all are.
+    """
+
+    characters = name_list('characters')
+    locations = name_list('locations')
+
+    def __init__(self):
+        self.title = 'Untitled'
+        self.author = 'Anonymous'
+        self.phone = ''
+        self.email = ''
+        self.version = ''
+        self.save_to = ''
+        self.names = {'characters': {}, 'locations': {}}
+        self.scenes = []
+        self.journal = None
+        self.paginator = None
+        self.revision = 0
+        self.loading = False
+
+    def __len__(self):
+        return len(self.scenes)
+
+    def index(self, scene):
+        """Return the index of scene in scenes; see find_index."""
+        return find_index(self.scenes, scene)
+
+    def insert_scene(self, index, scene):
+        """Insert scene at index (in document order) and take ownership."""
+        scene.document = self
+        scene._index = index
+        self.scenes.insert(index, scene)
+        self.revision += 1
+        if self.journal is not None:
+            self.journal.scene_inserted(index, scene)
+        if self.paginator is not None:
+            self.paginator.element_changed(scene, 0)
+
+    def pop_scene(self, index):
+        scene = self.scenes.pop(index)
+        scene.document = None
+        self.revision += 1
+        if self.journal is not None:
+            self.journal.scene_removed(index)
+        if self.paginator is not None:
+            self.paginator.scene_removed(index)
+        return scene
+
+    def add_name(self, field, name):
+        """Add name to the end of the characters or locations (field)."""
+        names = self.names[field]
+        if name in names:
+            return
+        names[name] = None
+        self.revision += 1
+        if self.journal is not None:
+            self.journal.name_added(field, name)
+
+    def remove_name(self, field, name):
+        """Remove name from the characters or locations (field), if there."""
+        names = self.names[field]
+        if name not in names:
+            return
+        del names[name]
+        self.revision += 1
+        if self.journal is not None:
+            self.journal.name_removed(field, name)
+
+    def header_changed(self, name):
+        """Record a change to a title page field or a name list.
+
+        Call this after changing the attribute. To add or remove a single
+        name, use add_name or remove_name instead.
+        """
+        self.revision += 1
+        if self.journal is not None:
+            self.journal.document_changed(name, getattr(self, name))
+
+    def iter_elements(self):
+        """Yield every ElementRecord of the screenplay in document order."""
+        for scene in self.scenes:
+            yield from scene.elements
+
+    def get_json(self):
+        json_dict = self.get_header_json()
+        json_dict['scenes'] = [scene.get_json() for scene in self.scenes]
+        return json_dict
+
+    def get_header_json(self):
+        """Return everything get_json does except the scenes."""
+        json_dict = OrderedDict()
+        json_dict['title'] = self.title
+        json_dict['author'] = self.author
+        json_dict['phone'] = self.phone
+        json_dict['email'] = self.email
+        json_dict['locations'] = self.locations
+        json_dict['characters'] = self.characters
+        json_dict['version'] = self.version
+        json_dict['save_to'] = self.save_to
+        return json_dict
+
+    def write_json(self, stream):
+        """Write the document to a text stream as JSON, one scene at a time.
+
+        The output is exactly json.dumps(self.get_json(), indent=4), but
+        scenes that have not changed since they were last written reuse
+        their cached JSON (see SceneModel.fragment), and the whole document
+        is never put together in memory.
+
+        Args:
+            stream: A writable text file object.
+        """
+        write_snapshot((self.get_header_json(),
+                        (scene.fragment() for scene in self.scenes)), stream)
+
+    def snapshot(self):
+        """Return the document as it is now, for write_snapshot.
+
+        This is cheap enough to call on the UI thread: the header fields are
+        copied, and each scene gives its cached JSON (see
+        SceneModel.fragment), so only the scenes edited since they were last
+        written are encoded. Everything in the snapshot is immutable, so it
+        can be written on another thread while the document changes.
+
+        Returns:
+            tuple: The header (see get_header_json) and the list of scene
+                fragments.
+        """
+        return self.get_header_json(), [scene.fragment() for scene in self.scenes]
+
+    def load_from_json(self, json_dict):
+        self.title = json_dict['title']
+        self.author = json_dict['author']
+        self.phone = json_dict['phone']
+        self.email = json_dict['email']
+        self.locations = json_dict['locations']
+        self.characters = json_dict['characters']
+        self.version = json_dict['version']
+        self.save_to = json_dict['save_to']
+
+        self.scenes = []
+        for item in json_dict['scenes']:
+            scene = SceneModel(self)
+            scene.load_from_json(item)
+            self.scenes.append(scene)
+        if self.paginator is not None:
+            self.paginator.invalidate()
+
+    def append_scenes(self, scenes):
+        """Add scenes read from a file after the last scene.
+
+        Like load_from_json, this is loading rather than editing: it is
+        not journaled and does not count as a revision.
+        """
+        for scene in scenes:
+            scene.document = self
+            self.scenes.append(scene)
+        if self.paginator is not None:
+            self.paginator.invalidate()
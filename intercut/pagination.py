@@ -0,0 +1,391 @@
+"""Break a screenplay into pages, and keep the page breaks up to date.
+
+Every element takes a known number of lines on the page (see metrics.py),
+so pages can be laid out from the document model alone. Pages are filled
+line by line, following the usual rules of a screenplay:
+
+    - A scene heading, a character cue or a parenthetical never ends a page;
+      it moves to the next page together with the start of what follows.
+    - An action paragraph or a speech may be split across two pages, but
+      only if at least two of its lines stay on each page. Otherwise it
+      moves to the next page whole (no widows or orphans).
+    - A speech split across pages ends with "(MORE)" at the bottom of the
+      first page, and the next page opens with "NAME (CONT'D)".
+
+The Paginator keeps the list of page breaks. The document tells it which
+elements changed (see model.py), and the next time the pages are needed
+only the pages from the first changed one onwards are laid out again, and
+only until a page break comes out the same as before: from there on the
+old breaks still hold. Typing on page 80 of a 150 page script therefore
+lays out one or two pages, not 150.
+
+Example:
+    paginator = Paginator(document)
+    document.paginator = paginator
+    paginator.page_count()
+"""
+from metrics import PAGE_LINES, SPACE_BEFORE
+
+from collections import deque
+
+# Elements that never end a page: they stay with the element after them.
+KEEP_WITH_NEXT = {'SceneHeading', 'Character', 'Parenthetical'}
+# Elements continuing the speech of the Character cue above them.
+SPEECH = {'Dialogue', 'Parenthetical'}
+SPEAKING = {'Character', 'Dialogue', 'Parenthetical'}
+# Elements that may be split across pages.
+SPLITTABLE = {'Action', 'Dialogue'}
+# A split leaves at least this many lines of the element on each page.
+MIN_SPLIT_LINES = 2
+
+MORE = '(MORE)'
+CONTINUED = " (CONT'D)"
+
+
+class PageBreak:
+    """Where a page starts.
+
+    Attributes:
+        record (ElementRecord): The element at the top of the page.
+        line (int): The first line of record on the page, above 0 if the
+            element was split across pages.
+        speaker (ElementRecord): If the page starts in the middle of a
+            speech, the Character cue of that speech, else None. The page
+            before then ends with MORE.
+    """
+
+    __slots__ = ('record', 'line', 'speaker')
+
+    def __init__(self, record, line=0, speaker=None):
+        self.record = record
+        self.line = line
+        self.speaker = speaker
+
+    def __eq__(self, other):
+        return (self.record is other.record and self.line == other.line
+                and self.speaker is other.speaker)
+
+    def __repr__(self):
+        return '<PageBreak {!r} line {}{}>'.format(
+            self.record, self.line, ' (CONT\'D)' if self.speaker else '')
+
+    def continued_heading(self):
+        """Return the "NAME (CONT'D)" line opening the page, or None."""
+        if self.speaker is None:
+            return None
+        return self.speaker.raw_text.strip().upper() + CONTINUED
+
+
+class Paginator:
+    """The page breaks of a ScreenplayDocument.
+
+    Set ScreenplayDocument.paginator to have the document report its
+    changes. Nothing is laid out until the pages are asked for.
+
+    Args:
+        document (ScreenplayDocument): The document to paginate.
+        page_lines (int): Lines of text on a page.
+
+    Attributes:
+        pages (list): The PageBreak starting each page, as of the last
+            refresh.
+    """
+
+    def __init__(self, document, page_lines=PAGE_LINES):
+        self.document = document
+        self.page_lines = page_lines
+        self.pages = []
+        # Records and (scene, index) positions changed since the last
+        # refresh, or None if everything must be laid out again.
+        self._changes = None
+
+    def invalidate(self):
+        """Lay out every page again on the next refresh."""
+        self._changes = None
+
+    def record_changed(self, record):
+        if self._changes is not None:
+            self._changes.add(record)
+
+    def element_changed(self, scene, index):
+        """Note an element inserted, removed or replaced at index."""
+        if self._changes is not None:
+            self._changes.add((scene, index))
+
+    def scene_removed(self, index):
+        scenes = self.document.scenes
+        if not scenes:
+            self.invalidate()
+        elif index < len(scenes):
+            self.element_changed(scenes[index], 0)
+        else:
+            self.element_changed(scenes[-1], len(scenes[-1].elements))
+
+    def page_count(self):
+        self.refresh()
+        return max(1, len(self.pages))
+
+    def page_of(self, record):
+        """Return the number (from 1) of the page on which record starts."""
+        self.refresh()
+        return self._page_at(self._record_position(record), False) + 1
+
+    def refresh(self):
+        """Lay out the pages that changed since the last refresh.
+
+        Returns:
+            int: The index of the first page laid out again, or None if
+                nothing changed.
+        """
+        changes = self._changes
+        if changes is None:
+            first = last = None
+        elif not changes:
+            return None
+        else:
+            first, last = self._changed_pages(changes)
+        self._changes = set()
+        return self._paginate(first, last)
+
+    def _record_position(self, record):
+        """Return (scene index, element index) of record, or None if it is
+        no longer in the document.
+
+        Scenes and records remember their index (see model.find_index), so
+        this costs O(1) while the scene is not changing.
+        """
+        scene = record.scene
+        if scene is None or scene.document is not self.document:
+            return None
+        return self.document.index(scene), scene.index(record)
+
+    def _changed_pages(self, changes):
+        """Return the first and last page holding one of changes."""
+        first = last = None
+        for change in changes:
+            if isinstance(change, tuple):
+                scene, index = change
+                position = None if scene.document is not self.document \
+                    else (self.document.index(scene), index)
+            else:
+                position = self._record_position(change)
+            if position is None:
+                # Gone since; its removal was noted as well.
+                continue
+            page = self._page_at(self._chain_start(*position), True)
+            first = page if first is None else min(first, page)
+            page = self._page_at(position, False)
+            last = page if last is None else max(last, page)
+        if first is None:
+            first = last = 0
+        return first, last
+
+    def _page_position(self, page):
+        """Return the position of the element starting a page.
+
+        A page whose element has been removed since is taken to start where
+        the page before it does.
+        """
+        pages = self.pages
+        while page >= 0:
+            position = self._record_position(pages[page].record)
+            if position is not None:
+                return position
+            page -= 1
+        return (-1, -1)
+
+    def _page_at(self, position, start):
+        """Return the index of the page holding the start (or else the end)
+        of the element at position.
+
+        The pages start in document order, so they are found by bisection.
+        An element split across pages starts several pages, and then its
+        start is on the first of them and its end on the last.
+        """
+        low, high = 0, len(self.pages)
+        while low < high:
+            middle = (low + high) // 2
+            page_position = self._page_position(middle)
+            if page_position < position or \
+                    (not start and page_position == position):
+                low = middle + 1
+            else:
+                high = middle
+        if start and low < len(self.pages) and \
+                self._page_position(low) == position:
+            return low
+        page = max(low - 1, 0)
+        if start:
+            while page > 0 and \
+                    self._record_position(self.pages[page].record) is None:
+                page -= 1
+        return page
+
+    def _chain_start(self, scene_index, element_index):
+        """Return the position of the first element whose layout depends
+        on the element at a position.
+
+        Where an element goes depends on the elements it is kept with, and
+        on whether the element after it continues a speech.
+        """
+        elements = self.document.scenes[scene_index].elements
+        element_index = min(element_index, len(elements)) - 1
+        while element_index > 0 and \
+                elements[element_index - 1].element_type in KEEP_WITH_NEXT:
+            element_index -= 1
+        return scene_index, max(element_index, 0)
+
+    def _records_from(self, scene_index, element_index):
+        """Yield (record, first in its scene) from a position onwards."""
+        scenes = self.document.scenes
+        for index in range(scene_index, len(scenes)):
+            elements = scenes[index].elements
+            start = element_index if index == scene_index else 0
+            for position in range(start, len(elements)):
+                yield elements[position], position == 0
+
+    def _paginate(self, first, last):
+        """Lay out pages from first until the breaks match the old ones
+        after page last. Lay out everything if first is None."""
+        old = self.pages
+        start = None
+        if first is not None:
+            # The page before the first change may end differently, e.g. if
+            # the element a heading was kept with changed.
+            first = max(first - 1, 0)
+            # From the first page, start with the first element, which may
+            # have been inserted before the old one.
+            if 0 < first < len(old):
+                start = old[first]
+                position = self._record_position(start.record)
+                if position is None:
+                    start = None
+        if start is None:
+            first, last = 0, None
+            position = (0, 0)
+        reusable = {}
+        if last is not None:
+            for index in range(last + 1, len(old)):
+                page_break = old[index]
+                reusable[(id(page_break.record), page_break.line)] = index
+
+        pages = old[:first]
+        records = self._records_from(*position)
+        upcoming = deque()
+
+        def peek(index):
+            while len(upcoming) <= index:
+                item = next(records, None)
+                if item is None:
+                    return None
+                upcoming.append(item)
+            return upcoming[index]
+
+        if peek(0) is None:
+            self.pages = []
+            return first
+
+        if start is None:
+            start = PageBreak(peek(0)[0])
+        pages.append(start)
+        line = start.line
+        speaker = start.speaker
+        used = 1 if speaker is not None else 0
+        previous_kind = self._previous_kind(position)
+        lines = self.page_lines
+
+        while True:
+            item = peek(0)
+            if item is None:
+                break
+            record, first_in_scene = item
+            kind = record.element_type
+            if first_in_scene:
+                previous_kind = None
+                speaker = None
+            if kind == 'Character':
+                speaker = record
+            elif kind not in SPEECH:
+                speaker = None
+            in_speech = kind in SPEECH and previous_kind in SPEAKING
+
+            remaining = record.line_count() - line
+            top = used == (1 if pages[-1].speaker is not None else 0)
+            space = 0 if top or line else SPACE_BEFORE[kind]
+            available = lines - used - space
+            following = peek(1)
+            speech_goes_on = (kind in SPEAKING and following is not None
+                              and not following[1]
+                              and following[0].element_type in SPEECH)
+            more = 1 if speech_goes_on else 0
+
+            if top:
+                if remaining <= available:
+                    split = None
+                else:
+                    split = max(available - (kind == 'Dialogue'), 1)
+                next_line = line
+            elif self._need(peek) > available:
+                # Move the element (and what it keeps with) to a new page.
+                split = 0
+                next_line = 0
+            elif remaining + more <= available:
+                split = None
+            else:
+                split = min(available - (kind == 'Dialogue'),
+                            remaining - MIN_SPLIT_LINES)
+                next_line = line
+                if split < MIN_SPLIT_LINES:
+                    split = 0
+
+            if split is None:
+                used += space + remaining
+                upcoming.popleft()
+                line = 0
+                previous_kind = kind
+                continue
+
+            if split:
+                page_speaker = speaker if kind == 'Dialogue' else None
+            else:
+                page_speaker = speaker if in_speech else None
+            page_break = PageBreak(record, next_line + split, page_speaker)
+            index = reusable.get((id(record), page_break.line))
+            if index is not None and old[index] == page_break:
+                # Everything from here on is laid out as before.
+                pages.extend(old[index:])
+                break
+            pages.append(page_break)
+            line = page_break.line
+            used = 1 if page_speaker is not None else 0
+
+        self.pages = pages
+        return first
+
+    def _previous_kind(self, position):
+        scene_index, element_index = position
+        if not element_index:
+            return None
+        elements = self.document.scenes[scene_index].elements
+        return elements[element_index - 1].element_type
+
+    def _need(self, peek, index=0):
+        """Return the lines the element at index needs on the page it
+        starts on, besides the space above it: all of it, or the least of
+        it that may be left at the bottom of a page, plus whatever it must
+        be kept with."""
+        record = peek(index)[0]
+        kind = record.element_type
+        total = record.line_count()
+        if kind in KEEP_WITH_NEXT:
+            following = peek(index + 1)
+            if following is None or following[1]:
+                return total
+            next_kind = following[0].element_type
+            if kind != 'SceneHeading' and next_kind not in SPEECH:
+                return total
+            return total + SPACE_BEFORE[next_kind] + self._need(peek,
+                                                                index + 1)
+        if kind in SPLITTABLE and total >= 2 * MIN_SPLIT_LINES:
+            return MIN_SPLIT_LINES + (kind == 'Dialogue')
+        return total
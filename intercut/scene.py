@@ -10,15 +10,23 @@ from kivy.core.window import Window
 
 from elements import SuggestiveElement, Parenthetical, SceneHeading, \
     Action, Dialogue, Character
+from model import SceneModel, ElementRecord, model_attribute
 
-from collections import OrderedDict
+import os
 
-Builder.load_file(r'scene.kv')
+kivy_file = os.path.splitext(os.path.abspath(__file__))[0] + '.kv'
+Builder.load_file(kivy_file)
 
 
 # TODO: Write a ScreenplayBehavior that captures keyboard shortcuts concerning
 # TODO: the creation of elements, etc. ?Mixin with focus behavior?
 
+ELEMENT_TYPES = {'Action': Action,
+                 'SceneHeading': SceneHeading,
+                 'Parenthetical': Parenthetical,
+                 'Character': Character,
+                 'Dialogue': Dialogue}
+
 
 class Scene(CompoundSelectionBehavior, GridLayout):
     """A collection of dialogue, action, and creative writing!
@@ -31,23 +39,29 @@ class Scene(CompoundSelectionBehavior, GridLayout):
 
 
     """
+    title = model_attribute('model', 'title')
+    notes = model_attribute('model', 'notes')
+    color = model_attribute('model', 'color')
+    plot_point = model_attribute('model', 'plot_point')
+
     def __init__(self, **kwargs):
+        # The model is where the scene is actually stored; see model.py.
+        self.model = SceneModel()
         super().__init__(**kwargs)
         self.scene_index = 0
-        # Selection parameters
-        self._select_from_index = 0
-        self._select_to_index = 0
-        self._select_to_input = None
-        self._select_from_input = None
 
-        self.title = ''
-        self.notes = ''
-        self.color = [1, 1, 1, 1]
-        self.plot_point = ''
+    def align_scene_indices(self, start=0):
+        """Set element_index on every element from start onwards.
+
+        Inserting or removing a widget at some index only shifts the
+        children after it, so only that suffix needs to be touched.
 
-    def align_scene_indices(self):
-        for e_index, element in enumerate(self.children):
-            element.element_index = e_index
+        Args:
+            start (int): Index of the first child whose index may be stale.
+        """
+        children = self.children
+        for e_index in range(start, len(children)):
+            children[e_index].element_index = e_index
 
     def add_element(self, element):
         """Add an element to scene.
@@ -58,7 +72,10 @@ class Scene(CompoundSelectionBehavior, GridLayout):
             element: The element to be added to Scene.
         """
         self.add_widget(element, index=element.element_index)
+        self.integrate_element(element)
 
+    def integrate_element(self, element):
+        """Run the setup steps that need element to be in the widget tree."""
         if isinstance(element, SuggestiveElement):
             element.update_selections()
 
@@ -67,6 +84,93 @@ class Scene(CompoundSelectionBehavior, GridLayout):
         # override Element.integrate, otherwise it does nothing
         element.integrate()
 
+    def integrate_elements(self):
+        for element in self.children:
+            self.integrate_element(element)
+
+    def insert_elements(self, index, records):
+        """Insert elements for records (in document order) after the element
+        at index in Scene.children, in one batch.
+
+        The new elements are indexed and integrated once, when the bulk load
+        they are added in ends, rather than after every insertion.
+
+        Returns:
+            list: The new elements, in document order.
+        """
+        elements = []
+        for record in records:
+            element = ELEMENT_TYPES[record.element_type](record=record)
+            element.load_text(record.raw_text)
+            elements.append(element)
+        with self.parent.bulk_load():
+            # Each one pushes the ones inserted before it back to a higher
+            # index, i.e. earlier in the document.
+            for element in elements:
+                self.add_widget(element, index=index)
+        return elements
+
+    def paste_elements(self, element, elements):
+        """Paste elements (dicts like Element.get_json) at the cursor of
+        element.
+
+        The text of the first one goes into element at the cursor, and the
+        others follow element as new elements. What followed the cursor ends
+        up after the last one. Elements without a (known) type take the type
+        of element; plain text is classified by clipboard.plain_elements.
+
+        Every SceneHeading after the first element starts a new scene. The
+        elements that followed element in this scene move to the last one.
+        """
+        record = element.record
+        start = min(max(element.cursor_index() - element.raw_offset, 0),
+                    record.text_length())
+        tail = record.raw_text[start:]
+
+        groups = [[]]
+        for json_dict in elements[1:]:
+            element_type = json_dict['type']
+            if element_type not in ELEMENT_TYPES:
+                element_type = record.element_type
+            if element_type == 'SceneHeading':
+                groups.append([])
+            groups[-1].append(
+                ElementRecord(element_type, json_dict['raw_text']))
+        last_record = groups[-1][-1]
+        last_record.raw_text += tail
+
+        record.edit(start, record.text_length(), elements[0]['raw_text'])
+        element.load_text(record.raw_text)
+        screenplay = self.parent
+        models = []
+        for records in groups[1:]:
+            model = SceneModel()
+            for new_record in records:
+                new_record.scene = model
+            model.elements = records
+            models.append(model)
+        index = element.element_index
+        with screenplay.bulk_load():
+            if models:
+                following = self.children[:index]
+                for widget in following:
+                    self.remove_widget(widget)
+                for widget in reversed(following):
+                    widget.record.scene = models[-1]
+                    models[-1].elements.append(widget.record)
+                index = 0
+            new_elements = self.insert_elements(index, groups[0])
+            scenes = screenplay.insert_scenes(self.scene_index, models)
+
+        if scenes:
+            last = scenes[-1].children[len(following)]
+        else:
+            last = new_elements[-1]
+        last.focus = True
+        last.cursor = last.get_cursor_from_index(
+            last.raw_offset + last_record.text_length() - len(tail))
+        self.parent.parent.scroll_to(last)
+
     def next_element(self, source_element):
         new_element = source_element.next_element()
         new_element.element_index = source_element.element_index
@@ -79,8 +183,8 @@ class Scene(CompoundSelectionBehavior, GridLayout):
         raw_source = source_element.raw_text
 
         if isinstance(new_element, SuggestiveElement):
-            new_element.drop_down.dismiss()
-            new_element.text = raw_source.upper()
+            # Not in the screenplay yet, so it cannot show suggestions.
+            new_element.load_text(raw_source)
         elif isinstance(new_element, Parenthetical):
             new_element.text = self.add_parentesis(raw_source)
         else:
@@ -89,8 +193,7 @@ class Scene(CompoundSelectionBehavior, GridLayout):
         new_element.raw_text = raw_source
         new_element.element_index = source_element.element_index
 
-        self.remove_element(source_element)
-        self.add_element(new_element)
+        self.replace_element(source_element, new_element)
         if isinstance(new_element, Parenthetical):
             new_element.do_cursor_movement('cursor_left')
             # FIXME: The line above doesn't set the initial cursor to the left
@@ -108,15 +211,74 @@ class Scene(CompoundSelectionBehavior, GridLayout):
     def add_parentesis(self, string):
         return '(' + string + ')'
 
-    def add_widget(self, widget, **kwargs):
+    def add_widget(self, widget, index=0, **kwargs):
         """Helper for Widget.add_widget() that updates element indices after
         adding new elements to the screenplay.
+
+        Only the elements at or after index (in Scene.children) shift, so only
+        those are re-indexed.
+        """
+        super().add_widget(widget, index=index, **kwargs)
+        if widget.record.scene is not self.model:
+            self.model.insert(len(self.children) - 1 - index, widget.record)
+        if self.is_bulk_loading():
+            # Screenplay.finish_bulk_load indexes this scene once at the end.
+            self.parent.mark_bulk_scene(self)
+            return
+        self.align_scene_indices(start=index)
+        self.update_scene_size(1)
+
+    def remove_widget(self, widget, **kwargs):
+        """Helper for Widget.remove_widget() that re-indexes the elements
+        that followed the removed one.
         """
-        widget.bind(on_touch_move=self.left_click_move,
-                    on_touch_down=self.left_click_down,
-                    on_touch_up=self.left_click_up)
-        super().add_widget(widget, **kwargs)
-        self.parent.align_all_indices()
+        if self.is_bulk_loading():
+            # element_index may be stale until the bulk load finishes.
+            index = self.children.index(widget)
+            self.parent.mark_bulk_scene(self)
+        else:
+            index = widget.element_index
+        self.model.pop(len(self.children) - 1 - index)
+        if self.parent is not None:
+            self.parent.forget_names(widget.record)
+        super().remove_widget(widget, **kwargs)
+        self.align_scene_indices(start=index)
+        self.update_scene_size(-1)
+
+    def replace_element(self, old_element, new_element):
+        """Swap one element for another in place.
+
+        The replacement takes the same index, so no other element moves and
+        nothing needs to be re-indexed.
+        """
+        index = old_element.element_index
+
+        if isinstance(old_element, SuggestiveElement):
+            old_element.dismiss_suggestions()
+        if self.parent is not None:
+            self.parent.forget_names(old_element.record)
+
+        self.model.replace(len(self.children) - 1 - index, new_element.record)
+        super().remove_widget(old_element)
+        super().add_widget(new_element, index=index)
+        new_element.element_index = index
+
+        if isinstance(new_element, SuggestiveElement):
+            new_element.update_selections()
+        new_element.integrate()
+
+    def update_scene_size(self, delta):
+        """Tell the Screenplay that this scene grew or shrank by delta."""
+        # Scene rules in scene.kv add children before the Scene has a parent.
+        # The Screenplay counts those when the Scene itself is added, and
+        # recounts every scene at the end of a bulk load.
+        if self.parent is not None and not self.is_bulk_loading():
+            self.parent.update_scene_size(self, delta)
+
+    def is_bulk_loading(self):
+        """Return True while the Screenplay is inside Screenplay.bulk_load."""
+        screenplay = self.parent
+        return screenplay is not None and screenplay.bulk_depth > 0
 
     def remove_element(self, element, **kwargs):
         """Helper function for removing elements from the screenplay.
@@ -125,10 +287,9 @@ class Scene(CompoundSelectionBehavior, GridLayout):
         new_index = element.element_index
 
         if isinstance(element, SuggestiveElement):
-            element.drop_down.dismiss()
+            element.dismiss_suggestions()
 
-        super().remove_widget(element, **kwargs)
-        self.parent.align_all_indices()
+        self.remove_widget(element, **kwargs)
         f_element = self.get_element_by_index(new_index)
         f_element.focus = True
 
@@ -156,81 +317,14 @@ class Scene(CompoundSelectionBehavior, GridLayout):
         except IndexError:
             return self.children[-1]
 
-    def left_click_move(self, element, touch):
-        """Track final highlighting position across elements.
-
-        The element argument is an instance of the element over which the user
-        hovers while dragging their cursor across the screen. Both this and
-        the touch object pass to this method update automatically.
-
-        This method determines where to stop the selection by storing both the 
-        cursor index and element object on which the touch is released. If the
-        selection spans more than one element, <screenplay>.selection_span is
-        called to handle highlighting the appropriate interstitial elements.
-
-        Args:
-            element: The element object the user is hovering over. Passed by
-                event handler.
-            touch: Touch object for given input event.
-        """
-        if element.collide_point(*touch.pos):
-            cursor = element.get_cursor_from_xy(*touch.pos)
-            self._select_to_index = element.cursor_index(cursor)
-            self._select_to_input = element
-
-
-            if element != self._select_from_input:
-            # if element.element_index != self._select_from_input.element_index:
-                self.selection_span(element, touch)
-
-    def selection_span(self, element, touch):
-        """Track selection across multiple elements.
-
-        This method determines the range between the element initially selected
-        and the current element. For each element internal to this range, all
-        text is selected. The first and last elements are selected
-        appropriately.
-
-        For all of the selections mentioned, <TextInput>.select_text is used to
-        select the text for each element.
+    def do_layout(self, *args):
+        super().do_layout(*args)
+        if self.parent is not None:
+            self.parent.layout_changed()
 
-        Args:
-            element: The element object the user is hovering over.
-            touch: Touch object for give input event.
-
-        Returns:
-
-        """
-        # TODO: Edit this to handle selecting backwards properly.
-        element.focus = True
-        start = self._select_from_input.element_index
-        end = self._select_to_input.element_index
-        for element_index in range(end, start + 1):
-            if element_index == start:
-                self.children[start].select_text(
-                    self._select_from_index,
-                    self._select_from_input.get_length()
-                )
-            elif element_index == end:
-                self.children[end].select_text(0, self._select_to_index)
-            else:
-                self.children[element_index].select_all()
-
-    def left_click_down(self, element, touch):
-        # All elements see this event, so this clears every element selection
-        element.cancel_selection()
-        if element.collide_point(*touch.pos):
-            element.cancel_selection()
-            cursor = element.get_cursor_from_xy(*touch.pos)
-            self._select_from_index = element.cursor_index(cursor)
-            self._select_from_input = element
-            # print("Selecting from (", element.element_index, ",",
-            #       self._select_from_index, ")", sep='')
-
-    def left_click_up(self, element, touch):
-        # FIXME: Why is this being called twice for certain elements?!!
-        self._select_from_index = 0
-        self._select_from_input = None
+    def on_children(self, instance, children):
+        if self.parent is not None:
+            self.parent.layout_changed()
 
     def get_element_from_index(self, element_index):
         return self.children[element_index]
@@ -240,40 +334,30 @@ class Scene(CompoundSelectionBehavior, GridLayout):
         element.focus = True
 
     def get_json(self):
-        json_dict = OrderedDict()
+        return self.model.get_json()
 
-        json_dict['title'] = self.title
-        json_dict['notes'] = self.notes
-        json_dict['color'] = self.color
-        json_dict['plot_point'] = self.plot_point
-
-        json_dict['elements'] = []
-
-        for element in self.children[:]:
-            # Should contain raw_text, element_type
-            json_dict['elements'].append(element.get_json())
+    def load_from_json(self, json_dict):
+        model = SceneModel()
+        model.load_from_json(json_dict)
+        self.bind_model(model)
 
-        json_dict['elements'] = list(reversed(json_dict['elements']))
-        return json_dict
+    def bind_model(self, model):
+        """Display a SceneModel, creating one element widget per record.
 
-    def load_from_json(self, json_dict):
-        self.title = json_dict['title']
-        self.notes = json_dict['notes']
-        self.color = json_dict['color']
-        self.plot_point = json_dict['plot_point']
-
-        get_element = {'Action': Action,
-                       'SceneHeading': SceneHeading,
-                       'Parenthetical': Parenthetical,
-                       'Character': Character,
-                       'Dialogue': Dialogue}
-
-        for item in json_dict['elements']:
-            e_type, raw_text = item['type'], item['raw_text']
-            element = get_element[e_type]()
-            element.raw_text = raw_text
-            if isinstance(element, SuggestiveElement):
-                element.text = raw_text.upper()
-            else:
-                element.text = raw_text
-            self.add_widget(element)
+        The Scene should be empty. The records already belong to the model,
+        so the elements are appended directly and indexed once at the end
+        rather than one insertion at a time.
+        """
+        self.model = model
+        for record in model.elements:
+            element = ELEMENT_TYPES[record.element_type](record=record)
+            element.load_text(record.raw_text)
+            super().add_widget(element)
+
+        if self.is_bulk_loading():
+            self.parent.mark_bulk_scene(self)
+            return
+        self.align_scene_indices()
+        self.update_scene_size(len(model.elements))
+        if self.parent is not None:
+            self.integrate_elements()
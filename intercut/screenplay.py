@@ -4,17 +4,34 @@ A Screenplay is just a BoxLayout for carrying the actual Element widgets.
 
 """
 from kivy.uix.gridlayout import GridLayout
-from kivy.uix.scrollview import ScrollView
+from kivy.uix.recycleview import RecycleView
+from kivy.properties import BooleanProperty, ObjectProperty
 from kivy.uix.behaviors.compoundselection import CompoundSelectionBehavior
 from kivy.lang import Builder
+from kivy.clock import Clock
+from kivy.logger import Logger
 
 from scene import Scene
 from elements import Character, SceneHeading
-
-import json
-from collections import OrderedDict
-
-Builder.load_file(r'screenplay.kv')
+from model import ScreenplayDocument, model_attribute
+from journal import EditJournal
+from pagination import Paginator
+from selection import Anchor, DocumentSelection
+from binaryformat import BINARY_EXTENSION, save_binary
+from fountain import FOUNTAIN_EXTENSION, save_fountain
+from tools.offsettree import OffsetTree
+from tools.extentindex import ExtentIndex
+from tools.nameregistry import NameRegistry
+from suggest import DropSuggestion
+from virtualview import VirtualScreenplayBehavior, ScreenplayRecycleLayout, \
+    RecycledElement, make_row
+
+import io
+import os
+from contextlib import contextmanager
+
+kivy_file = os.path.splitext(os.path.abspath(__file__))[0] + '.kv'
+Builder.load_file(kivy_file)
 
 # TODO: Write a ScreenplayBehavior that captures keyboard shortcuts concerning
 # TODO: the creation of elements, etc. ?Mixin with focus behavior?
@@ -33,15 +50,48 @@ class Screenplay(CompoundSelectionBehavior, GridLayout):
     
     """
 
+    title = model_attribute('document', 'title')
+    author = model_attribute('document', 'author')
+    phone = model_attribute('document', 'phone')
+    email = model_attribute('document', 'email')
+    version = model_attribute('document', 'version')
+    save_to = model_attribute('document', 'save_to')
+    characters = model_attribute('document', 'characters')
+    locations = model_attribute('document', 'locations')
+
     def __init__(self, **kwargs):
-        self.characters = []
-        self.locations = []
-        self.title = 'Untitled'
-        self.author = 'Anonymous'
-        self.phone = ''
-        self.email = ''
-        self.version = ''
-        self.save_to = ''
+        # The document is where the screenplay is actually stored; see
+        # model.py. Scene widgets display the SceneModels in it.
+        self.document = ScreenplayDocument()
+        self.document.paginator = Paginator(self.document)
+        # While the screenplay is shown in the virtualized view, its scenes
+        # have no widgets and are displayed through the rows of
+        # ScrollingScreenplay.data instead. See virtualview.py.
+        self.row_data = None
+        # Number of elements in each scene, indexed like self.children.
+        self.scene_sizes = OffsetTree()
+        # The characters and locations used by the elements, with their
+        # counts and a prefix index for suggestions. See update_names.
+        self.character_names = NameRegistry()
+        self.location_names = NameRegistry()
+        # Created by get_drop_down the first time suggestions are shown.
+        self.drop_down = None
+        # How many scenes of the document are displayed. These are always the
+        # first scenes of the document; see attach_scenes.
+        self.displayed_scenes = 0
+        # See bulk_load.
+        self.bulk_depth = 0
+        self._bulk_scenes = []
+        # Where each element is on screen, to route touches to the element
+        # under them. Rebuilt after layout changes; see element_at_point.
+        self.touch_index = ExtentIndex()
+        # What is selected across elements, and the elements on screen that
+        # show part of it. See refresh_highlight.
+        self.selection = DocumentSelection(self.document)
+        self._highlighted = set()
+        self._highlight_trigger = Clock.create_trigger(self.refresh_highlight)
+        # The uid of the touch dragging the selection, if any.
+        self._selection_touch = None
         super().__init__(**kwargs)
 
     def add_scene(self):
@@ -57,99 +107,626 @@ class Screenplay(CompoundSelectionBehavior, GridLayout):
 
         return new_scene
 
-    def add_widget(self, widget, **kwargs):
-        """Helper for Widget.add_widget() that updates element indices after
-        adding new elements to the screenplay.
+    def add_widget(self, widget, index=0, **kwargs):
+        """Helper for Widget.add_widget() that updates scene indices after
+        adding new scenes to the screenplay.
+
+        Only the scenes at or after index (in Screenplay.children) shift, so
+        only those are re-indexed.
         """
-        super().add_widget(widget, **kwargs)
-        # self.align_all_indices()
+        super().add_widget(widget, index=index, **kwargs)
+        self.displayed_scenes += 1
+        if widget.model.document is not self.document:
+            self.document.insert_scene(len(self.children) - 1 - index,
+                                       widget.model)
+        if self.bulk_depth:
+            self.mark_bulk_scene(widget)
+            return
+        self.align_all_indices(start=index)
+        self.scene_sizes.insert(index, len(widget.children))
 
     def remove_widget(self, widget, **kwargs):
         # FIXME: It probably shouldn't be possible to delete an entire scene.
-        """Helper function for removing elements from the screenplay.
+        """Helper function for removing scenes from the screenplay.
         
         """
+        if self.bulk_depth:
+            index = self.children.index(widget)
+        else:
+            index = widget.scene_index
+        model = self.document.pop_scene(len(self.children) - 1 - index)
+        for record in model.elements:
+            self.forget_names(record)
         super().remove_widget(widget, **kwargs)
-        # self.align_all_indices()
+        self.displayed_scenes -= 1
+        if self.bulk_depth:
+            return
+        self.align_all_indices(start=index)
+        self.scene_sizes.pop(index)
 
-    def align_all_indices(self):
+    def align_all_indices(self, start=0):
         """Align the indices of the Screenplay.children (scene objects) and the their own
-        element_index property.
+        scene_index property.
 
-        This should be called anytime the ordering of the Screenplay elements
-        changes.
+        Element indices are kept up to date by each Scene as elements come
+        and go, so this only has to touch the scenes themselves.
+
+        Args:
+            start (int): Index of the first scene whose index may be stale.
+        """
+        children = self.children
+        for s_index in range(start, len(children)):
+            children[s_index].scene_index = s_index
+
+    @contextmanager
+    def bulk_load(self):
+        """Batch many scene and element insertions into one pass.
+
+        Inside the with block, adding scenes and elements only inserts them
+        into the widget tree and the document. Scene and element indices,
+        scene sizes, suggestion lists and Element.integrate are all brought
+        up to date once, by finish_bulk_load, when the outermost block
+        exits. Elements built from a document load their text without
+        firing the on_text handlers (see Element.load_text), so no
+        suggestion drop downs are built either, and nothing forces a layout
+        pass before Kivy's own (coalesced) layout triggers run.
+
+        Indices are stale inside the block, so nothing that depends on them
+        (focus movement, get_position, ...) should be called there.
+
+        Example:
+            with screenplay.bulk_load():
+                for model in scene_models:
+                    ...
         """
-        print("align_all_indicies called.")
-        print(list(enumerate(self.children)))
-        for s_index, scene in enumerate(self.children):
-            scene.scene_index = s_index
+        self.bulk_depth += 1
+        try:
+            yield self
+        finally:
+            self.bulk_depth -= 1
+            if not self.bulk_depth:
+                self.finish_bulk_load()
+
+    def mark_bulk_scene(self, scene):
+        """Remember that scene changed during the current bulk load."""
+        self._bulk_scenes.append(scene)
+
+    def finish_bulk_load(self):
+        """Apply the bookkeeping deferred by bulk_load in a single pass."""
+        scenes, self._bulk_scenes = self._bulk_scenes, []
+        self.align_all_indices()
+        self.scene_sizes.rebuild(len(scene.children) for scene in self.children)
+
+        seen = set()
+        for scene in scenes:
+            if id(scene) in seen or scene.parent is not self:
+                continue
+            seen.add(id(scene))
             scene.align_scene_indices()
+            scene.integrate_elements()
+
+    def update_scene_size(self, scene, delta):
+        """Record that scene gained (or lost) delta elements."""
+        self.scene_sizes.add(scene.scene_index, delta)
+
+    def get_position(self, element):
+        """Return the position of element counted over the whole screenplay.
+
+        Positions are in document order: the first element of the first
+        scene is 0. O(log n) in the number of scenes.
+        """
+        scene = element.parent
+        # Scenes and elements are both reverse ordered in the widget tree.
+        from_end = self.scene_sizes.prefix(scene.scene_index) \
+            + element.element_index
+        return self.scene_sizes.total() - 1 - from_end
 
-    def update_characters(self, new_character):
-        if new_character:
-            character = new_character.strip()
-            lower_character = character.lower()
-            lower_characters = [char.lower() for char in self.characters]
-            if lower_character in lower_characters:
-                return
-            else:
-                self.characters.append(character)
-
-    def update_locations(self, new_location):
-        if new_location:
-            location = new_location.strip()
-            lower_loc = location.lower()
-            lower_locs = [scn.lower() for scn in self.locations]
-            if lower_loc in lower_locs:
-                return
-            else:
-                self.locations.append(location)
-            print(self.locations)
+    def get_element_at(self, position):
+        """Return the element at a position counted over the whole screenplay.
+
+        This is the inverse of get_position and is O(log n) in the number of
+        scenes.
+
+        Raises:
+            IndexError: If there is no element at position.
+        """
+        from_end = self.scene_sizes.total() - 1 - position
+        scene_index, element_index = self.scene_sizes.find(from_end)
+        return self.children[scene_index].children[element_index]
+
+    def do_layout(self, *args):
+        super().do_layout(*args)
+        self.layout_changed()
+
+    def on_children(self, instance, children):
+        self.layout_changed()
+
+    def layout_changed(self):
+        """Note that elements may have moved (or scrolled). See
+        element_at_point."""
+        self.touch_index.invalidate()
+        if self._highlighted or self.selection.spans_elements():
+            self._highlight_trigger()
+
+    def element_at_point(self, x, y):
+        """Return the element at (x, y), or None.
+
+        The elements are found by height in the touch_index, which is
+        rebuilt first if the layout changed since it was last used.
+        """
+        element = self.get_touch_index().find(y)
+        if element is None or not element.collide_point(x, y):
+            return None
+        return element
+
+    def get_touch_index(self):
+        """Return the touch_index, rebuilt first if the layout changed."""
+        index = self.touch_index
+        if index.stale:
+            # Children are in reverse order, so this goes bottom up.
+            index.rebuild((element.y, element.top, element)
+                          for scene in self.children
+                          for element in scene.children)
+        return index
+
+    def on_touch_down(self, touch):
+        """Route the touch to the element under it, and start a selection
+        there.
+
+        Only that element and the elements highlighting the previous
+        selection hear about the touch, instead of every element of the
+        screenplay.
+        """
+        if self.row_data is not None:
+            return super().on_touch_down(touch)
+        element = self.element_at_point(*touch.pos)
+        if element is None:
+            self.selection.clear()
+            self.refresh_highlight()
+            return False
+        self.selection.start(self.anchor_at(element, touch.pos))
+        self.refresh_highlight()
+        self._selection_touch = touch.uid
+        return element.dispatch('on_touch_down', touch)
+
+    def on_touch_move(self, touch):
+        # The element the touch went down on grabbed it, and gets its moves
+        # directly from Kivy. This only extends the selection.
+        if self.row_data is not None:
+            return super().on_touch_move(touch)
+        if touch.uid != self._selection_touch:
+            return False
+        element = self.element_at_point(*touch.pos)
+        if element is not None:
+            self.selection.extend(self.anchor_at(element, touch.pos))
+            if self._highlighted or self.selection.spans_elements():
+                self._highlight_trigger()
+        return False
+
+    def on_touch_up(self, touch):
+        if self.row_data is not None:
+            return super().on_touch_up(touch)
+        if touch.uid == self._selection_touch:
+            self._selection_touch = None
+        return False
+
+    def anchor_at(self, element, pos):
+        """Return the Anchor of the text of element at pos."""
+        index = element.cursor_index(element.get_cursor_from_xy(*pos))
+        return self.get_anchor(element, index)
+
+    def get_anchor(self, element, index):
+        """Return the Anchor of the cursor index in the text of element."""
+        scene = element.parent
+        offset = min(max(index - element.raw_offset, 0),
+                     element.record.text_length())
+        return Anchor(len(self.children) - 1 - scene.scene_index,
+                      len(scene.children) - 1 - element.element_index, offset)
+
+    def get_element_widget(self, scene_index, element_index):
+        """Return the element displaying a position of the document, or None
+        if its scene is not displayed."""
+        children = self.children
+        if self.row_data is not None or scene_index >= len(children):
+            return None
+        scene = children[len(children) - 1 - scene_index]
+        return scene.children[len(scene.children) - 1 - element_index]
+
+    def visible_elements(self):
+        """Return the elements inside the view, bottom up."""
+        low, high = self.y, self.top
+        view = self.parent
+        if view is not None:
+            low = max(low, self.to_widget(*view.to_window(*view.pos))[1])
+            high = min(high, self.to_widget(*view.to_window(view.right,
+                                                            view.top))[1])
+        return self.get_touch_index().find_range(low, high)
+
+    def refresh_highlight(self, *args):
+        """Highlight the selected text of the elements on screen.
+
+        A selection spanning several elements is shown by selecting text in
+        each element it covers, but only in those on screen: this runs
+        again whenever the view scrolls or the layout changes, so selecting a
+        whole script only ever touches a screenful of elements.
+        """
+        selection = self.selection
+        highlighted = set()
+        if self.row_data is None and selection.spans_elements():
+            children = self.children
+            for element in self.visible_elements():
+                scene = element.parent
+                selected = selection.range_in(
+                    len(children) - 1 - scene.scene_index,
+                    len(scene.children) - 1 - element.element_index)
+                if selected is None:
+                    continue
+                start, end = selected
+                offset = element.raw_offset
+                start = start + offset if start else 0
+                end = len(element.text) if end == element.record.text_length() \
+                    else end + offset
+                element.select_text(start, end)
+                highlighted.add(element)
+        for element in self._highlighted - highlighted:
+            element.cancel_selection()
+        self._highlighted = highlighted
+
+    def select_document(self):
+        """Select the whole screenplay."""
+        self.selection.select_all()
+        self.refresh_highlight()
+
+    def get_selection_text(self):
+        """Return the text of the selection if it spans several elements,
+        else None."""
+        if not self.selection.spans_elements():
+            return None
+        return self.selection.get_text()
+
+    def get_selection_elements(self):
+        """Return the selection as a list of elements (see
+        DocumentSelection.get_elements) if it spans several elements, else
+        None."""
+        if not self.selection.spans_elements():
+            return None
+        return self.selection.get_elements()
+
+    def delete_selection(self):
+        """Delete the selection, if it spans several elements.
+
+        Elements selected whole are removed, and so are scenes selected
+        whole. The element at the start of the selection is always kept, and
+        gets the cursor.
+
+        Returns:
+            Element: The element with the cursor, or None if there was no
+                such selection.
+        """
+        selection = self.selection
+        if not selection.spans_elements():
+            return None
+        first, last = selection.bounds()
+        selection.clear()
+        self.refresh_highlight()
+
+        scenes = self.document.scenes
+        with self.bulk_load():
+            for scene_index in range(last.scene, first.scene - 1, -1):
+                model = scenes[scene_index]
+                start = first.element if scene_index == first.scene else 0
+                stop = len(model) - 1
+                if scene_index == last.scene:
+                    stop = last.element
+                    record = model.elements[stop]
+                    if last.offset < record.text_length():
+                        self._cut_text(scene_index, stop, 0, last.offset)
+                        stop -= 1
+                if scene_index == first.scene:
+                    record = model.elements[start]
+                    end = last.offset if (scene_index, start) == last[:2] \
+                        else record.text_length()
+                    self._cut_text(scene_index, start, first.offset, end)
+                    start += 1
+                elif start == 0 and stop == len(model) - 1:
+                    self._remove_scene(scene_index)
+                    continue
+                for element_index in range(stop, start - 1, -1):
+                    self._remove_element(scene_index, element_index)
+
+        element = self.get_element_widget(first.scene, first.element)
+        if element is not None:
+            element.focus = True
+            element.cursor = element.get_cursor_from_index(
+                first.offset + element.raw_offset)
+        return element
+
+    def _cut_text(self, scene_index, element_index, start, end):
+        record = self.document.scenes[scene_index].elements[element_index]
+        if start == end:
+            return
+        record.edit(start, end, '')
+        element = self.get_element_widget(scene_index, element_index)
+        if element is not None:
+            element.load_text(record.raw_text)
+        if record.element_type == 'Character':
+            self.update_characters(record)
+        elif record.element_type == 'SceneHeading':
+            self.update_locations(record)
+
+    def _remove_element(self, scene_index, element_index):
+        element = self.get_element_widget(scene_index, element_index)
+        if element is not None:
+            element.parent.remove_widget(element)
+            return
+        record = self.document.scenes[scene_index].pop(element_index)
+        self.forget_names(record)
+
+    def _remove_scene(self, scene_index):
+        children = self.children
+        if scene_index < len(children):
+            self.remove_widget(children[len(children) - 1 - scene_index])
+            return
+        for record in self.document.pop_scene(scene_index).elements:
+            self.forget_names(record)
+
+    def get_drop_down(self, element):
+        """Return the suggestion DropDown, attached to element.
+
+        Only the focused element can show suggestions, so a single
+        DropSuggestion serves every SuggestiveElement of the screenplay.
+        It is created the first time it is needed.
+        """
+        drop_down = self.drop_down
+        if drop_down is None:
+            drop_down = self.drop_down = DropSuggestion()
+            drop_down.bind(on_select=self.on_suggestion_select)
+        if drop_down.owner is not element:
+            drop_down.dismiss()
+            drop_down.owner = element
+        return drop_down
+
+    def on_suggestion_select(self, drop_down, text):
+        if drop_down.owner is not None:
+            drop_down.owner.on_select(drop_down, text)
+
+    def update_characters(self, record):
+        """Register the name a Character record uses."""
+        self.update_names(self.character_names, 'characters', record)
+
+    def update_locations(self, record):
+        """Register the location a SceneHeading record uses."""
+        self.update_names(self.location_names, 'locations', record)
+
+    def update_names(self, registry, field, record):
+        """Register the text of record as a name in registry.
+
+        A name is added to the characters or locations of the document the
+        first time an element uses it, and removed as soon as no element
+        uses it anymore.
+
+        Args:
+            registry (NameRegistry): character_names or location_names.
+            field (str): 'characters' or 'locations'.
+            record (ElementRecord): The record of the element.
+        """
+        added, dropped = registry.register(record, record.raw_text,
+                                           record.scene)
+        self._apply_names(field, added, dropped)
+
+    def forget_names(self, record):
+        """Unregister the name used by a record leaving the screenplay."""
+        self._apply_names('characters',
+                          None, self.character_names.unregister(record))
+        self._apply_names('locations',
+                          None, self.location_names.unregister(record))
+
+    def _apply_names(self, field, added, dropped):
+        if dropped is not None:
+            self.document.remove_name(field, dropped)
+        if added is not None:
+            self.document.add_name(field, added)
+
+    def rebuild_names(self):
+        """Register the names used by every element of the document.
+
+        Names listed in the document that no element uses are dropped.
+        """
+        registries = {'Character': self.character_names,
+                      'SceneHeading': self.location_names}
+        for registry in registries.values():
+            registry.clear()
+        document = self.document
+        for scene in document.scenes:
+            for record in scene.elements:
+                registry = registries.get(record.element_type)
+                if registry is not None:
+                    registry.register(record, record.raw_text, scene)
+
+        for field, registry in (('characters', self.character_names),
+                                ('locations', self.location_names)):
+            names = registry.names()
+            if names != getattr(document, field):
+                setattr(document, field, names)
+                document.header_changed(field)
 
     def get_json(self):
-        json_dict = OrderedDict()
-        json_dict['title'] = self.title
-        json_dict['author'] = self.author
-        json_dict['phone'] = self.phone
-        json_dict['email'] = self.email
-        json_dict['locations'] = self.locations
-        json_dict['characters'] = self.characters
-        json_dict['version'] = self.version
-        json_dict['save_to'] = self.save_to
-
-        json_dict['scenes'] = []
-        print('scene.children', self.children[:])
+        """Return the screenplay as a JSON string.
 
-        for scene in self.children[:]:
-            json_dict['scenes'].append(scene.get_json())
+        Unchanged scenes are not re-encoded; see SceneModel.dumps.
+        """
+        stream = io.StringIO()
+        self.document.write_json(stream)
+        return stream.getvalue()
+
+    def write_json(self, stream):
+        """Write the screenplay to stream; see ScreenplayDocument.write_json."""
+        self.document.write_json(stream)
+
+    def save(self):
+        """Write the screenplay to save_to and journal later edits next to it.
 
-        json_dict['scenes'] = list(reversed(json_dict['scenes']))
-        print(json_dict['scenes'])
+        Once the file exists, a snapshot of the document is streamed to it
+        on a worker thread; the edits are safe in the journal meanwhile. See
+        EditJournal.compact.
 
-        return json.dumps(json_dict, indent=4)
+        Files with the binary extension are written in the binary format
+        instead (see binaryformat.py), and files with the Fountain extension
+        in Fountain (see fountain.py). Those are written at once and are not
+        journaled or autosaved.
+
+        Nothing is written while the scenes of the document are still being
+        read (see loader.py), as that would cut the file short.
+        """
+        document = self.document
+        if document.loading:
+            Logger.warning('Screenplay: Not saving {} before it has '
+                           'loaded'.format(self.save_to))
+            return
+        if self.save_to.endswith(BINARY_EXTENSION):
+            self.close_journal()
+            save_binary(document, self.save_to)
+            return
+        if self.save_to.endswith(FOUNTAIN_EXTENSION):
+            self.close_journal()
+            save_fountain(document, self.save_to)
+            return
+
+        journal = document.journal
+        if journal is None or journal.path != self.save_to:
+            self.close_journal()
+            journal = document.journal = EditJournal(document, self.save_to)
+            journal.save()
+            return
+        if journal.compacting:
+            # Wait for the write in progress, then write the edits since.
+            journal.writer.join()
+        if journal.failed or document.revision != journal.saved_revision:
+            journal.compact()
+
+    def close_journal(self):
+        """Stop journaling edits. The journal file is kept for recovery."""
+        journal = self.document.journal
+        if journal is not None:
+            journal.close()
+            self.document.journal = None
 
     def load_from_json(self, json_dict):
-        self.title = json_dict['title']
-        self.author = json_dict['author']
-        self.phone = json_dict['phone']
-        self.email = json_dict['email']
-        self.locations = json_dict['locations']
-        self.characters = json_dict['characters']
-        self.version = json_dict['version']
-        self.save_to = json_dict['save_to']
-
-        print('load:', self.children[:])
-        print('scenes:', json_dict['scenes'])
-
-        for item in json_dict['scenes']:
-            scene = Scene()
-            scene.clear_widgets()
-            scene.load_from_json(item)
-            self.add_widget(scene)
+        document = ScreenplayDocument()
+        document.load_from_json(json_dict)
+        self.load_document(document)
+        self.attach_scenes()
 
-        self.align_all_indices()
+    def load_document(self, document):
+        """Replace the document, without displaying any of it yet.
 
+        Call attach_scenes to display some or all of its scenes.
+        """
+        self.detach_scenes()
+        self.close_journal()
+        self.document = document
+        document.paginator = Paginator(document)
+        self.selection = DocumentSelection(document)
+        self.refresh_highlight()
+        self.rebuild_names()
+
+    def count_pages(self):
+        """Return the number of pages of the document when printed.
+
+        Not page_count, which CompoundSelectionBehavior uses for its page
+        up and down keys.
+        """
+        return self.document.paginator.page_count()
+
+    def attach_scenes(self, count=None):
+        """Display the next count scenes of the document (all if None).
+
+        One Scene widget is built per SceneModel. Scenes are always attached
+        in document order, after the ones already displayed, so the displayed
+        scenes are a prefix of the document; this is what lets a file be
+        displayed progressively (see loader.py). In the virtualized view no
+        widgets are built; the elements are appended to the rows of the view
+        instead.
+        """
+        start = self.displayed_scenes
+        stop = None if count is None else start + count
+        models = self.document.scenes[start:stop]
+
+        if self.row_data is not None:
+            self.row_data.extend(make_row(record) for model in models
+                                 for record in model.elements)
+            self.displayed_scenes += len(models)
+            return
 
+        self.insert_scenes(0, models)
+
+    def insert_scenes(self, index, models):
+        """Display new SceneModels (in document order) after the scene at
+        index in Screenplay.children, in one batch.
+
+        The models are inserted into the document as well, unless they are
+        in it already.
+
+        Returns:
+            list: The new scenes, in document order.
+        """
+        scenes = []
+        with self.bulk_load():
+            # Each one pushes the ones inserted before it back to a higher
+            # index, i.e. earlier in the document.
+            for model in models:
+                scene = Scene()
+                scene.clear_widgets()
+                scene.model = model
+                self.add_widget(scene, index=index)
+                scene.bind_model(model)
+                scenes.append(scene)
+        return scenes
+
+    def detach_scenes(self):
+        """Stop displaying the document, leaving the document untouched."""
+        for scene in self.children[:]:
+            super().remove_widget(scene)
+        if self.row_data is not None:
+            del self.row_data[:]
+        self.scene_sizes.rebuild(())
+        self.displayed_scenes = 0
+
+
+class ScrollingScreenplay(VirtualScreenplayBehavior, RecycleView):
+    """The scrolling view that displays a Screenplay.
+
+    By default the view holds the Screenplay itself, with one widget per
+    element. When virtualized is set, the elements of the Screenplay's
+    document are listed as rows of RecycleView data and only the rows near
+    the viewport are given a widget. The Screenplay object stays the owner
+    of the document either way, so callers should always go through
+    ScrollingScreenplay.screenplay rather than the widget tree.
+
+    The virtualized view is only ever switched on by the user (Ctrl+L): its
+    rows have no suggestions, document-wide selection, typed clipboard or
+    touch routing, which the classic view provides.
+    """
 
-class ScrollingScreenplay(ScrollView):
-    pass
+    virtualized = BooleanProperty(False)
+    screenplay = ObjectProperty(None)
+
+    def add_widget(self, widget, *args, **kwargs):
+        if isinstance(widget, Screenplay):
+            self.screenplay = widget
+        super().add_widget(widget, *args, **kwargs)
+
+    def on_virtualized(self, instance, virtualized):
+        screenplay = self.screenplay
+
+        screenplay.detach_scenes()
+        if virtualized:
+            self.remove_widget(screenplay)
+            self.add_widget(ScreenplayRecycleLayout(viewclass=RecycledElement))
+            screenplay.row_data = self.data
+        else:
+            self.remove_widget(self.layout_manager)
+            screenplay.row_data = None
+            self.add_widget(screenplay)
+        screenplay.attach_scenes()
+        self.scroll_y = 1
@@ -0,0 +1,151 @@
+"""A selection spanning any number of elements and scenes.
+
+Each element (a TextInput) can only select its own text. A DocumentSelection
+is kept by the Screenplay instead, in terms of the document itself: both of
+its ends are Anchors, i.e. (scene, element, offset) positions in the
+ScreenplayDocument, so it costs nothing to select a whole script, and it
+does not matter which end comes first (selecting backwards).
+
+Nothing here touches the element widgets. The Screenplay highlights the
+selected text of the elements on screen only (see
+Screenplay.refresh_highlight), and copies or deletes the selection through
+the document in one pass.
+
+Example:
+    selection = DocumentSelection(document)
+    selection.start(Anchor(3, 2, 10))
+    selection.extend(Anchor(1, 0, 4))
+    selection.get_text()
+"""
+from collections import namedtuple
+
+
+class Anchor(namedtuple('Anchor', ('scene', 'element', 'offset'))):
+    """A position in a ScreenplayDocument.
+
+    Attributes:
+        scene (int): Index of the scene in the document.
+        element (int): Index of the element in the scene.
+        offset (int): Offset in the raw_text of the element.
+
+    Anchors compare in document order.
+    """
+
+    __slots__ = ()
+
+
+class DocumentSelection:
+    """The text between two Anchors of a ScreenplayDocument.
+
+    The selection only holds while the document is unchanged: any edit
+    (which bumps ScreenplayDocument.revision) makes it inactive, since the
+    anchors may not point at the same text anymore.
+
+    Args:
+        document (ScreenplayDocument): The document selected from.
+
+    Attributes:
+        anchor (Anchor): Where the selection started, or None.
+        focus (Anchor): Where the selection ends, on either side of anchor.
+    """
+
+    def __init__(self, document):
+        self.document = document
+        self.anchor = None
+        self.focus = None
+        self.revision = None
+
+    def start(self, anchor):
+        """Start an empty selection at anchor."""
+        self.anchor = self.focus = anchor
+        self.revision = self.document.revision
+
+    def extend(self, focus):
+        """Move the end of the selection to focus."""
+        if not self.is_active():
+            self.start(focus)
+        else:
+            self.focus = focus
+
+    def clear(self):
+        self.anchor = self.focus = None
+
+    def select_all(self):
+        scenes = self.document.scenes
+        if not scenes or not scenes[-1].elements:
+            self.clear()
+            return
+        last = scenes[-1].elements[-1]
+        self.start(Anchor(0, 0, 0))
+        self.focus = Anchor(len(scenes) - 1, len(scenes[-1]) - 1,
+                            last.text_length())
+
+    def is_active(self):
+        return (self.anchor is not None
+                and self.revision == self.document.revision)
+
+    def spans_elements(self):
+        """Return True if the selection covers more than one element.
+
+        A selection within a single element is left to the element itself.
+        """
+        return self.is_active() and self.anchor[:2] != self.focus[:2]
+
+    def bounds(self):
+        """Return the (first, last) Anchors of the selection."""
+        return min(self.anchor, self.focus), max(self.anchor, self.focus)
+
+    def range_in(self, scene_index, element_index):
+        """Return the (start, end) offsets selected in an element, or None.
+
+        O(1), so that highlighting an element on screen does not depend on
+        the size of the selection.
+        """
+        if not self.is_active():
+            return None
+        first, last = self.bounds()
+        position = (scene_index, element_index)
+        if not first[:2] <= position <= last[:2]:
+            return None
+        start = first.offset if position == first[:2] else 0
+        if position == last[:2]:
+            end = last.offset
+        else:
+            record = self.document.scenes[scene_index].elements[element_index]
+            end = record.text_length()
+        return start, end
+
+    def iter_ranges(self):
+        """Yield (scene index, element index, record, start, end) for each
+        selected element, in document order."""
+        if not self.is_active():
+            return
+        first, last = self.bounds()
+        scenes = self.document.scenes
+        for scene_index in range(first.scene, last.scene + 1):
+            elements = scenes[scene_index].elements
+            start_index = first.element if scene_index == first.scene else 0
+            end_index = last.element if scene_index == last.scene \
+                else len(elements) - 1
+            for element_index in range(start_index, end_index + 1):
+                record = elements[element_index]
+                position = (scene_index, element_index)
+                start = first.offset if position == first[:2] else 0
+                end = last.offset if position == last[:2] \
+                    else record.text_length()
+                yield scene_index, element_index, record, start, end
+
+    def get_text(self):
+        """Return the selected text, one line per element."""
+        return '\n'.join(record.raw_text[start:end]
+                         for _, _, record, start, end in self.iter_ranges())
+
+    def get_elements(self):
+        """Return the selected part of each element, like
+        ElementRecord.get_json."""
+        elements = []
+        for _, _, record, start, end in self.iter_ranges():
+            json_dict = record.get_json()
+            json_dict['raw_text'] = json_dict['raw_text'][start:end]
+            elements.append(json_dict)
+        return elements
@@ -4,11 +4,28 @@ from kivy.properties import BooleanProperty
 
 
 class DropSuggestion(DropDown):
+    """A DropDown listing suggestions for the text of an element.
+
+    The drop down keeps a pool of SuggestionButtons and reuses them: setting
+    new options only changes the text of the buttons already shown, and
+    adds or removes the few that make up the difference in number. Each
+    button is bound once, when it is created.
+
+    The highlighted option is tracked by its index in the options, top
+    first.
+
+    Attributes:
+        owner: The element the suggestions are for, if any.
+    """
 
     is_open = BooleanProperty(False)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        self.owner = None
+        self.pool = []
+        self.option_count = 0
+        self.highlight_index = None
 
     def on_dismiss(self):
         self.is_open = False
@@ -17,53 +34,60 @@ class DropSuggestion(DropDown):
         super().open(widget)
         self.is_open = True
 
-    def move_highlight(self, increment=None):
-
-        options = self.container.children
+    def set_options(self, options):
+        """Show options (a list of strings), top first."""
+        pool = self.pool
+        count = len(options)
+        while len(pool) < count:
+            button = SuggestionButton()
+            button.bind(on_release=self.on_button_release)
+            pool.append(button)
+
+        for button in pool[count:self.option_count]:
+            self.remove_widget(button)
+        for button in pool[self.option_count:count]:
+            self.add_widget(button)
+        for button, text in zip(pool, options):
+            button.text = text
+
+        self.option_count = count
+        if self.highlight_index is not None:
+            pool[self.highlight_index].highlighted = False
+            self.highlight_index = None
+
+    def on_button_release(self, button):
+        self.select(button.text)
 
-        if not (self.is_open and options):
+    def move_highlight(self, increment=None):
+        if not (self.is_open and self.option_count):
             return
 
-        if increment is None:
+        if increment is None or self.highlight_index is None:
             self.set_highlight()
             return
 
-        for index, option in enumerate(options):
-            if option.highlighted:
-                try:
-                    # Because kivy widget tree is reverse indexed, a minus.
-                    self.set_highlight(options[index - increment])
-                    return
-                except IndexError:
-                    self.set_highlight(options[0])
-                    return
-
-    def set_highlight(self, button=None):
-        """Highlight button and clear highlight from all other buttons.
-        
-        If no button is passed, the top button will be highlighted.
-        """
-        options = self.container.children
+        self.set_highlight((self.highlight_index + increment)
+                           % self.option_count)
 
-        if not (self.is_open and options):
-            return
+    def set_highlight(self, index=0):
+        """Highlight the option at index and clear the previous highlight.
 
-        if button is None:
-            button = options[-1]
+        If no index is passed, the top option will be highlighted. Options
+        are ranked most likely first (see NameRegistry.rank), so that
+        pre-selects the most likely candidate.
+        """
+        if not (self.is_open and self.option_count):
+            return
 
-        for option in options:
-            if button is option:
-                option.highlighted = True
-            else:
-                option.highlighted = False
+        if self.highlight_index is not None:
+            self.pool[self.highlight_index].highlighted = False
+        self.pool[index].highlighted = True
+        self.highlight_index = index
 
     def get_selection_text(self):
-        options = self.container.children
-
-        for option in options:
-            if option.highlighted:
-                return option.text
-        return ''
+        if self.highlight_index is None:
+            return ''
+        return self.pool[self.highlight_index].text
 
 
 class SuggestionButton(Button):
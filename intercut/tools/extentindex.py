@@ -0,0 +1,66 @@
+from bisect import bisect_right
+
+
+class ExtentIndex:
+    """The vertical extents of stacked items, to find the item at a height.
+
+    The Screenplay uses this to find the element under a touch: elements
+    are stacked in a single column, so sorting them by their bottom edge
+    and bisecting finds the one at a height in O(log n), instead of asking
+    every element whether it collides with the touch.
+
+    The index does not follow the items as they move. Call invalidate when
+    the layout changes; the owner rebuilds the index the next time it is
+    stale and needed, so many layout passes cost a single rebuild.
+
+    Example:
+        >>> index = ExtentIndex()
+        >>> index.rebuild([(0, 10, 'c'), (10, 25, 'b'), (30, 40, 'a')])
+        >>> index.find(12), index.find(27), index.find(40)
+        ('b', None, 'a')
+        >>> index.find_range(5, 27)
+        ['c', 'b']
+    """
+
+    def __init__(self):
+        self.bottoms = []
+        self.tops = []
+        self.items = []
+        self.stale = True
+
+    def __len__(self):
+        return len(self.items)
+
+    def invalidate(self):
+        self.stale = True
+
+    def rebuild(self, extents):
+        """Replace the index with extents, in O(n).
+
+        Args:
+            extents: (bottom, top, item) tuples, lowest first. Items must not
+                overlap.
+        """
+        self.bottoms = []
+        self.tops = []
+        self.items = []
+        for bottom, top, item in extents:
+            self.bottoms.append(bottom)
+            self.tops.append(top)
+            self.items.append(item)
+        self.stale = False
+
+    def find_range(self, low, high):
+        """Return the items whose extent overlaps low to high, lowest first.
+        """
+        start = max(bisect_right(self.bottoms, low) - 1, 0)
+        if start < len(self.items) and self.tops[start] < low:
+            start += 1
+        return self.items[start:bisect_right(self.bottoms, high)]
+
+    def find(self, y):
+        """Return the item whose extent holds y, or None."""
+        index = bisect_right(self.bottoms, y) - 1
+        if index < 0 or y > self.tops[index]:
+            return None
+        return self.items[index]
@@ -0,0 +1,83 @@
+"""Write files safely, and without blocking the calling thread."""
+import os
+import queue
+import threading
+import time
+
+
+def write_file(path, contents):
+    """Replace the file at path with contents, without ever truncating it.
+
+    The text goes to a temporary file first, which is then moved over path,
+    so a crash leaves either the old file or the new one, never half of one.
+
+    Args:
+        path (str): File to replace.
+        contents: The new text of the file, or a function writing it to the
+            text stream it is given.
+
+    Returns:
+        What the contents function returned, if contents is a function.
+    """
+    temp_path = path + '.tmp'
+    result = None
+    with open(temp_path, 'w', encoding='utf-8', newline='') as stream:
+        if callable(contents):
+            result = contents(stream)
+        else:
+            stream.write(contents)
+        stream.flush()
+        os.fsync(stream.fileno())
+    os.replace(temp_path, path)
+    return result
+
+
+class BackgroundWriter:
+    """Write files, one after the other, on a worker thread.
+
+    Example:
+        writer = BackgroundWriter()
+        writer.submit(path, text, done=report)
+        writer.submit(path, document.write_json)
+    """
+
+    def __init__(self):
+        self.jobs = queue.Queue()
+        # Held while a file is being written.
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def submit(self, path, contents, done=None):
+        """Queue contents to be written to path with write_file.
+
+        Args:
+            path (str): File to replace.
+            contents: The new text of the file, or a function writing it
+                (called on the worker thread); see write_file.
+            done: Called as done(latency, error) on the worker thread, still
+                holding the lock, once the file is written. latency is the
+                time the write took in seconds, and error is the OSError
+                raised by the write, or None.
+        """
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+        self.jobs.put((path, contents, done))
+
+    def join(self):
+        """Wait until every queued file has been written."""
+        self.jobs.join()
+
+    def _run(self):
+        while True:
+            path, contents, done = self.jobs.get()
+            with self.lock:
+                start = time.perf_counter()
+                error = None
+                try:
+                    write_file(path, contents)
+                except OSError as err:
+                    error = err
+                if done is not None:
+                    done(time.perf_counter() - start, error)
+            self.jobs.task_done()
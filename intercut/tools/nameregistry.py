@@ -0,0 +1,201 @@
+from tools.prefixindex import PrefixIndex
+
+
+def normalize(name):
+    """Return the key under which name is registered.
+
+    Names that differ only by case or spacing are the same name.
+    """
+    return ' '.join(name.lower().split())
+
+
+class NameEntry:
+    """What the NameRegistry knows about one name.
+
+    Attributes:
+        spelling (str): The canonical spelling: the first one registered.
+        count (int): Number of elements using the name.
+        scenes (dict): Number of elements using the name, per scene.
+        last_used (int): NameRegistry.clock when an element last used the
+            name.
+    """
+
+    __slots__ = ('spelling', 'count', 'scenes', 'last_used')
+
+    def __init__(self, spelling):
+        self.spelling = spelling
+        self.count = 0
+        self.scenes = {}
+        self.last_used = 0
+
+
+class NameRegistry:
+    """The names (characters or locations) used in a screenplay.
+
+    Each element using a name is registered as an occurrence of that name,
+    identified by the element's record. Registering a record again with a
+    new name moves its occurrence to that name, and a name is dropped as soon
+    as no element uses it anymore. All of this is O(1) per change (plus the
+    prefix index upkeep when a name appears or disappears).
+
+    Names are kept in the order they were first used, and the registry
+    keeps a PrefixIndex of them for suggestions. rank orders the suggestions
+    by the counts and by how recently each name was used. Both are kept up
+    to date as ranks of the index as names are registered, so rank only
+    looks at the names it returns.
+
+    Example:
+        >>> registry = NameRegistry()
+        >>> registry.register('record 1', 'Bob', 'scene 1')
+        ('Bob', None)
+        >>> registry.register('record 2', 'BOB ', 'scene 2')
+        (None, None)
+        >>> registry.count('bob'), registry.spelling('bob')
+        (2, 'Bob')
+        >>> registry.register('record 1', 'Alice', 'scene 1')
+        ('Alice', None)
+        >>> registry.unregister('record 2')
+        'Bob'
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.occurrences = {}
+        self.index = PrefixIndex()
+        # Bumped by every registration, to tell which names were used last.
+        self.clock = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, name):
+        return normalize(name) in self.entries
+
+    def names(self):
+        """Return the canonical spelling of every name in use."""
+        return [entry.spelling for entry in self.entries.values()]
+
+    def spelling(self, name):
+        return self.entries[normalize(name)].spelling
+
+    def count(self, name):
+        """Return how many elements use name (0 if none)."""
+        entry = self.entries.get(normalize(name))
+        return 0 if entry is None else entry.count
+
+    def scenes(self, name):
+        """Return the scenes in which name is used."""
+        entry = self.entries.get(normalize(name))
+        return [] if entry is None else list(entry.scenes)
+
+    def first_and_last_scene(self, name, scene_order):
+        """Return the first and last scene using name, or (None, None).
+
+        Args:
+            name (str): The name to look up.
+            scene_order: Maps each scene to its position in the screenplay,
+                e.g. a dict, or the index method of the list of scenes.
+        """
+        scenes = self.scenes(name)
+        if not scenes:
+            return None, None
+        key = scene_order.__getitem__ if hasattr(scene_order, '__getitem__') \
+            else scene_order
+        return min(scenes, key=key), max(scenes, key=key)
+
+    def rank(self, prefix, limit=None, preferred=()):
+        """Return the names starting with prefix (any case), most likely
+        first.
+
+        Names in preferred come first, in that order. The others are ordered
+        by the number of elements using them, then by how recently they were
+        used.
+
+        Args:
+            prefix (str): The text entered so far.
+            limit (int): Return at most this many names.
+            preferred (list): Names the context makes most likely, e.g. the
+                speakers of the ongoing conversation.
+        """
+        entries = self.entries
+        prefix = prefix.lower()
+        names = []
+        keys = set()
+        for name in preferred:
+            key = normalize(name)
+            entry = entries.get(key)
+            if entry is not None and key not in keys and \
+                    entry.spelling.lower().startswith(prefix):
+                keys.add(key)
+                names.append(entry.spelling)
+        # Even if the preferred names are among them, the limit best names
+        # are enough to fill the list up.
+        for name in self.index.best(prefix, limit):
+            if normalize(name) not in keys:
+                names.append(name)
+        return names[:limit]
+
+    def _update_rank(self, entry):
+        self.index.set_rank(entry.spelling, (-entry.count, -entry.last_used))
+
+    def register(self, record, name, scene):
+        """Record that record uses name, in scene.
+
+        An empty name only unregisters the record.
+
+        Returns:
+            tuple: (added, dropped): the spelling of name if it was not in
+                use before, and the spelling of the name record used before
+                if nothing uses it anymore. Each is None otherwise.
+        """
+        name = name.strip()
+        key = normalize(name)
+        self.clock += 1
+        if self.occurrences.get(record) == (key, scene):
+            entry = self.entries[key]
+            entry.last_used = self.clock
+            self._update_rank(entry)
+            return None, None
+        dropped = self.unregister(record)
+        if not key:
+            return None, dropped
+
+        entry = self.entries.get(key)
+        added = entry is None
+        if added:
+            entry = self.entries[key] = NameEntry(name)
+            self.index.add(name)
+        entry.count += 1
+        entry.scenes[scene] = entry.scenes.get(scene, 0) + 1
+        entry.last_used = self.clock
+        self._update_rank(entry)
+        self.occurrences[record] = (key, scene)
+        return (name if added else None), dropped
+
+    def unregister(self, record):
+        """Forget the occurrence of record.
+
+        Returns:
+            str: The spelling of the name if no element uses it anymore,
+                else None.
+        """
+        occurrence = self.occurrences.pop(record, None)
+        if occurrence is None:
+            return None
+        key, scene = occurrence
+        entry = self.entries[key]
+        entry.count -= 1
+        entry.scenes[scene] -= 1
+        if not entry.scenes[scene]:
+            del entry.scenes[scene]
+        if entry.count:
+            self._update_rank(entry)
+            return None
+        del self.entries[key]
+        self.index.remove(entry.spelling)
+        return entry.spelling
+
+    def clear(self):
+        self.entries.clear()
+        self.occurrences.clear()
+        self.index.rebuild(())
@@ -0,0 +1,103 @@
+class OffsetTree:
+    """Running totals over a list of sizes (a Fenwick tree).
+
+    The Screenplay uses this to keep track of how many elements each Scene
+    holds, so that the position of an element in the whole screenplay can be
+    found without counting the elements of every scene before it.
+
+    Changing the size of a slot and both lookups (prefix and find) are
+    O(log n). Inserting or removing a slot rebuilds the tree, which is O(n)
+    in the number of slots; slots are scenes, which are few and rarely
+    added compared to elements.
+
+    Example:
+        >>> tree = OffsetTree([3, 1, 4])
+        >>> tree.prefix(2)
+        4
+        >>> tree.find(5)
+        (2, 1)
+    """
+
+    def __init__(self, sizes=()):
+        self.sizes = []
+        self.tree = [0]
+        self.rebuild(sizes)
+
+    def __len__(self):
+        return len(self.sizes)
+
+    def rebuild(self, sizes):
+        """Replace all slots with sizes, in O(n)."""
+        self.sizes = list(sizes)
+        tree = [0] + self.sizes
+        length = len(tree)
+        for i in range(1, length):
+            parent = i + (i & -i)
+            if parent < length:
+                tree[parent] += tree[i]
+        self.tree = tree
+
+    def total(self):
+        return self.prefix(len(self.sizes))
+
+    def size(self, index):
+        return self.sizes[index]
+
+    def add(self, index, delta):
+        """Add delta to the size of the slot at index."""
+        self.sizes[index] += delta
+        i = index + 1
+        tree = self.tree
+        length = len(tree)
+        while i < length:
+            tree[i] += delta
+            i += i & -i
+
+    def set(self, index, size):
+        self.add(index, size - self.sizes[index])
+
+    def prefix(self, index):
+        """Return the sum of the sizes of all slots before index."""
+        total = 0
+        i = index
+        tree = self.tree
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, offset):
+        """Find the slot containing offset.
+
+        Args:
+            offset (int): Position counted over all slots.
+
+        Returns:
+            tuple: (slot index, offset within that slot).
+
+        Raises:
+            IndexError: If offset is outside of the tree.
+        """
+        if not 0 <= offset < self.total():
+            raise IndexError('offset out of range')
+        tree = self.tree
+        index = 0
+        step = 1 << (len(tree).bit_length() - 1)
+        while step:
+            next_index = index + step
+            if next_index < len(tree) and tree[next_index] <= offset:
+                index = next_index
+                offset -= tree[next_index]
+            step >>= 1
+        return index, offset
+
+    def insert(self, index, size=0):
+        sizes = self.sizes
+        sizes.insert(index, size)
+        self.rebuild(sizes)
+
+    def pop(self, index):
+        sizes = self.sizes
+        size = sizes.pop(index)
+        self.rebuild(sizes)
+        return size
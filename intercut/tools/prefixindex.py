@@ -0,0 +1,205 @@
+from bisect import bisect_left
+import heapq
+
+# The rank of names that were never given one; they come last.
+UNRANKED = (float('inf'),)
+
+# Sorts after any character a name can continue with after a prefix.
+LAST_CHARACTER = '\U0010ffff'
+
+
+class PrefixIndex:
+    """A set of names searchable by case-insensitive prefix.
+
+    Names are kept sorted by their lowercase form, so that all the names
+    starting with a prefix sit next to each other and the first of them can
+    be found by bisection. Looking up a prefix is O(log n + k) for k
+    results. Adding and removing names is O(n) but only moves memory, and
+    happens far less often than lookups (which run on every keystroke).
+
+    Names that differ only by case are the same name; the first spelling
+    added is kept.
+
+    Names can also be ranked (see set_rank), and best then returns the best
+    ranked names starting with a prefix in O(log n) per name returned,
+    however many names start with it: a segment tree over the sorted names
+    keeps the best rank of every range of them. Changing a rank is
+    O(log n). The tree is rebuilt in O(n) by the first lookup after names
+    were added or removed, so adding many names at once stays cheap.
+
+    Example:
+        >>> index = PrefixIndex(['Bob', 'ALICE', 'Bobby'])
+        >>> index.search('bo')
+        ['Bob', 'Bobby']
+        >>> 'alice' in index
+        True
+        >>> index.set_rank('Bobby', (1,))
+        >>> index.best('b', limit=1)
+        ['Bobby']
+    """
+
+    def __init__(self, names=()):
+        self.keys = []
+        self.names = []
+        self.ranks = []
+        # The segment tree of ranks, or None until best needs it; see
+        # _get_tree.
+        self._tree = None
+        self.rebuild(names)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __contains__(self, name):
+        return self._find(name.lower()) is not None
+
+    def _find(self, key):
+        index = bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            return index
+        return None
+
+    def rebuild(self, names):
+        """Replace the contents of the index with names, in O(n log n)."""
+        pairs = {}
+        for name in names:
+            pairs.setdefault(name.lower(), name)
+        self.keys = sorted(pairs)
+        self.names = [pairs[key] for key in self.keys]
+        self.ranks = [UNRANKED] * len(self.keys)
+        self._tree = None
+
+    def add(self, name):
+        """Add name to the index.
+
+        Returns:
+            bool: False if the name (in any case) was already there.
+        """
+        key = name.lower()
+        index = bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            return False
+        self.keys.insert(index, key)
+        self.names.insert(index, name)
+        self.ranks.insert(index, UNRANKED)
+        self._tree = None
+        return True
+
+    def remove(self, name):
+        """Remove name (in any case) from the index, if it is there."""
+        index = self._find(name.lower())
+        if index is not None:
+            del self.keys[index]
+            del self.names[index]
+            del self.ranks[index]
+            self._tree = None
+
+    def search(self, prefix, limit=None):
+        """Return the names starting with prefix, ignoring case, in order.
+
+        Args:
+            prefix (str): Start of the names to find.
+            limit (int): Return at most this many names, if given.
+        """
+        prefix = prefix.lower()
+        keys = self.keys
+        start = bisect_left(keys, prefix)
+        stop = len(keys) if limit is None else min(len(keys), start + limit)
+        end = start
+        while end < stop and keys[end].startswith(prefix):
+            end += 1
+        return self.names[start:end]
+
+    def set_rank(self, name, rank):
+        """Rank name (in any case), for best.
+
+        Args:
+            name (str): A name in the index.
+            rank (tuple): Lower ranks come first.
+        """
+        index = self._find(name.lower())
+        if index is None:
+            raise KeyError(name)
+        self.ranks[index] = rank
+        tree = self._tree
+        if tree is None:
+            return
+        node = index + len(tree) // 2
+        tree[node] = (rank, index)
+        node //= 2
+        while node:
+            tree[node] = min_node(tree[2 * node], tree[2 * node + 1])
+            node //= 2
+
+    def best(self, prefix, limit=None):
+        """Return the names starting with prefix, ignoring case, best ranked
+        first (in alphabetical order among equal ranks).
+
+        Args:
+            prefix (str): Start of the names to find.
+            limit (int): Return at most this many names, if given.
+        """
+        prefix = prefix.lower()
+        keys = self.keys
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + LAST_CHARACTER, start)
+        if limit is None:
+            limit = end - start
+        tree = self._get_tree()
+        size = len(tree) // 2
+
+        # The nodes covering the range exactly, best first.
+        heap = []
+        low, high = start + size, end + size
+        while low < high:
+            if low & 1:
+                heap.append((tree[low], low))
+                low += 1
+            if high & 1:
+                high -= 1
+                heap.append((tree[high], high))
+            low //= 2
+            high //= 2
+        heapq.heapify(heap)
+
+        names = []
+        while heap and len(names) < limit:
+            value, node = heapq.heappop(heap)
+            if node >= size:
+                names.append(self.names[node - size])
+                continue
+            for child in (2 * node, 2 * node + 1):
+                if tree[child] is not None:
+                    heapq.heappush(heap, (tree[child], child))
+        return names
+
+    def _get_tree(self):
+        """Return the segment tree of ranks, building it if needed.
+
+        Leaf size + i holds (rank, i) for the name at index i, and every
+        other node the smallest of its two children, or None where there is
+        no name below it.
+        """
+        if self._tree is None:
+            count = len(self.ranks)
+            size = 1 << max(count - 1, 0).bit_length()
+            tree = [None] * (2 * size)
+            tree[size:size + count] = [(rank, index) for index, rank
+                                       in enumerate(self.ranks)]
+            for node in range(size - 1, 0, -1):
+                tree[node] = min_node(tree[2 * node], tree[2 * node + 1])
+            self._tree = tree
+        return self._tree
+
+
+def min_node(first, second):
+    """Return the smaller of two segment tree nodes, either of which may be
+    None."""
+    if first is None:
+        return second
+    if second is None or first < second:
+        return first
+    return second
@@ -1,5 +1,8 @@
 
 
+import time
+
+
 def remove_last_word(string):
     """Return input string without the last word.
     
@@ -16,110 +19,89 @@ def remove_last_word(string):
         return partition[0] + " "
 
 
-class RawText:
-    """Hold and modify unformatted text for Text Inputs.
-
-    This should be implemented as an attribute in subclasses of TextInput in
-    which the insert_text function has been overridden to insert capitalized
-    text in place (i.e. Scenes, Characters).  This class will hold a copy of 
-    the text without the formatting associated with the insert_text override.
-
-    For example, if you type "Int. House -- Night" into a Scene object, it will
-    be displayed in all caps.  But via the UnformattedText object, we can
-    preserve the user input as quoted above.
-
-    This is useful because suppose the user is not paying attention and starts
-    typing some action text into a Scene object.  Without this tool, when they
-    try to copy and paste their text or convert the element into an Action 
-    object, the text will be transferred over complete with capitalization.
-    However, by holding onto this unformatted copy of the text, the user can 
-    transfer the text they originally typed.
-
-    Note:
-        The actual tracking is not done for you. You need call the
-        resolve_deletion method on your UnformattedText object every time text 
-        is deleted. Testing needs to be done to determine whether this should
-        be done in the on_text callback or the on_backspace callback.  It needs
-        to be added to whichever one is called first.
-
+def common_prefix(a, b):
+    """Return the length of the longest common prefix of strings a and b.
 
+    Compares halves of the remaining range as slices, so the characters are
+    compared in C and the total work is linear in the length of the prefix.
     """
-
-    def __init__(self, text=''):
-        self.text = text
-        self.tracked = ''
-
-    # TODO: Add resolve_addition function or modify the resolve_deletion for
-    # tracking additive_changes.
-
-    def resolve(self, input_text):
-        """A helper function for selecting resolution type.
-        
-        Args:
-            input_text: Text accessed from the TextInput.
-        """
-        print(input_text)
-        print(self.text)
-        if len(self.text) >= len(input_text):
-            print("DELETION")
-            self.resolve_deletion(input_text)
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[low:middle] == b[low:middle]:
+            low = middle
         else:
-            print("INSERTION")
-            self.resolve_insertion(input_text)
-
-
-    def resolve_insertion(self, input_text):
-        """Adjust UnformattedText.text to follow insertions in TextInput.text
-        
-        Args:
-            input_text: Text accessed from the TextInput.
-        """
-        # TODO:
-        input_len = len(input_text)
-        unform_len = len(self.text)
-
-        assert input_len >= unform_len
-
-        len_diff = input_len - unform_len
-
-        slice_to = unform_len
-        for i in range(unform_len):
-            if self.text[i].upper() != input_text[i]:
-                slice_to = i
-                break
+            high = middle - 1
+    return low
+
+
+def common_suffix(a, b, limit=None):
+    """Return the length of the longest common suffix of a and b, at most
+    limit."""
+    low = 0
+    high = min(len(a), len(b))
+    if limit is not None:
+        high = min(high, limit)
+    len_a, len_b = len(a), len(b)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if a[len_a - middle:len_a - low] == b[len_b - middle:len_b - low]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
 
-        self.text = self.text[: slice_to]\
-                    + (self.tracked if self.tracked else input_text[slice_to: slice_to + len_diff]) \
-                    + self.text[slice_to:]
 
-    def resolve_deletion(self, input_text):
-        """Adjusts UnformattedText.text to follow deletions in TextInput.text
+def changed_span(old, new):
+    """Return (start, old_end, new_end) such that replacing
+    old[start:old_end] with new[start:new_end] gives new.
 
-        Args:
-            input_text: Text accessed from the TextInput.
+    The span is found by trimming the common prefix, then the common suffix
+    of what is left, so insertions, deletions and replacements (such as
+    typing over a selection) are all found in one linear pass.
+    """
+    start = common_prefix(old, new)
+    end = common_suffix(old, new, min(len(old), len(new)) - start)
+    return start, len(old) - end, len(new) - end
 
-        """
-        input_len = len(input_text)
-        unform_len = len(self.text)
-        # cut_len is length of the word removed from the input
-        assert unform_len >= input_len
 
-        cut_len = unform_len - input_len
+def upper(text):
+    """Return text in upper case, one character for one.
 
-        # The text was not changed
-        if cut_len == 0:
-            return
+    Unlike str.upper, characters whose upper case takes more than one
+    character (such as 'ß', which becomes 'SS') are kept as they are, so an
+    index into the result is the same index into text.
+    """
+    result = text.upper()
+    if len(result) == len(text):
+        # No character got longer (none ever gets shorter).
+        return result
+    return ''.join(char if len(char.upper()) > 1 else char.upper()
+                   for char in text)
 
-        # All text removed
-        if input_len == 0:
-            self.text = ''
-            return
 
-        slice_to = input_len
-        for i in range(input_len):
-            if self.text[i].upper() != input_text[i]:
-                slice_to = i
-                break
+def benchmark(lengths=(10000, 20000, 40000, 80000), repeat=200):
+    """Time changed_span on paragraphs of the given lengths, each edited in
+    the middle.
 
-        self.text = self.text[:slice_to] \
-                    + self.text[(slice_to + cut_len):]
\ No newline at end of file
+    Returns:
+        list: (length, seconds per changed_span) for each length. The time
+            grows linearly with the length.
+    """
+    results = []
+    for length in lengths:
+        text = ('Word ' * (length // 5 + 1))[:length]
+        middle = length // 2
+        edits = (text[:middle] + 'X' + text[middle:],
+                 text[:middle] + text[middle + 1:])
+        started = time.perf_counter()
+        for index in range(repeat):
+            changed_span(text, edits[index % 2])
+        results.append((length, (time.perf_counter() - started) / repeat))
+    return results
+
+
+if __name__ == '__main__':
+    for length, seconds in benchmark():
+        print('{:>6} characters: {:8.1f} us per changed_span'.format(
+            length, seconds * 1e6))
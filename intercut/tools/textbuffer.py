@@ -0,0 +1,90 @@
+from tools.offsettree import OffsetTree
+
+# Chunks are split once they grow past twice this many characters.
+CHUNK_SIZE = 512
+
+
+class TextBuffer:
+    """Text that can be edited in place without copying all of it.
+
+    The text is held as a list of chunks (a flat rope), with the length of
+    each chunk in an OffsetTree. An edit finds the chunk holding its
+    position in O(log n) and only rebuilds that chunk, so typing in the
+    middle of a long paragraph costs the same as typing in a short one. A
+    chunk that grows too long is split, which rebuilds the OffsetTree; that
+    happens once every CHUNK_SIZE characters typed into the same chunk.
+
+    The whole text is only joined when it is read, and kept until the next
+    edit.
+
+    Example:
+        >>> text = TextBuffer('Int. House - Day')
+        >>> text.replace(5, 10, 'Garage')
+        >>> text.insert(0, 'EXT/')
+        >>> str(text), len(text)
+        ('EXT/Int. Garage - Day', 21)
+    """
+
+    def __init__(self, text=''):
+        self.chunks = [text[start:start + CHUNK_SIZE]
+                       for start in range(0, len(text), CHUNK_SIZE)] or ['']
+        self.lengths = OffsetTree(len(chunk) for chunk in self.chunks)
+        self.length = len(text)
+        self._text = text
+
+    def __len__(self):
+        return self.length
+
+    def __str__(self):
+        if self._text is None:
+            self._text = ''.join(self.chunks)
+        return self._text
+
+    def locate(self, offset):
+        """Return (chunk index, offset within that chunk) of offset.
+
+        The end of the text is located at the end of the last chunk.
+        """
+        if offset == self.length:
+            return len(self.chunks) - 1, len(self.chunks[-1])
+        return self.lengths.find(offset)
+
+    def insert(self, offset, text):
+        self.replace(offset, offset, text)
+
+    def delete(self, start, end):
+        self.replace(start, end, '')
+
+    def replace(self, start, end, text):
+        """Replace the characters from start to end with text.
+
+        Raises:
+            IndexError: If start and end are not 0 <= start <= end <= len.
+        """
+        if not 0 <= start <= end <= self.length:
+            raise IndexError('text range out of range')
+        if start == end and not text:
+            return
+        chunks = self.chunks
+        index, offset = self.locate(start)
+        if end == start:
+            end_index, end_offset = index, offset
+        else:
+            end_index, end_offset = self.lengths.find(end - 1)
+            end_offset += 1
+
+        chunk = chunks[index][:offset] + text + chunks[end_index][end_offset:]
+        self.length += len(text) - (end - start)
+        self._text = None
+
+        if end_index != index or len(chunk) > 2 * CHUNK_SIZE \
+                or (not chunk and len(chunks) > 1):
+            chunks[index:end_index + 1] = [
+                chunk[split:split + CHUNK_SIZE]
+                for split in range(0, len(chunk), CHUNK_SIZE)]
+            if not chunks:
+                chunks.append('')
+            self.lengths.rebuild(len(piece) for piece in chunks)
+        else:
+            chunks[index] = chunk
+            self.lengths.set(index, len(chunk))
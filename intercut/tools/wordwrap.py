@@ -0,0 +1,105 @@
+"""Word wrap for monospaced text.
+
+Screenplays are set in Courier, where every character has the same width, so
+wrapping a paragraph only depends on how many characters fit on a line.
+"""
+from functools import lru_cache
+import re
+
+FL_IS_LINEBREAK = 0x01
+FL_IS_WORDBREAK = 0x02
+FL_IS_NEWLINE = FL_IS_LINEBREAK | FL_IS_WORDBREAK
+
+# Number of wrapped paragraphs kept by wrap_paragraph.
+WRAP_CACHE_SIZE = 4096
+
+# A word and the space, tab or carriage return after it, or the last word
+# of the paragraph. These are the delimiters TextInput wraps at, newlines
+# aside (paragraphs are split on those first).
+TOKEN_PATTERN = re.compile(u'[^ \t\r]*[ \t\r]|[^ \t\r]+')
+
+
+def tokenize(paragraph):
+    """Split a paragraph into words, each keeping the delimiter (space, tab
+    or carriage return) that follows it.
+
+    Example:
+        >>> tokenize('INT. HOUSE  - DAY')
+        ['INT. ', 'HOUSE ', ' ', '- ', 'DAY']
+        >>> tokenize('a\\tb\\rc')
+        ['a\\t', 'b\\r', 'c']
+    """
+    return TOKEN_PATTERN.findall(paragraph)
+
+
+@lru_cache(maxsize=WRAP_CACHE_SIZE)
+def wrap_paragraph(paragraph, width):
+    """Wrap a paragraph (text without newlines) to lines of width characters.
+
+    Words are never split unless a single word is longer than width. The
+    result is cached by (paragraph, width), so every element displaying the
+    same paragraph at the same width shares it, and only edited paragraphs
+    are wrapped again.
+
+    Returns:
+        tuple: (lines, lines_flags), two tuples in the form
+            TextInput._split_smart returns. Lines continuing a split word
+            are flagged FL_IS_WORDBREAK.
+    """
+    x = flags = 0
+    line = []
+    lines = []
+    lines_flags = []
+    _join = u''.join
+    lines_append, lines_flags_append = lines.append, lines_flags.append
+
+    # try to add each word on current line.
+    for word in tokenize(paragraph):
+        w = len(word)
+        # if we have more than the width, push the current line, and create
+        # a new one
+        if x + w > width and line:
+            lines_append(_join(line))
+            lines_flags_append(flags)
+            flags = 0
+            line = []
+            x = 0
+        if w > width > 0:
+            while w > width:
+                # split the word
+                lines_append(word[:width])
+                lines_flags_append(flags)
+                flags = FL_IS_WORDBREAK
+                word = word[width:]
+                w -= width
+        x += w
+        line.append(word)
+    if line or not lines:
+        lines_append(_join(line))
+        lines_flags_append(flags)
+    return tuple(lines), tuple(lines_flags)
+
+
+def paragraph_line_count(paragraph, width):
+    """Return len(wrap_paragraph(paragraph, width)[0]), counting the lines
+    from the lengths of the words without building them."""
+    lines = 1
+    x = 0
+    for word in tokenize(paragraph):
+        w = len(word)
+        if x + w > width and x:
+            lines += 1
+            x = 0
+        if w > width > 0:
+            splits = (w - 1) // width
+            lines += splits
+            w -= splits * width
+        x += w
+    return lines
+
+
+def count_lines(text, width):
+    """Return the number of lines text takes once wrapped to width
+    characters, every newline starting a new line."""
+    return sum(paragraph_line_count(paragraph, width)
+               for paragraph in text.split('\n'))
@@ -0,0 +1,343 @@
+"""Defines the virtualized (recycled) view of a Screenplay.
+
+In the classic view every paragraph of the script is its own Element widget,
+held by a Scene, held by the Screenplay. That is fine for a short script, but
+a feature length screenplay carries thousands of TextInputs and the whole
+tree has to be laid out and drawn on every change.
+
+The virtualized view lists every ElementRecord of the Screenplay's document
+as a row of a RecycleView. Only the rows near the viewport are backed by a
+RecycledElement widget; as the user scrolls, widgets that leave the viewport
+are handed the rows that enter it.
+
+Each row looks like this:
+
+    {'record': <ElementRecord>, 'height': <height in pixels>}
+
+Edits are written straight through to the record, and rows are inserted and
+removed together with their records, so the document stays the single source
+of truth just as it is for the classic view.
+"""
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
+from kivy.properties import AliasProperty, NumericProperty, StringProperty
+from kivy.clock import Clock
+from kivy.metrics import pt
+from kivy.lang import Builder
+
+from elementbehavior import ElementBehavior
+from elements import RawTextBehavior
+from coreinput import CoreInput
+from scene import ELEMENT_TYPES
+
+from model import ElementRecord
+from metrics import WRAP_WIDTHS, line_count
+from tools.stringmanip import upper
+
+import os.path
+
+# Courier 12pt sets six lines to the inch, so a line is exactly 12pt high.
+LINE_HEIGHT = pt(12)
+
+# Mirrors the per-element rules in elements.kv.
+ELEMENT_STYLES = {
+    'Action': {'padding_x': '1.5in', 'wrap_length': WRAP_WIDTHS['Action'],
+               'upper': False, 'hint_text': '[Action]',
+               'padding_y': (.5, .5)},
+    'SceneHeading': {'padding_x': '1.5in',
+                     'wrap_length': WRAP_WIDTHS['SceneHeading'],
+                     'upper': True, 'hint_text': '[SCENE]',
+                     'padding_y': (.5, .5)},
+    'Character': {'padding_x': '3.5in',
+                  'wrap_length': WRAP_WIDTHS['Character'], 'upper': True,
+                  'hint_text': '[CHARACTER]', 'padding_y': (.5, 0)},
+    'Dialogue': {'padding_x': '2.5in', 'wrap_length': WRAP_WIDTHS['Dialogue'],
+                 'upper': False, 'hint_text': '[Dialogue]',
+                 'padding_y': (0, .5)},
+    'Parenthetical': {'padding_x': '3.0in',
+                      'wrap_length': WRAP_WIDTHS['Parenthetical'],
+                      'upper': False, 'hint_text': '[Parenthetical]',
+                      'padding_y': (0, .5)},
+}
+
+# The element that follows, and the elements that tab and shift + tab morph
+# into. These mirror next_element, tab_to and tab_inverse in elements.py.
+NEXT_TYPE = {'Action': 'Action', 'SceneHeading': 'Action',
+             'Character': 'Dialogue', 'Dialogue': 'Character',
+             'Parenthetical': 'Dialogue'}
+TAB_TO = {'Action': 'Character', 'SceneHeading': 'Action',
+          'Dialogue': 'Parenthetical'}
+TAB_INVERSE = {'Action': 'SceneHeading', 'Character': 'Action',
+               'Dialogue': 'Character', 'Parenthetical': 'Dialogue'}
+
+
+def row_height(element_type, raw_text):
+    """Work out the height of a row without creating a widget for it.
+
+    Args:
+        element_type (str): Class name of the element.
+        raw_text (str): Unformatted text of the element.
+
+    Returns:
+        float: Height of the row in pixels.
+    """
+    return lines_height(element_type, line_count(element_type, raw_text))
+
+
+def lines_height(element_type, lines):
+    top, bottom = ELEMENT_STYLES[element_type]['padding_y']
+    return (lines + top + bottom) * LINE_HEIGHT
+
+
+def record_height(record):
+    """Return the height of the row of record, from its cached line count."""
+    return lines_height(record.element_type, record.line_count())
+
+
+def make_row(record):
+    """Build a row dict for the virtualized view."""
+    return {'record': record, 'height': record_height(record)}
+
+
+def document_rows(document):
+    """Return one row per element of a ScreenplayDocument, in order."""
+    return [make_row(record) for record in document.iter_elements()]
+
+
+class ScreenplayRecycleLayout(RecycleBoxLayout):
+    """Layout manager for the virtualized view of a Screenplay."""
+
+    def row_extent(self, index):
+        """Return the (bottom, height) of a row in layout coordinates."""
+        opts = self.view_opts[index]
+        return opts['pos'][1], opts['size'][1]
+
+
+class RecycledElement(RecycleDataViewBehavior, RawTextBehavior,
+                      ElementBehavior, CoreInput):
+    """A single element widget that is recycled between rows.
+
+    Unlike Element, a RecycledElement does not live in a Scene and is not
+    tied to a single paragraph of the script. Whatever row it is currently
+    displaying is described by index, element_type and record, and every
+    edit is written straight through to the ElementRecord of that row, in
+    place, just as an Element does (see RawTextBehavior). The text is
+    formatted by the element class of the row's type.
+    """
+
+    index = NumericProperty(-1)
+    element_type = StringProperty('Action')
+
+    def _get_raw_text(self):
+        return self.record.raw_text
+
+    raw_text = AliasProperty(_get_raw_text, None, cache=False)
+
+    def __init__(self, **kwargs):
+        self.rv = None
+        self.record = ElementRecord('Action')
+        super().__init__(**kwargs)
+        self.register_shortcut(  # enter
+            13, callback=self.on_enter)
+        self.register_shortcut(  # backspace
+            8, callback=self.on_backspace, kill=False)
+        self.register_shortcut(  # tab
+            9, callback=self.tab_to)
+        self.register_shortcut(  # tab + shift
+            9, modifier='shift', callback=self.tab_inverse)
+        self.register_shortcut(  # down
+            274, callback=self.press_down, kill=False)
+        self.register_shortcut(  # up
+            273, callback=self.press_up, kill=False)
+
+        for keycode, element_type in ((97, 'Action'),  # 'alt' + a
+                                      (115, 'SceneHeading'),  # 'alt' + s
+                                      (99, 'Character'),  # 'alt' + c
+                                      (100, 'Dialogue'),  # 'alt' + d
+                                      (112, 'Parenthetical')):  # 'alt' + p
+            self.register_shortcut(
+                keycode, modifier='alt',
+                callback=lambda t=element_type: self.morph(t))
+
+    @property
+    def element_class(self):
+        """The Element subclass of the row's type."""
+        return ELEMENT_TYPES[self.element_type]
+
+    @property
+    def raw_offset(self):
+        return self.element_class.raw_offset
+
+    def refresh_view_attrs(self, rv, index, data):
+        """Display the row at index (called by the RecycleView)."""
+        self.rv = rv
+        if self.index != index:
+            self.focus = False
+        record = data['record']
+        self._loading = True
+        self.index = index
+        self.record = record
+        self.element_type = record.element_type
+        self.text = self.format_text(record.raw_text)
+        self._loading = False
+
+    def format_text(self, raw_text):
+        return self.element_class.format_text(raw_text)
+
+    def insert_text(self, substring, from_undo=False):
+        offset = self.raw_offset
+        if not offset <= self.cursor_index() <= len(self.text) - offset:
+            # Outside the parentheses of a Parenthetical.
+            return
+        self.insert_raw(substring)
+        if ELEMENT_STYLES[self.element_type]['upper']:
+            substring = upper(substring)
+        super().insert_text(substring, from_undo=from_undo)
+
+    def on_text(self, instance, text):
+        if self._loading or self.rv is None:
+            return
+        self.raw_contraction()
+        self.rv.update_row(self.index)
+
+    def on_enter(self):
+        self.rv.insert_row(self.index + 1, NEXT_TYPE[self.element_type])
+
+    def on_backspace(self):
+        if self._selection or self.cursor_index() > self.raw_offset:
+            return
+        if self.index > 0:
+            self.rv.remove_row(self.index)
+        return True
+
+    def press_down(self):
+        if self.cursor[1] + 1 == self.get_lines():
+            self.rv.focus_row(self.index + 1)
+            return True
+
+    def press_up(self):
+        if not self.cursor[1]:
+            self.rv.focus_row(self.index - 1)
+            return True
+
+    def tab_to(self):
+        if self.element_type in TAB_TO:
+            self.morph(TAB_TO[self.element_type])
+
+    def tab_inverse(self):
+        if self.element_type in TAB_INVERSE:
+            self.morph(TAB_INVERSE[self.element_type])
+
+    def morph(self, new_type):
+        self.rv.morph_row(self.index, new_type)
+
+
+class VirtualScreenplayBehavior(object):
+    """Row editing for a RecycleView that displays a Screenplay.
+
+    Mixed into ScrollingScreenplay. The rows live in RecycleView.data; the
+    methods below keep the data, the layout and the keyboard focus in step
+    when a RecycledElement edits its row. They also keep the characters and
+    locations of the Screenplay up to date, as the elements of the classic
+    view do.
+    """
+
+    def update_row_names(self, record):
+        """Register the name record uses, if it is a Character or a
+        SceneHeading."""
+        if record.element_type == 'Character':
+            self.screenplay.update_characters(record)
+        elif record.element_type == 'SceneHeading':
+            self.screenplay.update_locations(record)
+
+    def update_row(self, index, raw_text=None):
+        """Bring a row up to date after its record was edited, optionally
+        setting the record's text first.
+
+        The layout is only refreshed when the row changes height, so typing
+        inside a line costs nothing beyond the record update.
+        """
+        row = self.data[index]
+        record = row['record']
+        if raw_text is not None:
+            record.raw_text = raw_text
+        self.update_row_names(record)
+        height = record_height(record)
+        if height != row['height']:
+            row['height'] = height
+            self.data[index] = row
+
+    def insert_row(self, index, element_type, raw_text=''):
+        """Insert a new element after the row before index, in its scene.
+
+        At index 0 the element starts the first scene.
+        """
+        if index > 0:
+            previous = self.data[index - 1]['record']
+            scene = previous.scene
+            position = scene.elements.index(previous) + 1
+        else:
+            scene = self.data[0]['record'].scene
+            position = 0
+        record = ElementRecord(element_type, raw_text)
+        scene.insert(position, record)
+        self.update_row_names(record)
+        self.data.insert(index, make_row(record))
+        self.focus_row(index)
+
+    def remove_row(self, index):
+        """Remove a row and its record. A scene left without elements is
+        removed from the document too."""
+        screenplay = self.screenplay
+        record = self.data[index]['record']
+        scene = record.scene
+        scene.pop(scene.elements.index(record))
+        screenplay.forget_names(record)
+        if not scene.elements:
+            document = screenplay.document
+            document.pop_scene(document.scenes.index(scene))
+            screenplay.displayed_scenes -= 1
+        del self.data[index]
+        self.focus_row(index - 1)
+
+    def morph_row(self, index, new_type):
+        row = self.data[index]
+        record = row['record']
+        self.screenplay.forget_names(record)
+        record.element_type = new_type
+        self.update_row_names(record)
+        row['height'] = record_height(record)
+        self.data[index] = row
+        self.focus_row(index)
+
+    def focus_row(self, index):
+        """Scroll a row into view and focus its widget once it exists."""
+        if not 0 <= index < len(self.data):
+            return
+        Clock.schedule_once(lambda dt: self._focus_row(index))
+
+    def _focus_row(self, index):
+        self.show_row(index)
+        # Showing the row may have scheduled a refresh of the visible views.
+        self.refresh_views()
+        view = self.view_adapter.get_visible_view(index)
+        if view is not None:
+            view.focus = True
+
+    def show_row(self, index):
+        """Adjust scroll_y so that the row at index is inside the viewport."""
+        lm = self.layout_manager
+        scrollable = lm.height - self.height
+        if scrollable <= 0:
+            return
+        bottom, height = lm.row_extent(index)
+        view_bottom = scrollable * self.scroll_y
+        if bottom < view_bottom:
+            self.scroll_y = max(0, bottom / scrollable)
+        elif bottom + height > view_bottom + self.height:
+            self.scroll_y = min(1, (bottom + height - self.height) / scrollable)
+
+
+# virtualview.kv imports the styles above, so it is loaded last.
+kivy_file = os.path.splitext(os.path.abspath(__file__))[0] + '.kv'
+Builder.load_file(kivy_file)
@@ -0,0 +1,115 @@
+import sys, os
+tests_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, tests_path + '/../intercut')
+
+import io
+import json
+
+import pytest
+
+from binaryformat import BinaryScreenplay, write_binary, save_binary, \
+    json_to_binary, binary_to_json, is_binary_file
+from model import ScreenplayDocument
+
+
+@pytest.fixture
+def document():
+    document = ScreenplayDocument()
+    document.load_from_json({
+        'title': 'Title', 'author': 'Author', 'phone': '555', 'email': 'a@b',
+        'locations': ['House'], 'characters': ['BOB', 'ZOË'], 'version': '1',
+        'save_to': '/tmp/x.ixb',
+        'scenes': [
+            {'title': 'one', 'notes': '', 'color': [1, 1, 1, 1],
+             'plot_point': '',
+             'elements': [{'type': 'SceneHeading', 'raw_text': 'Int. House'},
+                          {'type': 'Character', 'raw_text': 'Zoë'},
+                          {'type': 'Dialogue', 'raw_text': 'Hi.'}]},
+            {'title': 'two', 'notes': 'n', 'color': [1, 0, 0, 1],
+             'plot_point': 'p', 'elements': []},
+        ]
+    })
+    return document
+
+
+def test_round_trip(tmp_path, document):
+    path = str(tmp_path / 'script.ixb')
+    save_binary(document, path)
+    assert is_binary_file(path)
+    with BinaryScreenplay(path) as screenplay:
+        assert len(screenplay) == 2
+        assert screenplay.element_counts == [3, 0]
+        assert screenplay.metadata['characters'] == ['BOB', 'ZOË']
+        assert screenplay.get_json() == document.get_json()
+
+
+def test_random_access(tmp_path, document):
+    path = str(tmp_path / 'script.ixb')
+    save_binary(document, path)
+    with BinaryScreenplay(path) as screenplay:
+        scene = screenplay.read_scene(1)
+        assert scene.title == 'two' and scene.elements == []
+        assert screenplay.read_scene(0).elements[1].raw_text == 'Zoë'
+
+
+def test_smaller_than_json(document):
+    stream = io.BytesIO()
+    write_binary(document, stream)
+    assert len(stream.getvalue()) < len(
+        json.dumps(document.get_json(), indent=4))
+
+
+def test_converters(tmp_path, document):
+    json_path = str(tmp_path / 'script.json')
+    with open(json_path, 'w') as stream:
+        document.write_json(stream)
+    binary_path = str(tmp_path / 'script.ixb')
+    json_to_binary(json_path, binary_path)
+    back_path = str(tmp_path / 'back.json')
+    binary_to_json(binary_path, back_path)
+    with open(json_path) as original, open(back_path) as converted:
+        assert converted.read() == original.read()
+    assert not is_binary_file(back_path)
+
+
+def test_rejects_other_files(tmp_path, document):
+    path = str(tmp_path / 'script.json')
+    with open(path, 'w') as stream:
+        document.write_json(stream)
+    with pytest.raises(ValueError):
+        BinaryScreenplay(path)
+
+    truncated = str(tmp_path / 'cut.ixb')
+    save_binary(document, truncated)
+    with open(truncated, 'r+b') as stream:
+        stream.truncate(os.path.getsize(truncated) - 10)
+    with BinaryScreenplay(truncated) as screenplay:
+        with pytest.raises(ValueError):
+            screenplay.read_scene(1)
+
+
+def cut_copy(tmp_path, document, size):
+    path = str(tmp_path / 'cut.ixb')
+    save_binary(document, path)
+    with open(path, 'r+b') as stream:
+        stream.truncate(size)
+    return path
+
+
+def test_rejects_truncated_header(tmp_path, document):
+    from binaryformat import HEADER
+    path = cut_copy(tmp_path, document, HEADER.size - 2)
+    with pytest.raises(ValueError, match='truncated'):
+        BinaryScreenplay(path)
+
+
+def test_rejects_truncated_scene_table(tmp_path, document):
+    from binaryformat import TABLE_ENTRY
+    path = str(tmp_path / 'whole.ixb')
+    save_binary(document, path)
+    with BinaryScreenplay(path) as screenplay:
+        table = screenplay.offsets[0] - len(document.scenes) * TABLE_ENTRY.size
+    # Half of the second entry of the scene table is missing.
+    path = cut_copy(tmp_path, document, table + TABLE_ENTRY.size + 4)
+    with pytest.raises(ValueError, match='truncated'):
+        BinaryScreenplay(path)
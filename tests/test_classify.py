@@ -0,0 +1,89 @@
+import sys, os
+tests_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, tests_path + '/../intercut')
+
+import doctest
+import io
+
+import classify as classify_module
+from classify import classify, classify_scenes, read_document
+
+DRAFT = '''Before any heading.
+
+INT. KITCHEN - NIGHT
+
+Bob stirs a pot.
+
+BOB (V.O.)
+(tasting)
+Needs salt.
+(beat)
+Lots of it.
+
+BOOM!
+(Nobody hears it.)
+
+CUT TO:
+
+ext. garden - day
+ALICE
+Hello?
+Int/ext. car - continuous
+'''
+
+
+def test_doctest():
+    assert doctest.testmod(classify_module).failed == 0
+
+
+def test_draft():
+    assert list(classify(io.StringIO(DRAFT))) == [
+        ('Action', 'Before any heading.'),
+        ('SceneHeading', 'INT. KITCHEN - NIGHT'),
+        ('Action', 'Bob stirs a pot.'),
+        ('Character', 'BOB (V.O.)'),
+        ('Parenthetical', 'tasting'),
+        ('Dialogue', 'Needs salt.'),
+        ('Parenthetical', 'beat'),
+        ('Dialogue', 'Lots of it.'),
+        ('Action', 'BOOM!'),
+        ('Action', '(Nobody hears it.)'),
+        ('Action', 'CUT TO:'),
+        ('SceneHeading', 'ext. garden - day'),
+        ('Character', 'ALICE'),
+        ('Dialogue', 'Hello?'),
+        ('SceneHeading', 'Int/ext. car - continuous'),
+    ]
+
+
+def test_character_needs_dialogue():
+    # Capitals alone, or before a heading, are not a character cue.
+    assert list(classify(['THE END'])) == [('Action', 'THE END')]
+    assert list(classify(['SILENCE', '', 'Nothing.'])) == [
+        ('Action', 'SILENCE'), ('Action', 'Nothing.')]
+    assert list(classify(['MONTAGE', 'INT. HOUSE'])) == [
+        ('Action', 'MONTAGE'), ('SceneHeading', 'INT. HOUSE')]
+    # Interior is not a heading.
+    assert list(classify(['Interior design.'])) == [
+        ('Action', 'Interior design.')]
+
+
+def test_previous_type():
+    assert list(classify(['Hi.', '(waves)'], previous='Character')) == [
+        ('Dialogue', 'Hi.'), ('Parenthetical', 'waves')]
+    assert list(classify(['Hi.'], previous='Action')) == [('Action', 'Hi.')]
+
+
+def test_scenes():
+    scenes = list(classify_scenes(io.StringIO(DRAFT)))
+    assert [len(scene) for scene in scenes] == [1, 10, 3, 1]
+    for scene in scenes:
+        assert all(record.scene is scene for record in scene.elements)
+    assert [record.element_type for record in scenes[2].elements] == [
+        'SceneHeading', 'Character', 'Dialogue']
+
+    assert list(classify_scenes(['', '  '])) == []
+    document = read_document(['INT. ONE', 'Action.', 'EXT. TWO'])
+    assert [scene.document for scene in document.scenes] == [document] * 2
+    assert document.get_json()['scenes'][1]['elements'] == [
+        {'type': 'SceneHeading', 'raw_text': 'EXT. TWO'}]
@@ -0,0 +1,97 @@
+import sys, os
+tests_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, tests_path + '/../intercut')
+
+import json
+
+from clipboard import ElementClipboard, plain_elements
+from model import ScreenplayDocument, SceneModel, ElementRecord
+from selection import Anchor, DocumentSelection
+
+
+def test_round_trip_keeps_types():
+    document = ScreenplayDocument()
+    scene = SceneModel()
+    for index, (element_type, text) in enumerate([
+            ('SceneHeading', 'Int. House'), ('Character', 'Bob'),
+            ('Parenthetical', 'quietly'), ('Dialogue', 'Hello there.')]):
+        scene.insert(index, ElementRecord(element_type, text))
+    document.insert_scene(0, scene)
+    selection = DocumentSelection(document)
+    selection.start(Anchor(0, 3, 5))
+    selection.extend(Anchor(0, 1, 1))
+
+    elements = selection.get_elements()
+    clipboard = ElementClipboard()
+    text = clipboard.copy(elements)
+    assert text == 'ob\nquietly\nHello'
+    assert json.loads(clipboard.data) == elements
+    assert clipboard.paste(text) == [
+        {'type': 'Character', 'raw_text': 'ob'},
+        {'type': 'Parenthetical', 'raw_text': 'quietly'},
+        {'type': 'Dialogue', 'raw_text': 'Hello'},
+    ]
+
+
+def test_foreign_text_is_classified():
+    clipboard = ElementClipboard()
+    clipboard.copy([{'type': 'Action', 'raw_text': 'a'},
+                    {'type': 'Action', 'raw_text': 'b'}])
+    assert clipboard.paste('a\nc') == plain_elements('a\nc')
+    assert clipboard.paste(None) == []
+    assert plain_elements('one\r\n  \r\ntwo\n') == [
+        {'type': 'Action', 'raw_text': 'one'},
+        {'type': 'Action', 'raw_text': 'two'}]
+    # Blank lines end dialogue before they are dropped.
+    assert plain_elements('JOHN ENTERS\n\nHe sits down.') == [
+        {'type': 'Action', 'raw_text': 'JOHN ENTERS'},
+        {'type': 'Action', 'raw_text': 'He sits down.'}]
+    # The first paragraph goes into the element pasted into.
+    assert plain_elements('\n  bob\nHi.', 'Character') == [
+        {'type': 'Character', 'raw_text': '  bob'},
+        {'type': 'Dialogue', 'raw_text': 'Hi.'}]
+
+
+def make_screenplay():
+    from screenplay import Screenplay, ScrollingScreenplay
+    screenplay = Screenplay()
+    ScrollingScreenplay().add_widget(screenplay)
+    scene = SceneModel()
+    for element_type, text in (('SceneHeading', 'Int. Office'),
+                               ('Action', 'Work.'), ('Action', 'More work.')):
+        scene.elements.append(ElementRecord(element_type, text, scene))
+    screenplay.insert_scenes(0, [scene])
+    return screenplay
+
+
+def dump(document):
+    return [[(record.element_type, record.raw_text)
+             for record in scene.elements] for scene in document.scenes]
+
+
+def test_paste_plain_text_into_scene():
+    screenplay = make_screenplay()
+    element = screenplay.get_element_at(1)
+    element.cursor = element.get_cursor_from_index(len('Work'))
+    text = 'out.\n\nINT. HOUSE - DAY\n\nJOHN ENTERS\n\nHe sits down.'
+
+    element.parent.paste_elements(
+        element, ElementClipboard().paste(text, element.record.element_type))
+    assert dump(screenplay.document) == [
+        [('SceneHeading', 'Int. Office'), ('Action', 'Workout.')],
+        [('SceneHeading', 'INT. HOUSE - DAY'), ('Action', 'JOHN ENTERS'),
+         ('Action', 'He sits down..'), ('Action', 'More work.')]]
+    assert [scene.scene_index for scene in screenplay.children] == [0, 1]
+    assert screenplay.get_element_at(5).raw_text == 'More work.'
+
+
+def test_paste_single_paragraph():
+    from kivy.core.clipboard import Clipboard
+    screenplay = make_screenplay()
+    element = screenplay.get_element_at(2)
+    element.cursor = element.get_cursor_from_index(len('More '))
+    Clipboard.copy('\nhard\n\n')
+
+    element.paste()
+    assert element.raw_text == 'More hardwork.'
+    assert len(screenplay.document.scenes[0]) == 3
@@ -0,0 +1,74 @@
+import sys, os
+tests_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, tests_path + '/../intercut')
+
+import random
+from types import SimpleNamespace
+
+from coreinput import CoreInput, FL_IS_LINEBREAK, tokenize, wrap_paragraph
+from tools.wordwrap import FL_IS_WORDBREAK
+
+
+def reference_wrap(paragraph, width):
+    """The word wrap _split_smart did one character at a time."""
+    x = flags = 0
+    line, lines, lines_flags = [], [], []
+    words = paragraph.split(' ')
+    tokens = [word + ' ' for word in words[:-1]] + [words[-1]]
+    for word in tokens:
+        w = len(word)
+        if x + w > width and line:
+            lines.append(''.join(line))
+            lines_flags.append(flags)
+            flags, line, x = 0, [], 0
+        while w > width:
+            lines.append(word[:width])
+            lines_flags.append(flags)
+            flags = FL_IS_WORDBREAK
+            word = word[width:]
+            w -= width
+        x += w
+        line.append(word)
+    lines.append(''.join(line))
+    lines_flags.append(flags)
+    return tuple(lines), tuple(lines_flags)
+
+
+def test_tokenize():
+    assert tokenize('a bc  d ') == ['a ', 'bc ', ' ', 'd ']
+    assert tokenize('') == []
+    # Pasted text may hold tabs and carriage returns; words end there too.
+    assert tokenize('a\tb\r c') == ['a\t', 'b\r', ' ', 'c']
+
+
+def test_wrap_matches_reference():
+    rng = random.Random(3)
+    for _ in range(300):
+        paragraph = ' '.join(rng.choice(['a', 'word', 'longerword', '',
+                                         'x' * 25])
+                             for _ in range(rng.randint(0, 20)))
+        width = rng.choice([5, 10, 16, 35, 61])
+        assert wrap_paragraph(paragraph, width) == \
+            reference_wrap(paragraph, width), (paragraph, width)
+
+
+def test_split_smart_paragraphs():
+    element = SimpleNamespace(multiline=True, wrap_length=10)
+    lines, flags = CoreInput._split_smart(
+        element, 'one two three\n\nfour five six seven')
+    assert lines == ['one two ', 'three', '', 'four five ', 'six seven']
+    assert flags == [0, 0, FL_IS_LINEBREAK, FL_IS_LINEBREAK, 0]
+    # Callers change the flags in place; the cache must not be affected.
+    flags[0] = FL_IS_LINEBREAK
+    assert CoreInput._split_smart(element, 'one two three')[1] == [0, 0]
+
+
+def test_wrap_is_cached():
+    wrap_paragraph.cache_clear()
+    element = SimpleNamespace(multiline=True, wrap_length=35)
+    text = '\n'.join('Paragraph {} of the action.'.format(i) for i in range(40))
+    CoreInput._split_smart(element, text)
+    edited = text.replace('Paragraph 20 ', 'Paragraph twenty ')
+    CoreInput._split_smart(element, edited)
+    info = wrap_paragraph.cache_info()
+    assert info.misses == 41 and info.hits == 39
@@ -0,0 +1,40 @@
+import sys, os
+tests_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, tests_path + '/../intercut')
+
+import random
+
+from tools.extentindex import ExtentIndex
+
+
+def test_empty():
+    index = ExtentIndex()
+    assert index.stale
+    index.rebuild([])
+    assert not index.stale and index.find(0) is None
+
+
+def test_find_matches_linear_scan():
+    rng = random.Random(0)
+    extents = []
+    bottom = 0
+    for item in range(200):
+        bottom += rng.randint(0, 3)
+        top = bottom + rng.randint(1, 30)
+        extents.append((bottom, top, item))
+        bottom = top
+
+    index = ExtentIndex()
+    index.rebuild(extents)
+    assert len(index) == 200
+    for y in range(-5, bottom + 5):
+        hits = [item for low, high, item in extents if low <= y <= high]
+        # Where two items touch, the upper one wins.
+        assert index.find(y) == (hits[-1] if hits else None)
+
+
+def test_invalidate():
+    index = ExtentIndex()
+    index.rebuild([(0, 10, 'a')])
+    index.invalidate()
+    assert index.stale
@@ -0,0 +1,36 @@
+import sys, os
+tests_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, tests_path + '/../intercut')
+
+from tools.filewriter import BackgroundWriter, write_file
+
+
+def test_write_file_replaces(tmp_path):
+    path = str(tmp_path / 'script.json')
+    write_file(path, 'old')
+    write_file(path, 'new')
+    with open(path) as stream:
+        assert stream.read() == 'new'
+    assert os.listdir(str(tmp_path)) == ['script.json']
+
+
+def test_write_file_encodes_utf_8(tmp_path):
+    path = str(tmp_path / 'script.json')
+    write_file(path, 'Zoë\n')
+    with open(path, 'rb') as stream:
+        assert stream.read() == 'Zoë\n'.encode('utf-8')
+
+
+def test_background_writer_reports(tmp_path):
+    results = []
+    writer = BackgroundWriter()
+    writer.submit(str(tmp_path / 'a.json'), 'a',
+                  lambda latency, error: results.append((latency, error)))
+    writer.submit(str(tmp_path / 'missing' / 'b.json'), 'b',
+                  lambda latency, error: results.append((latency, error)))
+    writer.join()
+    (latency, error), (_, missing_error) = results
+    assert latency >= 0 and error is None
+    assert isinstance(missing_error, OSError)
+    with open(str(tmp_path / 'a.json')) as stream:
+        assert stream.read() == 'a'
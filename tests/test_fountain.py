@@ -0,0 +1,167 @@
+import sys, os
+tests_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, tests_path + '/../intercut')
+
+import doctest
+import io
+import runpy
+from itertools import islice
+
+import fountain
+from fountain import FountainReader, iter_fountain, save_fountain, \
+    read_fountain
+from model import ScreenplayDocument, SceneModel, ElementRecord
+
+SCRIPT = '''Title:
+    _**BRICK & STEEL**_
+    _**FULL RETIRED**_
+Credit: Written by
+Author: Stu Maschwitz
+Contact:
+    Next Level Productions
+    stu@example.com
+    +1 (555) 010-2030
+
+FADE IN:
+
+# Act One
+
+= Steel arrives.
+
+EXT. BRICK'S PATIO - DAY #1#
+
+A gorgeous day. [[A note.]] The sun shines.
+/* A boneyard
+   spanning lines */Brick sits.
+
+STEEL (V.O.)
+(beat)
+Beer's ready!
+It's cold.
+
+BRICK ^
+Are they cold?
+
+.SNIPER SCOPE POV
+
+@McCLANE
+Yippee.
+
+!INT. NOT A HEADING
+
+> CUT TO:
+
+>THE END<
+'''
+
+
+def read_document(text):
+    return FountainReader(io.StringIO(text)).load_document()
+
+
+def test_doctest():
+    assert doctest.testmod(fountain).failed == 0
+
+
+def test_read():
+    reader = FountainReader(io.StringIO(SCRIPT))
+    assert reader.read_title_page() == {
+        'title': '_**BRICK & STEEL**_\n_**FULL RETIRED**_',
+        'credit': 'Written by', 'author': 'Stu Maschwitz',
+        'contact': 'Next Level Productions\nstu@example.com\n'
+                   '+1 (555) 010-2030'}
+    assert list(reader.elements()) == [
+        ('Action', 'FADE IN:'),
+        ('SceneHeading', "EXT. BRICK'S PATIO - DAY"),
+        ('Action', 'A gorgeous day.  The sun shines.'),
+        ('Action', 'Brick sits.'),
+        ('Character', 'STEEL (V.O.)'),
+        ('Parenthetical', 'beat'),
+        ('Dialogue', "Beer's ready!"),
+        ('Dialogue', "It's cold."),
+        ('Character', 'BRICK'),
+        ('Dialogue', 'Are they cold?'),
+        ('SceneHeading', 'SNIPER SCOPE POV'),
+        ('Character', 'McCLANE'),
+        ('Dialogue', 'Yippee.'),
+        ('Action', 'INT. NOT A HEADING'),
+        ('Action', 'CUT TO:'),
+        ('Action', 'THE END'),
+    ]
+
+
+def test_title_page():
+    document = read_document(SCRIPT)
+    assert document.title == 'BRICK & STEEL FULL RETIRED'
+    assert document.author == 'Stu Maschwitz'
+    assert document.email == 'stu@example.com'
+    assert document.phone == '+1 (555) 010-2030'
+    assert [len(scene) for scene in document.scenes] == [1, 9, 6]
+
+    # A script may start without a title page.
+    document = read_document('FADE IN:\n\nINT. HOUSE\n')
+    assert (document.title, document.author) == ('Untitled', 'Anonymous')
+    assert [record.raw_text for record in document.iter_elements()] == [
+        'FADE IN:', 'INT. HOUSE']
+
+
+def test_reading_streams():
+    def lines():
+        yield 'INT. HOUSE'
+        yield ''
+        yield 'Someone waits.'
+        yield ''
+        raise AssertionError('read past the first element')
+
+    reader = FountainReader(lines())
+    assert list(islice(reader.elements(), 1)) == [
+        ('SceneHeading', 'INT. HOUSE')]
+
+
+def test_round_trip(tmp_path):
+    document = ScreenplayDocument()
+    document.title = 'Soup'
+    document.email = 'ann@example.com'
+    for elements in (
+            [('Action', 'Before any heading.'), ('Character', 'ALONE')],
+            [('SceneHeading', 'Int. Kitchen - night'),
+             ('Action', 'INT. IS NOT A HEADING HERE'),
+             ('Action', '@ and ! are fine.'), ('Action', 'SHOUTED ACTION'),
+             ('Character', 'Bob'), ('Parenthetical', 'tasting'),
+             ('Dialogue', 'Needs salt.'), ('Dialogue', 'More salt.'),
+             ('Character', 'ANN'), ('Dialogue', '!')],
+            [('SceneHeading', 'Montage'), ('Action', '')]):
+        scene = SceneModel()
+        for index, (element_type, text) in enumerate(elements):
+            scene.insert(index, ElementRecord(element_type, text))
+        document.insert_scene(len(document.scenes), scene)
+
+    path = str(tmp_path / ('soup' + fountain.FOUNTAIN_EXTENSION))
+    save_fountain(document, path)
+    with open(path) as stream:
+        assert stream.read() == '\n'.join(iter_fountain(document)) + '\n'
+    copy = read_fountain(path)
+
+    assert (copy.title, copy.author, copy.email, copy.phone) == (
+        'Soup', 'Anonymous', 'ann@example.com', '')
+    expected = document.get_json()['scenes']
+    # Empty elements are left out.
+    del expected[2]['elements'][1]
+    assert [scene['elements'] for scene in copy.get_json()['scenes']] == [
+        scene['elements'] for scene in expected]
+
+
+def test_converter(tmp_path, monkeypatch):
+    source = str(tmp_path / ('cafe' + fountain.FOUNTAIN_EXTENSION))
+    with open(source, 'w', encoding='utf-8') as stream:
+        stream.write('Title: Café\n\nINT. CAFÉ\n\nZoë orders.\n')
+    json_path = str(tmp_path / 'cafe.json')
+    copy = str(tmp_path / ('copy' + fountain.FOUNTAIN_EXTENSION))
+
+    for arguments in ((source, json_path), (json_path, copy)):
+        monkeypatch.setattr(sys, 'argv', ['fountain.py'] + list(arguments))
+        runpy.run_path(fountain.__file__, run_name='__main__')
+    document = read_fountain(copy)
+    assert document.title == 'Café'
+    assert [record.raw_text for record in document.iter_elements()] == [
+        'INT. CAFÉ', 'Zoë orders.']
@@ -0,0 +1,223 @@
+import sys, os
+tests_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, tests_path + '/../intercut')
+
+import io
+import json
+import shutil
+
+import pytest
+
+import journal
+from tools import filewriter
+from journal import EditJournal, recover, text_patch, journal_path, \
+    old_journal_path
+from model import ScreenplayDocument, SceneModel, ElementRecord
+
+
+def make_document():
+    document = ScreenplayDocument()
+    for title in ('one', 'two'):
+        scene = SceneModel()
+        scene.title = title
+        scene.insert(0, ElementRecord('SceneHeading', 'Int. ' + title))
+        scene.insert(1, ElementRecord('Action', 'Something happens.'))
+        document.insert_scene(len(document.scenes), scene)
+    return document
+
+
+def saved_document(tmp_path):
+    path = str(tmp_path / 'script.json')
+    document = make_document()
+    document.journal = EditJournal(document, path)
+    document.journal.save()
+    return document, path
+
+
+def edit(document):
+    first, second = document.scenes
+    first.elements[1].raw_text = 'Something else happens.'
+    first.elements[1].element_type = 'Dialogue'
+    first.insert(1, ElementRecord('Character', 'Bob'))
+    second.pop(0)
+    second.replace(0, ElementRecord('Action', 'Outside.'))
+    second.title = 'renamed'
+    scene = SceneModel()
+    scene.insert(0, ElementRecord('SceneHeading', 'Ext. Three'))
+    document.insert_scene(2, scene)
+    document.pop_scene(0)
+    document.add_name('characters', 'BOB')
+    document.add_name('locations', 'Yard')
+    document.remove_name('locations', 'Yard')
+    document.locations = ['House']
+    document.header_changed('locations')
+
+
+def reopen(path):
+    with open(path, 'rb') as stream:
+        data = stream.read()
+    document = ScreenplayDocument()
+    document.load_from_json(json.loads(data))
+    base = recover(document, path, data)
+    return document, base
+
+
+def reopen_copy(tmp_path, path):
+    """Recover a copy of the file and its journals, as after a crash."""
+    copy = str(tmp_path / 'copy')
+    os.mkdir(copy)
+    for name in (path, journal_path(path), old_journal_path(path)):
+        if os.path.exists(name):
+            shutil.copy(name, copy)
+    return reopen(os.path.join(copy, os.path.basename(path)))
+
+
+@pytest.mark.parametrize('old, new', [
+    ('Hello', 'Hello!'), ('Hello', 'Hllo'), ('aaa', 'aaaa'), ('', 'x'),
+    ('abc', ''), ('Bob says hi', 'Bob said hi')])
+def test_text_patch(old, new):
+    start, end, text = text_patch(old, new)
+    assert old[:start] + text + old[end:] == new
+
+
+def test_recover_replays_journal(tmp_path):
+    document, path = saved_document(tmp_path)
+    edit(document)
+    document.journal.close()
+
+    recovered, base = reopen(path)
+    assert recovered.get_json() == document.get_json()
+    assert not os.path.exists(journal_path(path))
+    with open(path, 'rb') as stream:
+        assert journal.digest(stream.read()) == base
+
+
+def test_recover_replays_typing(tmp_path):
+    document, path = saved_document(tmp_path)
+    record = document.scenes[1].elements[1]
+    record.edit(0, 9, 'Nothing')
+    record.edit(record.text_length(), record.text_length(), ' Yet.')
+    record.edit(15, 16, '')
+    document.journal.close()
+
+    assert record.raw_text == 'Nothing happens Yet.'
+    recovered, base = reopen(path)
+    assert recovered.get_json() == document.get_json()
+
+
+def test_recover_stops_at_torn_line(tmp_path):
+    document, path = saved_document(tmp_path)
+    document.scenes[0].title = 'kept'
+    document.journal.close()
+    with open(journal_path(path), 'a') as stream:
+        stream.write('{"op":"scene","sce')
+
+    recovered, base = reopen(path)
+    assert recovered.scenes[0].title == 'kept'
+
+
+def test_compaction(tmp_path, monkeypatch):
+    monkeypatch.setattr(journal, 'COMPACT_AFTER', 3)
+    document, path = saved_document(tmp_path)
+    edit(document)
+    document.journal.writer.join()
+    document.journal.close()
+
+    assert not os.path.exists(old_journal_path(path))
+    recovered, base = reopen(path)
+    assert recovered.get_json() == document.get_json()
+
+
+def test_crash_during_compaction(tmp_path, monkeypatch):
+    document, path = saved_document(tmp_path)
+    edit(document)
+    # Simulate dying before the worker replaced the file.
+    monkeypatch.setattr(document.journal.writer, 'submit',
+                        lambda *args: None)
+    document.journal.compact()
+    document.scenes[0].title = 'after compaction'
+    document.journal.close()
+
+    recovered, base = reopen(path)
+    assert recovered.get_json() == document.get_json()
+
+
+def test_crash_after_compaction(tmp_path, monkeypatch):
+    document, path = saved_document(tmp_path)
+    edit(document)
+    # Simulate dying after the file was replaced but before cleaning up.
+    monkeypatch.setattr(journal.os, 'remove', lambda name: None)
+    document.journal.compact()
+    document.journal.writer.join()
+    monkeypatch.undo()
+    document.scenes[0].title = 'after compaction'
+    document.journal.close()
+
+    recovered, base = reopen(path)
+    assert recovered.get_json() == document.get_json()
+
+
+def test_failed_compaction_can_be_retried(tmp_path, monkeypatch):
+    document, path = saved_document(tmp_path)
+    document.scenes[0].title = 'Zoë'
+
+    def fail(*args):
+        raise OSError('disk full')
+    monkeypatch.setattr(journal.os, 'replace', fail)
+    with pytest.raises(OSError):
+        document.journal.compact()
+    assert not document.journal.compacting
+
+    monkeypatch.undo()
+    document.journal.save()
+    document.journal.close()
+    with open(path, encoding='utf-8') as stream:
+        assert json.load(stream)['scenes'][0]['title'] == 'Zoë'
+
+
+def test_compaction_writes_snapshot_on_worker(tmp_path, monkeypatch):
+    document, path = saved_document(tmp_path)
+    edit(document)
+    # The calling thread only takes a snapshot.
+    monkeypatch.setattr(ScreenplayDocument, 'write_json', None)
+    document.journal.compact()
+    document.scenes[0].title = 'after compaction'
+    document.journal.writer.join()
+    monkeypatch.undo()
+    document.journal.close()
+
+    with open(path, 'rb') as stream:
+        assert journal.digest(stream.read()) == document.journal.base
+    with open(journal_path(path), encoding='utf-8') as stream:
+        assert json.loads(stream.readline()) == {'op': 'base',
+                                                 'digest': None}
+    recovered, base = reopen(path)
+    assert recovered.get_json() == document.get_json()
+
+
+def test_failed_background_write_is_retried(tmp_path, monkeypatch):
+    document, path = saved_document(tmp_path)
+    edit(document)
+
+    def fail(path, contents):
+        contents(io.StringIO())
+        raise OSError('disk full')
+    monkeypatch.setattr(filewriter, 'write_file', fail)
+    errors = []
+    document.journal.compact(lambda latency, error: errors.append(error))
+    document.journal.writer.join()
+    monkeypatch.undo()
+    assert isinstance(errors[0], OSError)
+    assert document.journal.failed and not document.journal.compacting
+    document.scenes[0].title = 'after failure'
+
+    # Both journals are kept until the file holds their edits.
+    recovered, base = reopen_copy(tmp_path, path)
+    assert recovered.get_json() == document.get_json()
+
+    document.journal.compact(lambda latency, error: errors.append(error))
+    assert errors[1] is None and not document.journal.failed
+    assert not os.path.exists(old_journal_path(path))
+    document.journal.close()
+    recovered, base = reopen(path)
+    assert recovered.get_json() == document.get_json()
@@ -0,0 +1,223 @@
+import sys, os
+tests_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, tests_path + '/../intercut')
+
+import pytest
+
+import loader
+from loader import ScreenplayLoader
+from model import ScreenplayDocument, SceneModel, ElementRecord
+from binaryformat import save_binary
+from fountain import save_fountain
+
+
+class ImmediateClock:
+    """Runs callbacks scheduled once right away. The test steps the interval
+    ones itself."""
+
+    def __init__(self):
+        self.intervals = []
+
+    def schedule_once(self, callback, timeout=0):
+        callback(0)
+
+    def schedule_interval(self, callback, timeout):
+        event = Interval(callback)
+        self.intervals.append(event)
+        return event
+
+
+class Interval:
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.active = True
+
+    def cancel(self):
+        self.active = False
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = ImmediateClock()
+    monkeypatch.setattr(loader, 'Clock', clock)
+    # Materialize one scene per step.
+    monkeypatch.setattr(loader, 'FRAME_BUDGET', -1)
+    return clock
+
+
+def make_document():
+    document = ScreenplayDocument()
+    document.title = 'Loaded'
+    for title in ('one', 'two', 'three'):
+        scene = SceneModel()
+        scene.insert(0, ElementRecord('SceneHeading', 'INT. ' + title.upper()))
+        scene.insert(1, ElementRecord('Action', title + ' happens.'))
+        document.insert_scene(len(document.scenes), scene)
+    return document
+
+
+def start_loader(path):
+    from screenplay import Screenplay
+    screenplay = Screenplay()
+    screenplay_loader = ScreenplayLoader(screenplay, path)
+    events = []
+    screenplay_loader.bind(
+        on_parsed=lambda _, document: events.append(('parsed', document)),
+        on_progress=lambda _, fraction: events.append(('progress', fraction)),
+        on_complete=lambda _: events.append(('complete',)),
+        on_error=lambda _, error: events.append(('error', error)))
+    # Synchronously, instead of on a worker thread.
+    screenplay_loader._parse()
+    return screenplay_loader, events
+
+
+def write_json(document, path):
+    with open(path, 'w') as stream:
+        document.write_json(stream)
+
+
+def write_text(document, path):
+    with open(path, 'w', encoding='utf-8') as stream:
+        for record in document.iter_elements():
+            stream.write(record.raw_text + '\n\n')
+
+
+@pytest.mark.parametrize('name,write,title', [
+    ('script.json', write_json, 'Loaded'),
+    ('script.ixb', save_binary, 'Loaded'),
+    ('script.fountain', save_fountain, 'Loaded'),
+    ('script.txt', write_text, 'Untitled'),
+])
+def test_readers(clock, tmp_path, name, write, title):
+    path = str(tmp_path / name)
+    write(make_document(), path)
+
+    screenplay_loader, events = start_loader(path)
+    assert events[0][0] == 'parsed'
+    document = events[0][1]
+    assert document is screenplay_loader.screenplay.document
+    assert document.title == title
+    assert [[(record.element_type, record.raw_text)
+             for record in scene.elements] for scene in document.scenes] == [
+        [(record.element_type, record.raw_text) for record in scene.elements]
+        for scene in make_document().scenes]
+    # Only JSON files are journaled.
+    assert (document.journal is not None) == name.endswith('.json')
+    screenplay_loader.cancel()
+    if document.journal is not None:
+        document.journal.close()
+
+
+def test_progress(clock, tmp_path):
+    path = str(tmp_path / 'script.json')
+    write_json(make_document(), path)
+
+    screenplay_loader, events = start_loader(path)
+    interval, = clock.intervals
+    while interval.active:
+        interval.callback(0)
+
+    screenplay = screenplay_loader.screenplay
+    assert events[1:] == [('progress', 1 / 3), ('progress', 2 / 3),
+                          ('progress', 1.), ('complete',)]
+    assert screenplay.displayed_scenes == 3
+    assert [scene.model for scene in reversed(screenplay.children)] == \
+        screenplay.document.scenes
+    screenplay.document.journal.close()
+
+
+def test_errors(clock, tmp_path):
+    invalid = str(tmp_path / 'invalid.json')
+    with open(invalid, 'w') as stream:
+        stream.write('{"title": ')
+    truncated = str(tmp_path / 'cut.ixb')
+    save_binary(make_document(), truncated)
+    with open(truncated, 'r+b') as stream:
+        stream.truncate(8)
+    undecodable = str(tmp_path / 'latin.txt')
+    with open(undecodable, 'wb') as stream:
+        stream.write('Zoë'.encode('latin-1'))
+
+    for path, error in ((str(tmp_path / 'missing.json'), OSError),
+                        (invalid, ValueError), (truncated, ValueError),
+                        (undecodable, ValueError)):
+        screenplay_loader, events = start_loader(path)
+        assert len(events) == 1
+        assert events[0][0] == 'error'
+        assert isinstance(events[0][1], error)
+        assert clock.intervals == []
+
+
+class QueuedClock(ImmediateClock):
+    """Runs callbacks scheduled once when the test says so, like the UI
+    thread would after the worker scheduled them."""
+
+    def __init__(self):
+        super().__init__()
+        self.queue = []
+
+    def schedule_once(self, callback, timeout=0):
+        self.queue.append(callback)
+
+    def run_next(self):
+        self.queue.pop(0)(0)
+
+
+@pytest.fixture
+def queued_clock(monkeypatch):
+    clock = QueuedClock()
+    monkeypatch.setattr(loader, 'Clock', clock)
+    monkeypatch.setattr(loader, 'FRAME_BUDGET', -1)
+    monkeypatch.setattr(loader, 'STREAM_BATCH', 2)
+    return clock
+
+
+def test_binary_scenes_are_streamed(queued_clock, tmp_path):
+    path = str(tmp_path / 'script.ixb')
+    save_binary(make_document(), path)
+
+    screenplay_loader, events = start_loader(path)
+    # The header, then the scenes in batches of two.
+    assert len(queued_clock.queue) == 3
+    queued_clock.run_next()
+    screenplay = screenplay_loader.screenplay
+    document = screenplay.document
+    assert events[0] == ('parsed', document) and document.scenes == []
+    assert document.loading
+
+    # Saving now would leave scenes out of the file.
+    screenplay.save_to = str(tmp_path / 'script.json')
+    screenplay.save()
+    assert not os.path.exists(screenplay.save_to)
+
+    interval, = queued_clock.intervals
+    queued_clock.run_next()
+    interval.callback(0)
+    assert screenplay.displayed_scenes == 1
+    queued_clock.run_next()
+    assert not document.loading
+    while interval.active:
+        interval.callback(0)
+    assert events[-1] == ('complete',)
+    assert [record.raw_text for record in document.iter_elements()] == \
+        [record.raw_text for record in make_document().iter_elements()]
+    assert screenplay.displayed_scenes == 3
+    assert screenplay.location_names.names() == [
+        'INT. ONE', 'INT. TWO', 'INT. THREE']
+
+
+def test_binary_scene_errors(queued_clock, tmp_path):
+    path = str(tmp_path / 'script.ixb')
+    save_binary(make_document(), path)
+    with open(path, 'r+b') as stream:
+        stream.seek(-3, os.SEEK_END)
+        stream.write(b'!!!')
+
+    screenplay_loader, events = start_loader(path)
+    while queued_clock.queue:
+        queued_clock.run_next()
+    assert events[-1][0] == 'error'
+    assert isinstance(events[-1][1], ValueError)
+    # None of the file is kept, so it cannot be saved over.
+    assert screenplay_loader.screenplay.document.scenes == []
@@ -0,0 +1,206 @@
+import sys, os
+tests_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, tests_path + '/../intercut')
+
+import io
+import json
+
+import pytest
+
+import model
+from model import ScreenplayDocument, SceneModel, ElementRecord
+
+
+@pytest.fixture
+def screenplay_json():
+    '''Return a screenplay in the Screenplay.get_json shape.'''
+    return {
+        'title': 'Title', 'author': 'Author', 'phone': '555', 'email': 'a@b',
+        'locations': ['House'], 'characters': ['BOB'], 'version': '1',
+        'save_to': '/tmp/x.ixt',
+        'scenes': [
+            {'title': 'one', 'notes': '', 'color': [1, 1, 1, 1],
+             'plot_point': '',
+             'elements': [{'type': 'SceneHeading', 'raw_text': 'Int. House'},
+                          {'type': 'Character', 'raw_text': 'Bob'},
+                          {'type': 'Dialogue', 'raw_text': 'Hi.'}]},
+            {'title': 'two', 'notes': 'n', 'color': [1, 0, 0, 1],
+             'plot_point': 'p',
+             'elements': [{'type': 'Action', 'raw_text': 'Bob leaves.'}]},
+        ]
+    }
+
+
+def test_round_trip(screenplay_json):
+    document = ScreenplayDocument()
+    document.load_from_json(screenplay_json)
+    assert document.get_json() == screenplay_json
+
+
+def test_ownership(screenplay_json):
+    document = ScreenplayDocument()
+    document.load_from_json(screenplay_json)
+    for scene in document.scenes:
+        assert scene.document is document
+        for record in scene.elements:
+            assert record.scene is scene
+
+
+def test_iter_elements(screenplay_json):
+    document = ScreenplayDocument()
+    document.load_from_json(screenplay_json)
+    assert [record.raw_text for record in document.iter_elements()] == [
+        'Int. House', 'Bob', 'Hi.', 'Bob leaves.']
+
+
+def test_scene_editing():
+    scene = SceneModel()
+    first, second = ElementRecord('Action', 'a'), ElementRecord('Action', 'b')
+    scene.insert(0, second)
+    scene.insert(0, first)
+    assert scene.elements == [first, second]
+    third = ElementRecord('Dialogue', 'c')
+    scene.replace(1, third)
+    assert second.scene is None and third.scene is scene
+    assert scene.pop(0) is first and first.scene is None
+    assert scene.elements == [third]
+
+
+def test_index_follows_edits(screenplay_json):
+    document = ScreenplayDocument()
+    document.load_from_json(screenplay_json)
+    one, two = document.scenes
+    heading, bob, hi = one.elements
+    assert [one.index(record) for record in one.elements] == [0, 1, 2]
+    assert document.index(two) == 1
+
+    one.insert(1, ElementRecord('Action', 'a'))
+    one.pop(0)
+    assert [one.index(record) for record in (bob, hi)] == [1, 2]
+    document.insert_scene(0, SceneModel())
+    assert document.index(two) == 2
+    with pytest.raises(ValueError):
+        one.index(heading)
+
+
+def test_index_is_remembered(screenplay_json, monkeypatch):
+    document = ScreenplayDocument()
+    document.load_from_json(screenplay_json)
+    one = document.scenes[0]
+    record = one.elements[2]
+    assert one.index(record) == 2
+
+    # Looking the same record up again does not scan the scene.
+    renumbered = []
+    monkeypatch.setattr(model, 'enumerate', lambda items: renumbered.append(
+        items) or enumerate(items), raising=False)
+    for _ in range(3):
+        assert one.index(record) == 2
+    one.insert(3, ElementRecord('Action', 'b'))
+    assert one.index(one.elements[3]) == 3
+    assert renumbered == []
+
+
+def test_records_are_slotted():
+    with pytest.raises(AttributeError):
+        ElementRecord('Action').color = 'red'
+
+
+@pytest.mark.parametrize('scene_count', [0, 1, 2])
+def test_write_json_matches_dumps(screenplay_json, scene_count):
+    screenplay_json['scenes'] = screenplay_json['scenes'][:scene_count]
+    screenplay_json['locations'] = []
+    document = ScreenplayDocument()
+    document.load_from_json(screenplay_json)
+    stream = io.StringIO()
+    document.write_json(stream)
+    assert stream.getvalue() == json.dumps(document.get_json(), indent=4)
+
+
+def test_scene_fragment_is_cached(screenplay_json):
+    document = ScreenplayDocument()
+    document.load_from_json(screenplay_json)
+    first, second = document.scenes
+    fragment = first.dumps()
+    assert not first.dirty
+    assert first.dumps() is fragment
+    assert json.loads(fragment) == screenplay_json['scenes'][0]
+    indented = first.fragment()
+    assert first.fragment() is indented
+    first.title = 'renamed'
+    assert first.fragment() is not indented
+
+
+def test_write_json_reuses_indented_scenes(screenplay_json, monkeypatch):
+    document = ScreenplayDocument()
+    document.load_from_json(screenplay_json)
+    document.write_json(io.StringIO())
+    document.scenes[1].title = 'renamed'
+
+    indented = []
+    indent_json = model.indent_json
+    monkeypatch.setattr(model, 'indent_json', lambda json_string, level:
+                        indented.append(level) or indent_json(json_string,
+                                                              level))
+    stream = io.StringIO()
+    document.write_json(stream)
+    # Only the edited scene is indented again, besides the header fields.
+    assert indented.count(2) == 1
+    assert stream.getvalue() == json.dumps(document.get_json(), indent=4)
+
+
+@pytest.mark.parametrize('edit', [
+    lambda scene: setattr(scene.elements[1], 'raw_text', 'Alice'),
+    lambda scene: setattr(scene.elements[2], 'element_type', 'Action'),
+    lambda scene: setattr(scene, 'title', 'renamed'),
+    lambda scene: setattr(scene, 'color', [0, 0, 1, 1]),
+    lambda scene: scene.insert(1, ElementRecord('Action', 'new')),
+    lambda scene: scene.pop(0),
+    lambda scene: scene.replace(0, ElementRecord('Action', 'Outside')),
+])
+def test_edits_dirty_only_their_scene(screenplay_json, edit):
+    document = ScreenplayDocument()
+    document.load_from_json(screenplay_json)
+    first, second = document.scenes
+    document.get_json()
+    first.dumps(), second.dumps()
+
+    edit(first)
+    assert first.dirty and not second.dirty
+    stream = io.StringIO()
+    document.write_json(stream)
+    assert json.loads(stream.getvalue()) == document.get_json()
+
+
+def test_unchanged_value_keeps_cache(screenplay_json):
+    document = ScreenplayDocument()
+    document.load_from_json(screenplay_json)
+    scene = document.scenes[0]
+    scene.dumps()
+    scene.elements[0].raw_text = 'Int. House'
+    assert not scene.dirty
+
+
+def test_line_count_is_cached():
+    record = ElementRecord('Action', 'a' * 61)
+    assert record.line_count() == 1
+    record.edit(0, 0, 'b')
+    assert record.line_count() == 2
+    record.element_type = 'Dialogue'
+    assert record.line_count() == 2
+    record.raw_text = ''
+    assert record.line_count() == 1
+
+
+def test_snapshot_is_unaffected_by_later_edits(screenplay_json):
+    document = ScreenplayDocument()
+    document.load_from_json(screenplay_json)
+    expected = json.dumps(document.get_json(), indent=4)
+    snapshot = document.snapshot()
+
+    document.scenes[0].elements[0].edit(0, 0, 'x')
+    document.add_name('characters', 'ALICE')
+    document.pop_scene(1)
+    stream = io.StringIO()
+    model.write_snapshot(snapshot, stream)
+    assert stream.getvalue() == expected
@@ -0,0 +1,91 @@
+import sys, os
+tests_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, tests_path + '/../intercut')
+
+from tools.nameregistry import NameRegistry
+
+
+def test_names_are_case_and_space_insensitive():
+    registry = NameRegistry()
+    assert registry.register(1, 'Mary Jane', 'a') == ('Mary Jane', None)
+    assert registry.register(2, ' MARY  jane', 'b') == (None, None)
+    assert registry.names() == ['Mary Jane']
+    assert registry.count('mary jane') == 2
+    assert 'MARY JANE' in registry
+    assert registry.index.search('ma') == ['Mary Jane']
+
+
+def test_registering_again_moves_the_occurrence():
+    registry = NameRegistry()
+    registry.register(1, 'Bob', 'a')
+    assert registry.register(1, 'Bob', 'a') == (None, None)
+    assert registry.count('bob') == 1
+    assert registry.register(1, 'Alice', 'a') == ('Alice', 'Bob')
+    assert registry.names() == ['Alice']
+    assert registry.index.search('') == ['Alice']
+    assert registry.register(1, '', 'a') == (None, 'Alice')
+    assert len(registry) == 0
+
+
+def test_unused_names_are_dropped():
+    registry = NameRegistry()
+    registry.register(1, 'Bob', 'a')
+    registry.register(2, 'bob', 'b')
+    assert registry.unregister(1) is None
+    assert registry.unregister(2) == 'Bob'
+    assert registry.unregister(2) is None
+    assert 'Bob' not in registry and 'Bob' not in registry.index
+
+
+def test_scenes():
+    registry = NameRegistry()
+    order = ['a', 'b', 'c']
+    registry.register(1, 'Bob', 'b')
+    registry.register(2, 'Bob', 'c')
+    registry.register(3, 'Bob', 'b')
+    assert sorted(registry.scenes('Bob')) == ['b', 'c']
+    assert registry.first_and_last_scene('Bob', order.index) == ('b', 'c')
+    registry.register(4, 'Bob', 'a')
+    registry.unregister(2)
+    assert registry.first_and_last_scene(
+        'Bob', {scene: i for i, scene in enumerate(order)}) == ('a', 'b')
+    assert registry.first_and_last_scene('Nobody', order.index) == (None, None)
+
+
+def test_rank_by_count_then_recency():
+    registry = NameRegistry()
+    for record, name in enumerate(['Extra', 'Lead', 'Lead', 'Walk On',
+                                   'Lead', 'Friend', 'Friend', 'Lab Tech']):
+        registry.register(record, name, 'a')
+    assert registry.rank('') == ['Lead', 'Friend', 'Lab Tech', 'Walk On',
+                                 'Extra']
+    assert registry.rank('l', limit=2) == ['Lead', 'Lab Tech']
+    registry.register(8, 'EXTRA', 'a')
+    assert registry.rank('') == ['Lead', 'Extra', 'Friend', 'Lab Tech',
+                                 'Walk On']
+
+
+def test_rank_preferred_first():
+    registry = NameRegistry()
+    for record, name in enumerate(['Lead', 'Lead', 'Lead', 'Bob', 'Alice']):
+        registry.register(record, name, 'a')
+    assert registry.rank('', preferred=['alice', 'BOB']) == ['Alice', 'Bob',
+                                                             'Lead']
+    assert registry.rank('b', preferred=['Alice', 'Bob']) == ['Bob']
+    assert registry.rank('', limit=1, preferred=['Nobody', 'Bob']) == ['Bob']
+
+
+def test_rank_follows_changes():
+    registry = NameRegistry()
+    for record, name in enumerate(['Ann', 'Bob', 'Bob', 'Al', 'Ann', 'Abe']):
+        registry.register(record, name, 'a')
+    assert registry.rank('a') == ['Ann', 'Abe', 'Al']
+    assert registry.rank('a', limit=2, preferred=['Al']) == ['Al', 'Ann']
+    registry.unregister(0)
+    registry.register(3, 'Al', 'a')
+    assert registry.rank('a') == ['Al', 'Abe', 'Ann']
+    registry.unregister(5)
+    registry.register(6, 'Amy', 'b')
+    assert registry.rank('') == ['Bob', 'Amy', 'Al', 'Ann']
+    assert registry.rank('', limit=3, preferred=['bob', 'Nobody']) == [
+        'Bob', 'Amy', 'Al']
@@ -0,0 +1,44 @@
+import sys, os
+tests_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, tests_path + '/../intercut')
+
+import pytest
+
+from tools.offsettree import OffsetTree
+
+
+@pytest.fixture
+def tree():
+    '''Return a tree over a few slots, one of them empty.'''
+    return OffsetTree([3, 0, 4, 1])
+
+
+def test_prefix(tree):
+    assert [tree.prefix(i) for i in range(5)] == [0, 3, 3, 7, 8]
+    assert tree.total() == 8
+
+
+@pytest.mark.parametrize("offset,expected", [
+    (0, (0, 0)),
+    (2, (0, 2)),
+    (3, (2, 0)),
+    (6, (2, 3)),
+    (7, (3, 0)),
+])
+def test_find_skips_empty_slots(tree, offset, expected):
+    assert tree.find(offset) == expected
+
+
+def test_find_out_of_range(tree):
+    with pytest.raises(IndexError):
+        tree.find(8)
+
+
+def test_add_insert_pop(tree):
+    tree.add(1, 2)
+    assert tree.find(3) == (1, 0)
+    tree.insert(0, 5)
+    assert tree.prefix(2) == 8
+    assert tree.pop(0) == 5
+    assert tree.sizes == [3, 2, 4, 1]
+    assert tree.total() == 10
@@ -0,0 +1,185 @@
+import sys, os
+tests_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, tests_path + '/../intercut')
+
+import random
+
+from model import ScreenplayDocument, SceneModel, ElementRecord
+from metrics import WRAP_WIDTHS
+from pagination import Paginator, PageBreak
+
+
+def text(element_type, lines):
+    """Return a text taking lines lines as element_type."""
+    if not lines:
+        return 'Bob'
+    return ' '.join(['x' * (WRAP_WIDTHS[element_type] - 1)] * lines)
+
+
+def set_lines(record, lines):
+    record.raw_text = text(record.element_type, lines)
+
+
+def make_document(scenes):
+    """Build a document from lists of (element_type, line count)."""
+    document = ScreenplayDocument()
+    for elements in scenes:
+        scene = SceneModel()
+        for index, (element_type, lines) in enumerate(elements):
+            scene.insert(index, ElementRecord(element_type,
+                                              text(element_type, lines)))
+        document.insert_scene(len(document.scenes), scene)
+    document.paginator = Paginator(document, page_lines=20)
+    return document
+
+
+def pages(paginator):
+    paginator.refresh()
+    return paginator.pages
+
+
+def full_layout(document):
+    return pages(Paginator(document, document.paginator.page_lines))
+
+
+def test_empty_document():
+    document = ScreenplayDocument()
+    document.paginator = Paginator(document)
+    assert document.paginator.page_count() == 1
+
+
+def test_scene_heading_moves_to_next_page():
+    document = make_document([
+        [('SceneHeading', 1), ('Action', 17)],
+        [('SceneHeading', 1), ('Action', 3)],
+    ])
+    paginator = document.paginator
+    heading = document.scenes[1].elements[0]
+    assert pages(paginator)[1:] == [PageBreak(heading)]
+    assert paginator.page_of(heading) == 2
+
+
+def test_no_widows_or_orphans():
+    document = make_document([[('SceneHeading', 1), ('Action', 15),
+                               ('Action', 5)]])
+    paginator = document.paginator
+    action = document.scenes[0].elements[2]
+    # 1 + 1 + 15 + 1 lines used: 2 lines left, split 2 / 3.
+    assert pages(paginator)[1:] == [PageBreak(action, 2)]
+
+    # A split would leave a single line on the first page: move it whole.
+    set_lines(document.scenes[0].elements[1], 16)
+    assert pages(paginator)[1:] == [PageBreak(action)]
+
+    # A split would leave a single line on the second page: move it whole.
+    set_lines(document.scenes[0].elements[1], 15)
+    set_lines(action, 3)
+    assert pages(paginator)[1:] == [PageBreak(action)]
+
+
+def test_speech_split_with_more_and_contd():
+    document = make_document([[('SceneHeading', 1), ('Action', 13),
+                               ('Character', 0), ('Dialogue', 8)]])
+    paginator = document.paginator
+    character, dialogue = document.scenes[0].elements[2:]
+    # 1 + 1 + 13 + 1 + 1 lines used: 3 lines left, one of them for MORE.
+    assert pages(paginator)[1:] == [PageBreak(dialogue, 2, character)]
+    assert paginator.pages[1].continued_heading() == "BOB (CONT'D)"
+
+
+def test_character_stays_with_dialogue():
+    document = make_document([[('SceneHeading', 1), ('Action', 16),
+                               ('Character', 0), ('Dialogue', 2)]])
+    paginator = document.paginator
+    character = document.scenes[0].elements[2]
+    assert pages(paginator)[1:] == [PageBreak(character)]
+
+
+def random_document(rng):
+    kinds = ['Action', 'Character', 'Dialogue', 'Parenthetical']
+    scenes = []
+    for _ in range(40):
+        elements = [('SceneHeading', 1)]
+        for _ in range(rng.randint(1, 8)):
+            kind = rng.choice(kinds)
+            elements.append((kind, 0 if kind == 'Character'
+                             else rng.randint(1, 9)))
+        scenes.append(elements)
+    return make_document(scenes)
+
+
+def random_edit(rng, document):
+    kinds = ['Action', 'Character', 'Dialogue', 'Parenthetical']
+    scene = rng.choice(document.scenes)
+    action = rng.random()
+    if action < 0.5:
+        set_lines(rng.choice(scene.elements), rng.randint(1, 9))
+    elif action < 0.7:
+        scene.insert(rng.randint(1, len(scene)),
+                     ElementRecord('Action', 'word ' * rng.randint(1, 60)))
+    elif action < 0.85 and len(scene) > 1:
+        scene.pop(rng.randint(1, len(scene) - 1))
+    elif action < 0.95:
+        rng.choice(scene.elements[1:] or scene.elements).element_type = \
+            rng.choice(kinds)
+    elif len(document.scenes) > 2:
+        document.pop_scene(document.scenes.index(scene))
+
+
+def test_incremental_refresh_matches_full_layout():
+    rng = random.Random(4)
+    document = random_document(rng)
+    paginator = document.paginator
+    pages(paginator)
+
+    for _ in range(200):
+        random_edit(rng, document)
+        paginator.refresh()
+        assert paginator.pages == full_layout(document)
+
+
+def test_refresh_after_many_edits_matches_full_layout():
+    rng = random.Random(9)
+    document = random_document(rng)
+    paginator = document.paginator
+    pages(paginator)
+
+    for _ in range(50):
+        for _ in range(rng.randint(1, 6)):
+            random_edit(rng, document)
+        paginator.refresh()
+        assert paginator.pages == full_layout(document)
+        records = list(document.iter_elements())
+        for record in rng.sample(records, 10):
+            # The last page starting at or before the record.
+            position = records.index(record)
+            expected = [index for index, page_break in enumerate(
+                paginator.pages) if records.index(page_break.record)
+                <= position][-1] + 1
+            assert paginator.page_of(record) == expected
+
+
+def test_refresh_stops_when_breaks_converge():
+    document = make_document([[('SceneHeading', 1), ('Action', 8),
+                               ('Action', 8)]] * 50)
+    paginator = document.paginator
+    before = list(pages(paginator))
+    assert len(before) > 40
+
+    record = document.scenes[30].elements[1]
+    set_lines(record, 7)
+    laid_out = []
+    original = paginator._paginate
+
+    def spy(first, last):
+        first = original(first, last)
+        laid_out.append(first)
+        return first
+    paginator._paginate = spy
+    paginator.refresh()
+    assert paginator.pages == full_layout(document)
+    page = paginator.page_of(record) - 1
+    assert laid_out and page - 2 <= laid_out[0] <= page
+    # Every page before the edit is the same object as before.
+    assert all(new is old for new, old in zip(paginator.pages[:page],
+                                              before[:page]))
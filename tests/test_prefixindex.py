@@ -0,0 +1,60 @@
+import sys, os
+tests_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, tests_path + '/../intercut')
+
+import random
+
+from tools.prefixindex import PrefixIndex
+
+
+def test_search_is_case_insensitive():
+    index = PrefixIndex(['Bob', 'ALICE', 'Bobby', 'al'])
+    assert index.search('BO') == ['Bob', 'Bobby']
+    assert index.search('al') == ['al', 'ALICE']
+    assert index.search('') == ['al', 'ALICE', 'Bob', 'Bobby']
+    assert index.search('z') == []
+
+
+def test_limit():
+    index = PrefixIndex('Name {:03}'.format(i) for i in range(500))
+    assert index.search('name', limit=3) == ['Name 000', 'Name 001',
+                                             'Name 002']
+    assert index.search('name 49', limit=100) == [
+        'Name 49{}'.format(i) for i in range(10)]
+
+
+def test_add_and_remove():
+    index = PrefixIndex()
+    assert index.add('Bob')
+    assert not index.add('BOB')
+    assert 'bob' in index and len(index) == 1
+    assert list(index) == ['Bob']
+    index.remove('bOb')
+    assert 'Bob' not in index and len(index) == 0
+    index.remove('Bob')
+
+
+def test_best_ranked():
+    rng = random.Random(5)
+    names = ['{}{:03}'.format(rng.choice('ABC'), i) for i in range(300)]
+    index = PrefixIndex(names[:200])
+    for name in names[200:]:
+        index.add(name)
+    for name in names[::3]:
+        index.remove(name)
+    ranks = {}
+    for name in rng.sample(list(index), 150):
+        ranks[name] = (rng.randrange(10), rng.randrange(10))
+        index.set_rank(name, ranks[name])
+        if rng.random() < .1:
+            # Lookups in between use the tree built so far.
+            index.best('a', limit=3)
+
+    def expected(prefix):
+        return sorted(index.search(prefix),
+                      key=lambda name: (ranks.get(name, (float('inf'),)),
+                                        name))
+    for prefix in ('', 'a', 'B1', 'c05', 'z'):
+        assert index.best(prefix) == expected(prefix)
+        assert index.best(prefix, limit=5) == expected(prefix)[:5]
+    assert PrefixIndex().best('') == []
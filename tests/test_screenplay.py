@@ -0,0 +1,186 @@
+import sys, os
+tests_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, tests_path + '/../intercut')
+
+import json
+import random
+
+from model import ScreenplayDocument, SceneModel, ElementRecord
+from screenplay import Screenplay, ScrollingScreenplay
+from scene import Scene
+from elements import Action, Dialogue
+
+
+def make_model(title, size):
+    model = SceneModel()
+    model.elements.append(ElementRecord('SceneHeading', 'INT. ' + title,
+                                        model))
+    for index in range(1, size):
+        model.elements.append(
+            ElementRecord('Action', '{} {}'.format(title, index), model))
+    return model
+
+
+def make_screenplay(sizes):
+    screenplay = Screenplay()
+    ScrollingScreenplay().add_widget(screenplay)
+    screenplay.insert_scenes(0, [make_model(str(index), size)
+                                 for index, size in enumerate(sizes)])
+    return screenplay
+
+
+def assert_consistent(screenplay):
+    """Check every index and position against the widget tree itself."""
+    scenes = screenplay.children
+    assert [scene.scene_index for scene in scenes] == \
+        list(range(len(scenes)))
+    for scene in scenes:
+        assert [element.element_index for element in scene.children] == \
+            list(range(len(scene.children)))
+    assert [screenplay.scene_sizes.prefix(index + 1)
+            - screenplay.scene_sizes.prefix(index)
+            for index in range(len(scenes))] == \
+        [len(scene.children) for scene in scenes]
+    assert [scene.model for scene in reversed(scenes)] == \
+        screenplay.document.scenes
+
+    elements = [element for scene in reversed(scenes)
+                for element in reversed(scene.children)]
+    assert screenplay.scene_sizes.total() == len(elements)
+    for position, element in enumerate(elements):
+        assert screenplay.get_position(element) == position
+        assert screenplay.get_element_at(position) is element
+    assert [element.record for element in elements] == \
+        list(screenplay.document.iter_elements())
+
+
+def test_bulk_load_defers_indexing():
+    screenplay = make_screenplay([2, 3])
+    first = screenplay.children[1]
+
+    with screenplay.bulk_load():
+        scene = Scene()
+        scene.clear_widgets()
+        scene.model = make_model('new', 2)
+        screenplay.add_widget(scene, index=1)
+        scene.bind_model(scene.model)
+        first.add_widget(Dialogue(), index=0)
+        first.add_widget(Action(), index=0)
+
+        # Nothing is re-indexed or recounted inside the block.
+        assert [s.scene_index for s in screenplay.children] == [0, 0, 1]
+        assert [e.element_index for e in first.children] == [0, 0, 0, 1]
+        assert screenplay.scene_sizes.total() == 5
+        assert {id(s) for s in screenplay._bulk_scenes} == {id(scene),
+                                                           id(first)}
+
+    assert screenplay._bulk_scenes == []
+    assert screenplay.children[1] is scene
+    assert_consistent(screenplay)
+
+
+def test_nested_bulk_load():
+    screenplay = make_screenplay([2, 2])
+
+    with screenplay.bulk_load():
+        with screenplay.bulk_load():
+            screenplay.insert_scenes(0, [make_model('a', 3)])
+        # Only the outermost block brings things up to date.
+        assert screenplay.scene_sizes.total() == 4
+        screenplay.children[2].add_widget(Action(), index=1)
+        screenplay.insert_scenes(2, [make_model('b', 1), make_model('c', 2)])
+        assert screenplay.bulk_depth == 1
+
+    assert screenplay.bulk_depth == 0
+    assert [len(scene) for scene in screenplay.document.scenes] == [
+        3, 1, 2, 2, 3]
+    assert_consistent(screenplay)
+
+
+def test_removals_in_bulk_load():
+    screenplay = make_screenplay([3, 4, 2, 3])
+
+    with screenplay.bulk_load():
+        middle = screenplay.children[2]
+        middle.remove_widget(middle.children[1])
+        middle.remove_widget(middle.children[0])
+        screenplay.remove_widget(screenplay.children[1])
+        last = screenplay.children[0]
+        last.remove_widget(last.children[2])
+        last.add_widget(Action(), index=1)
+
+    assert [len(scene) for scene in screenplay.document.scenes] == [3, 2, 3]
+    assert [record.raw_text for record in screenplay.document.scenes[1]
+            .elements] == ['INT. 1', '1 1']
+    assert_consistent(screenplay)
+
+
+def test_positions_follow_edits_in_the_middle():
+    screenplay = make_screenplay([3, 5, 4])
+    middle = screenplay.children[1]
+
+    element = Action()
+    element.element_index = 2
+    middle.add_element(element)
+    assert_consistent(screenplay)
+    assert screenplay.get_position(element) == 3 + 3
+    middle.add_widget(Dialogue(), index=4)
+    assert_consistent(screenplay)
+    middle.remove_widget(middle.children[3])
+    assert_consistent(screenplay)
+    screenplay.children[2].remove_widget(screenplay.children[2].children[1])
+    assert_consistent(screenplay)
+    assert screenplay.get_element_at(2 + 3) is element
+
+
+def test_positions_follow_random_edits():
+    rng = random.Random(2)
+    screenplay = make_screenplay([4, 6, 3, 5])
+    for _ in range(60):
+        scene = rng.choice(screenplay.children)
+        if len(scene.children) > 1 and rng.random() < .5:
+            scene.remove_widget(rng.choice(scene.children[:-1]))
+        else:
+            scene.add_widget(Action(),
+                             index=rng.randrange(len(scene.children)))
+        assert_consistent(screenplay)
+
+
+def test_saves_stream_on_the_worker(tmp_path, monkeypatch):
+    screenplay = make_screenplay([2, 3])
+    screenplay.save_to = str(tmp_path / 'script.json')
+    screenplay.save()
+    journal = screenplay.document.journal
+
+    screenplay.document.scenes[1].elements[1].edit(0, 0, 'Later, ')
+    # Later saves leave serializing the document to the worker.
+    monkeypatch.setattr(ScreenplayDocument, 'write_json', None)
+    screenplay.save()
+    screenplay.document.scenes[0].title = 'during the write'
+    screenplay.save()
+    journal.writer.join()
+    monkeypatch.undo()
+
+    with open(screenplay.save_to, encoding='utf-8') as stream:
+        assert stream.read() == json.dumps(screenplay.document.get_json(),
+                                           indent=4)
+    journal.close()
+
+
+def test_name_changes_journal_single_names(tmp_path):
+    screenplay = make_screenplay([2, 3])
+    screenplay.save_to = str(tmp_path / 'script.json')
+    screenplay.save()
+    journal = screenplay.document.journal
+
+    record = screenplay.document.scenes[1].elements[0]
+    record.raw_text = 'EXT. 1'
+    screenplay.update_locations(record)
+    journal.close()
+
+    with open(journal.path + '.journal', encoding='utf-8') as stream:
+        ops = [json.loads(line) for line in stream][1:]
+    assert ops[1:] == [
+        {'op': 'name', 'field': 'locations', 'remove': 'INT. 1'},
+        {'op': 'name', 'field': 'locations', 'add': 'EXT. 1'}]
+    assert screenplay.document.locations == ['INT. 0', 'EXT. 1']
@@ -0,0 +1,65 @@
+import sys, os
+tests_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, tests_path + '/../intercut')
+
+from model import ScreenplayDocument, SceneModel, ElementRecord
+from selection import Anchor, DocumentSelection
+
+
+def make_document():
+    document = ScreenplayDocument()
+    for title in ('one', 'two', 'three'):
+        scene = SceneModel()
+        scene.insert(0, ElementRecord('SceneHeading', 'Int. ' + title))
+        scene.insert(1, ElementRecord('Action', title + ' happens.'))
+        document.insert_scene(len(document.scenes), scene)
+    return document
+
+
+def test_backwards_selection_matches_forwards():
+    document = make_document()
+    forwards = DocumentSelection(document)
+    forwards.start(Anchor(0, 1, 4))
+    forwards.extend(Anchor(2, 0, 5))
+    backwards = DocumentSelection(document)
+    backwards.start(Anchor(2, 0, 5))
+    backwards.extend(Anchor(0, 1, 4))
+
+    for selection in (forwards, backwards):
+        assert selection.spans_elements()
+        assert selection.bounds() == (Anchor(0, 1, 4), Anchor(2, 0, 5))
+        assert selection.get_text() == \
+            'happens.\nInt. two\ntwo happens.\nInt. '
+        assert selection.range_in(0, 0) is None
+        assert selection.range_in(0, 1) == (4, 12)
+        assert selection.range_in(1, 1) == (0, 12)
+        assert selection.range_in(2, 0) == (0, 5)
+        assert selection.range_in(2, 1) is None
+
+
+def test_within_one_element():
+    document = make_document()
+    selection = DocumentSelection(document)
+    selection.start(Anchor(1, 1, 6))
+    selection.extend(Anchor(1, 1, 2))
+    assert not selection.spans_elements()
+    assert selection.get_text() == 'o ha'
+
+
+def test_edit_ends_selection():
+    document = make_document()
+    selection = DocumentSelection(document)
+    selection.select_all()
+    assert selection.spans_elements()
+    assert selection.get_text().endswith('three happens.')
+    document.scenes[0].elements[0].edit(0, 0, 'x')
+    assert not selection.is_active()
+    assert selection.get_text() == ''
+    selection.extend(Anchor(0, 0, 1))
+    assert selection.anchor == selection.focus == Anchor(0, 0, 1)
+
+
+def test_select_all_empty_document():
+    selection = DocumentSelection(ScreenplayDocument())
+    selection.select_all()
+    assert not selection.is_active()
@@ -0,0 +1,66 @@
+import sys, os
+tests_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, tests_path + '/../intercut')
+
+import random
+
+import pytest
+
+from tools.stringmanip import changed_span, common_prefix, common_suffix, \
+    remove_last_word, upper
+
+
+def test_remove_last_word():
+    assert remove_last_word('Int. House') == 'Int. '
+    assert remove_last_word('House') == ''
+
+
+def test_common_prefix_and_suffix():
+    assert common_prefix('abcdef', 'abcxef') == 3
+    assert common_prefix('abc', 'abc') == 3
+    assert common_prefix('', 'abc') == 0
+    assert common_suffix('abcdef', 'abcxef') == 2
+    assert common_suffix('aaaa', 'aaa', limit=1) == 1
+
+
+def test_changed_span_random_edits():
+    rng = random.Random(7)
+    for _ in range(500):
+        old = ''.join(rng.choice('ab ') for _ in range(rng.randint(0, 30)))
+        start = rng.randint(0, len(old))
+        end = rng.randint(start, len(old))
+        new = old[:start] + ''.join(rng.choice('ab') for _ in range(
+            rng.randint(0, 4))) + old[end:]
+        span_start, old_end, new_end = changed_span(old, new)
+        assert old[:span_start] + new[span_start:new_end] + old[old_end:] \
+            == new
+
+
+def test_upper_keeps_length():
+    assert upper('Int. House') == 'INT. HOUSE'
+    assert upper('Straße') == 'STRAßE'
+    assert upper('ŉ and ß') == 'ŉ AND ß'
+
+
+class CountingStr(str):
+    """A str that counts the characters sliced out of it."""
+
+    sliced = 0
+
+    def __getitem__(self, key):
+        part = str.__getitem__(self, key)
+        CountingStr.sliced += len(part)
+        return part
+
+
+@pytest.mark.parametrize('length', [10000, 80000])
+def test_changed_span_is_linear(length):
+    text = ('Word ' * (length // 5 + 1))[:length]
+    middle = length // 2
+    for new in (text[:middle] + 'X' + text[middle:],
+                text[:middle] + text[middle + 1:], text):
+        CountingStr.sliced = 0
+        span = changed_span(CountingStr(text), CountingStr(new))
+        assert text[:span[0]] + new[span[0]:span[2]] + text[span[1]:] == new
+        # Both strings are sliced twice over at most.
+        assert CountingStr.sliced <= 4 * length
@@ -0,0 +1,125 @@
+import sys, os
+tests_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, tests_path + '/../intercut')
+
+import pytest
+from kivy.clock import Clock
+
+from suggest import DropSuggestion
+from model import SceneModel, ElementRecord
+from screenplay import Screenplay, ScrollingScreenplay
+
+
+@pytest.fixture
+def drop_down():
+    drop_down = DropSuggestion()
+    drop_down.is_open = True
+    return drop_down
+
+
+def shown_texts(drop_down):
+    return [button.text for button in reversed(drop_down.container.children)]
+
+
+def test_buttons_are_reused(drop_down):
+    drop_down.set_options(['A', 'B', 'C'])
+    buttons = list(drop_down.pool)
+    assert shown_texts(drop_down) == ['A', 'B', 'C']
+
+    drop_down.set_options(['D'])
+    assert shown_texts(drop_down) == ['D']
+    drop_down.set_options(['E', 'F'])
+    assert shown_texts(drop_down) == ['E', 'F']
+    assert drop_down.pool == buttons
+
+
+def test_highlight_moves_by_index(drop_down):
+    drop_down.set_options(['A', 'B', 'C'])
+    drop_down.set_highlight()
+    assert drop_down.get_selection_text() == 'A'
+    drop_down.move_highlight(increment=1)
+    assert drop_down.get_selection_text() == 'B'
+    assert [button.highlighted for button in drop_down.pool] == [
+        False, True, False]
+    drop_down.move_highlight(increment=-2)
+    assert drop_down.get_selection_text() == 'C'
+
+    drop_down.set_options(['D', 'E'])
+    assert drop_down.get_selection_text() == ''
+    assert not any(button.highlighted for button in drop_down.pool)
+
+
+def test_release_selects(drop_down):
+    selected = []
+    drop_down.bind(on_select=lambda instance, text: selected.append(text))
+    drop_down.set_options(['A', 'B'])
+    drop_down.pool[1].dispatch('on_release')
+    assert selected == ['B']
+
+
+def test_elements_share_one_drop_down():
+    model = SceneModel()
+    for element_type, text in (('SceneHeading', 'INT. HOUSE'),
+                               ('Character', 'ANN'), ('Dialogue', 'Hi.'),
+                               ('Character', 'BOB')):
+        model.elements.append(ElementRecord(element_type, text, model))
+    screenplay = Screenplay()
+    ScrollingScreenplay().add_widget(screenplay)
+    screenplay.insert_scenes(0, [model])
+    scene = screenplay.children[0]
+    heading, ann, bob = (scene.children[3], scene.children[2],
+                         scene.children[0])
+
+    assert screenplay.drop_down is None
+    drop_down = ann.get_drop_down()
+    assert drop_down is screenplay.drop_down
+    assert ann.attached_drop_down() is drop_down
+    assert bob.attached_drop_down() is None
+    drop_down.min_state_time = 0
+    drop_down.set_options(['ANN', 'ANNA', 'ANNE'])
+    drop_down.is_open = True
+    buttons = list(drop_down.pool)
+
+    # Passing the drop down on dismisses the options of its previous owner.
+    assert bob.get_drop_down() is drop_down
+    Clock.tick()
+    assert not drop_down.is_open
+    assert drop_down.owner is bob
+    assert ann.attached_drop_down() is None
+    assert bob.attached_drop_down() is drop_down
+
+    # Its buttons go with it.
+    drop_down.set_options(['BOB', 'BOBBY'])
+    assert heading.get_drop_down() is drop_down
+    drop_down.set_options(['INT. HOUSE'])
+    assert drop_down.pool == buttons
+    assert shown_texts(drop_down) == ['INT. HOUSE']
+
+    heading.dismiss_suggestions()
+    assert drop_down.owner is None
+    assert screenplay.drop_down is drop_down
+
+
+def test_likely_names_walk_back_from_the_element():
+    model = SceneModel()
+    for element_type, text in (('SceneHeading', 'INT. HOUSE'),
+                               ('Character', 'ANN'), ('Dialogue', 'Hi.'),
+                               ('Character', 'CAL'), ('Dialogue', 'Hey.'),
+                               ('Character', 'BOB'), ('Dialogue', 'Yo.'),
+                               ('Character', 'ann'), ('Dialogue', 'So.'),
+                               ('Character', '')):
+        model.elements.append(ElementRecord(element_type, text, model))
+    screenplay = Screenplay()
+    ScrollingScreenplay().add_widget(screenplay)
+    screenplay.insert_scenes(0, [model])
+    scene = screenplay.children[0]
+    last, bob = scene.children[0], scene.children[4]
+
+    assert last.likely_names() == ['BOB', 'ann']
+    assert bob.likely_names() == ['ANN', 'CAL']
+
+    # Looked up again once the element is focused anew.
+    scene.children[2].record.raw_text = 'DEE'
+    assert last.likely_names() == ['BOB', 'ann']
+    last.on_focus(last, True)
+    assert last.likely_names() == ['BOB', 'DEE']
@@ -0,0 +1,45 @@
+import sys, os
+tests_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, tests_path + '/../intercut')
+
+import random
+
+from tools.textbuffer import TextBuffer, CHUNK_SIZE
+
+
+def test_edits_match_string_slicing():
+    rng = random.Random(4)
+    text = 'x' * (3 * CHUNK_SIZE + 7)
+    buffer = TextBuffer(text)
+    for _ in range(2000):
+        start = rng.randint(0, len(text))
+        end = rng.randint(start, min(len(text), start + rng.choice(
+            [0, 1, 5, CHUNK_SIZE * 2])))
+        new = rng.choice(['', 'a', 'bc', 'd' * CHUNK_SIZE])
+        buffer.replace(start, end, new)
+        text = text[:start] + new + text[end:]
+        assert len(buffer) == len(text)
+    assert str(buffer) == text
+    assert all(len(chunk) <= 2 * CHUNK_SIZE for chunk in buffer.chunks)
+
+
+def test_typing_and_deleting_everything():
+    buffer = TextBuffer()
+    for index in range(3000):
+        buffer.insert(index, str(index % 10))
+    assert str(buffer)[:12] == '012345678901'
+    for index in range(3000, 0, -1):
+        buffer.delete(index - 1, index)
+    assert str(buffer) == '' and len(buffer) == 0
+    buffer.insert(0, 'ok')
+    assert str(buffer) == 'ok'
+
+
+def test_out_of_range():
+    buffer = TextBuffer('abc')
+    for start, end in ((-1, 1), (2, 1), (0, 4)):
+        try:
+            buffer.replace(start, end, '')
+        except IndexError:
+            continue
+        assert False, (start, end)
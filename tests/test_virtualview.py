@@ -0,0 +1,132 @@
+import sys, os
+tests_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, tests_path + '/../intercut')
+
+import pytest
+
+import virtualview
+from model import ScreenplayDocument, SceneModel, ElementRecord
+
+
+@pytest.fixture
+def document():
+    '''Return a document with two short scenes.'''
+    document = ScreenplayDocument()
+    for texts in (['Int. House', 'Something happens.'], ['Bob', 'Hi.']):
+        scene = SceneModel()
+        for text in texts:
+            scene.insert(len(scene), ElementRecord('Action', text))
+        document.insert_scene(len(document), scene)
+    return document
+
+
+def test_document_rows(document):
+    rows = virtualview.document_rows(document)
+    assert [row['record'].raw_text for row in rows] == [
+        'Int. House', 'Something happens.', 'Bob', 'Hi.']
+    assert rows[0]['record'].scene is document.scenes[0]
+    assert rows[2]['record'].scene is document.scenes[1]
+
+
+def test_row_height_grows_with_wrapped_lines():
+    short = virtualview.row_height('Action', 'a' * 61)
+    long = virtualview.row_height('Action', 'a' * 62)
+    assert long - short == virtualview.LINE_HEIGHT
+
+
+@pytest.fixture
+def view(document):
+    from screenplay import Screenplay, ScrollingScreenplay
+    view = ScrollingScreenplay()
+    view.add_widget(Screenplay())
+    document.scenes[0].elements[0].element_type = 'SceneHeading'
+    document.scenes[1].elements[0].element_type = 'Character'
+    view.screenplay.load_document(document)
+    view.virtualized = True
+    return view
+
+
+def test_row_edits_keep_names(view):
+    document = view.screenplay.document
+    assert document.characters == ['Bob']
+    assert document.locations == ['Int. House']
+
+    view.update_row(2, 'Ann')
+    view.insert_row(4, 'Character', 'Cy')
+    assert document.characters == ['Ann', 'Cy']
+    view.morph_row(0, 'Action')
+    view.morph_row(1, 'SceneHeading')
+    view.update_row(1, 'Ext. Yard')
+    assert document.locations == ['Ext. Yard']
+    view.remove_row(4)
+    assert document.characters == ['Ann']
+    assert view.screenplay.character_names.names() == ['Ann']
+
+
+def test_removing_last_row_of_a_scene(view):
+    document = view.screenplay.document
+    view.remove_row(3)
+    view.remove_row(2)
+    assert len(document.scenes) == 1
+    assert view.screenplay.displayed_scenes == 1
+    assert document.characters == []
+    assert [row['record'].raw_text for row in view.data] == [
+        'Int. House', 'Something happens.']
+
+
+def test_rows_edit_their_records_in_place(view, monkeypatch):
+    document = view.screenplay.document
+    record = ElementRecord('Parenthetical', 'beat')
+    document.scenes[1].insert(1, record)
+    view.data = virtualview.document_rows(document)
+
+    element = virtualview.RecycledElement()
+    element.refresh_view_attrs(view, 3, view.data[3])
+    # Formatted as the classic view does.
+    assert element.text == '(beat)'
+    assert view.data[3]['height'] == virtualview.lines_height(
+        'Parenthetical', len(element.text) // 25 + 1)
+
+    edits = []
+    edit = ElementRecord.edit
+    monkeypatch.setattr(ElementRecord, 'edit', lambda record, *args:
+                        edits.append(args) or edit(record, *args))
+    element.cursor = (5, 0)
+    element.insert_text('s')
+    # Nothing goes outside the parentheses.
+    element.cursor = (0, 0)
+    element.insert_text('x')
+    assert record.raw_text == 'beats'
+    element.cursor = (3, 0)
+    element.keyboard_on_key_down(None, (8, 'backspace'), '', [])
+    assert (record.raw_text, element.text) == ('bats', '(bats)')
+    assert edits == [(4, 4, 's'), (1, 2, '')]
+
+    element.refresh_view_attrs(view, 2, view.data[2])
+    element.cursor = (0, 0)
+    element.insert_text('c')
+    assert (element.text, element.raw_text) == ('CBOB', 'cBob')
+
+
+def test_upper_case_rows_keep_their_length(view):
+    view.update_row(2, 'Straße')
+    element = virtualview.RecycledElement()
+    element.refresh_view_attrs(view, 2, view.data[2])
+    assert element.text == 'STRAßE'
+
+    # A deletion the element did not track is found by comparing the text
+    # with the raw text as displayed.
+    element.text = 'STRAE'
+    assert element.raw_text == 'Strae'
+    element.cursor = (4, 0)
+    element.insert_text('ß')
+    assert (element.text, element.raw_text) == ('STRAßE', 'Straße')
+
+
+def test_inserting_the_first_row(view):
+    document = view.screenplay.document
+    view.insert_row(0, 'Action', 'Fade in.')
+    assert [record.raw_text for record in document.scenes[0].elements] == [
+        'Fade in.', 'Int. House', 'Something happens.']
+    assert len(document.scenes[1]) == 2
+    assert view.data[0]['record'] is document.scenes[0].elements[0]
@@ -0,0 +1,29 @@
+import sys, os
+tests_path = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, tests_path + '/../intercut')
+
+import random
+
+from tools.wordwrap import count_lines, paragraph_line_count, wrap_paragraph
+import metrics
+
+
+def test_line_counts_match_wrap():
+    rng = random.Random(5)
+    for _ in range(300):
+        paragraph = ' '.join(rng.choice(['a', 'word', '', 'x' * 70])
+                             for _ in range(rng.randint(0, 30)))
+        for width in (16, 25, 35, 61):
+            assert paragraph_line_count(paragraph, width) == \
+                len(wrap_paragraph(paragraph, width)[0])
+    assert count_lines('one\n\ntwo', 61) == 3
+
+
+def test_element_line_counts():
+    assert metrics.line_count('Action', 'a' * 61) == 1
+    assert metrics.line_count('Action', 'a' * 62) == 2
+    assert metrics.line_count('Dialogue', 'word ' * 7) == 1
+    assert metrics.line_count('Dialogue', 'word ' * 8) == 2
+    # The parentheses count towards the width.
+    assert metrics.line_count('Parenthetical', 'a' * 23) == 1
+    assert metrics.line_count('Parenthetical', 'a' * 24) == 2